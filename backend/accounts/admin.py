@@ -24,4 +24,4 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at', 'last_login')
+    readonly_fields = ('total_xp', 'current_streak', 'created_at', 'updated_at', 'last_login')
@@ -0,0 +1,92 @@
+"""
+Async signup and signin.
+
+Hashing a password takes tens of milliseconds of CPU by design, so it never
+runs on the event loop. Signup hashes on a small dedicated thread pool and
+saves through the async ORM. Signin goes through authenticate() in a
+thread, like CustomTokenObtainPairView, so the configured backends,
+password hash upgrades and the user_login_failed signal all apply.
+Responses match SignupView and CustomTokenObtainPairView.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import update_last_login
+from django.db import IntegrityError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from slokcamp.async_views import AsyncAPIView, json_response
+from slokcamp.middleware import pin_to_primary
+
+from .serializers import UserCreateSerializer, UserSerializer
+
+User = get_user_model()
+
+_hashing_pool = ThreadPoolExecutor(settings.PASSWORD_HASHING_THREADS, thread_name_prefix='password-hashing')
+
+
+async def _hash(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hashing_pool, func, *args)
+
+
+def _parse(request):
+    return Request(request, parsers=[JSONParser(), FormParser(), MultiPartParser()])
+
+
+class AsyncSignupView(AsyncAPIView):
+    http_method_names = ['post', 'options']
+
+    async def post(self, request):
+        serializer = UserCreateSerializer(data=_parse(request).data)
+        # Validation checks that the email is free, which is a query
+        if not await sync_to_async(serializer.is_valid)():
+            return json_response(serializer.errors, status=400)
+        data = serializer.validated_data
+        user = User(
+            email=User.objects.normalize_email(data['email']),
+            full_name=data.get('full_name', ''),
+            password=await _hash(make_password, data['password']),
+        )
+        try:
+            await user.asave()
+        except IntegrityError:
+            return json_response({'email': ['User with this email already exists.']}, status=400)
+        await sync_to_async(pin_to_primary)(user.pk)
+
+        refresh = RefreshToken.for_user(user)
+        return json_response({
+            'access_token': str(refresh.access_token),
+            'refresh_token': str(refresh),
+            'token_type': 'bearer',
+            'user': UserSerializer(user).data
+        }, status=201)
+
+
+class AsyncSigninView(AsyncAPIView):
+    http_method_names = ['post', 'options']
+
+    async def post(self, request):
+        data = _parse(request).data
+        email, password = data.get('email'), data.get('password')
+        if not email or not password:
+            return json_response({'detail': 'email and password are required'}, status=400)
+
+        user = await sync_to_async(authenticate)(request, **{User.USERNAME_FIELD: email, 'password': password})
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            return json_response({'detail': 'No active account found with the given credentials'}, status=401)
+
+        if api_settings.UPDATE_LAST_LOGIN:
+            await sync_to_async(update_last_login)(None, user)
+        refresh = RefreshToken.for_user(user)
+        return json_response({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user': UserSerializer(user).data,
+        })
@@ -0,0 +1,53 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import cached_user
+from .revocation import is_revoked
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that rejects revoked tokens and resolves the token's
+    user through accounts.cache.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        try:
+            revoked = is_revoked(token)
+        except (KeyError, ValueError):
+            raise InvalidToken(_('Token has no valid id'))
+        if revoked:
+            raise InvalidToken(_('Token has been revoked'))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        def load():
+            try:
+                # From the primary: a row from a lagging replica would be cached
+                return self.user_model.objects.using(DEFAULT_DB_ALIAS).get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        user = cached_user(user_id, load)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+        return user
@@ -0,0 +1,56 @@
+"""
+Users cached for authentication.
+
+A JWT already names its user, so the user row is kept in the shared cache
+next to a per-user version instead of being read on every request. Any save
+of the user bumps the version (profile edits, role changes, deactivation,
+password changes), as do the XP and streak writes that bypass save(), and a
+cached entry built under an older version is ignored.
+
+This only helps with a shared cache (Redis, SHARED_CACHE). The bumps would
+not reach the other workers through a per-process cache, and a deactivated
+user must not stay signed in on them, so without one nothing is cached or
+bumped: every request reads its user from the database, as it would
+without this module.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from slokcamp.conditional import bump_version, get_version
+
+
+def _version_key(user_id):
+    return f'user-version:{user_id}'
+
+
+def _user_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def bump_user(user_id):
+    """Invalidate the cached user ``user_id`` once the transaction commits."""
+    if settings.SHARED_CACHE:
+        transaction.on_commit(lambda: bump_version(cache, _version_key(user_id)))
+
+
+def cached_user(user_id, load):
+    """
+    The user ``user_id`` from the cache, or from ``load()`` on a miss.
+
+    A hit costs one cache round trip. The version is read before loading, so
+    a user saved while being loaded is stored under a version that is already
+    stale and never served.
+    """
+    if not settings.SHARED_CACHE:
+        return load()
+    found = cache.get_many([_version_key(user_id), _user_key(user_id)])
+    version = found.get(_version_key(user_id))
+    entry = found.get(_user_key(user_id))
+    if version is not None and entry is not None and entry[0] == version:
+        return entry[1]
+    if version is None:
+        version = get_version(cache, _version_key(user_id))
+    user = load()
+    cache.set(_user_key(user_id), (version, user), settings.AUTH_USER_CACHE_TTL)
+    return user
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.revocation import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked token ids whose tokens have expired'
+
+    def handle(self, *args, **options):
+        deleted = prune()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} revoked tokens'))
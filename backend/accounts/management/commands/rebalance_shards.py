@@ -0,0 +1,106 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from accounts.cache import bump_user
+from slokcamp.db.sharding import placement, sharded_models
+
+BATCH_SIZE = 500
+
+
+def copy_rows(model, source, target, user_ids, changed_field, since=None):
+    """
+    Copy the rows of ``user_ids`` from ``source`` to ``target``. With
+    ``since``, only rows written since then, and only over older copies.
+    """
+    rows = model._base_manager.using(source).filter(user_id__in=user_ids)
+    copies = model._base_manager.using(target)
+    if since is None:
+        # Whatever an interrupted move left behind
+        copies.filter(user_id__in=user_ids).delete()
+        rows = list(rows)
+    else:
+        rows = list(rows.filter(**{f'{changed_field}__gte': since}))
+        written = dict(copies.filter(pk__in=[row.pk for row in rows]).values_list('pk', changed_field))
+        rows = [row for row in rows if row.pk not in written or getattr(row, changed_field) > written[row.pk]]
+        copies.filter(pk__in=[row.pk for row in rows]).delete()
+    # Raw inserts, as loaddata does, so auto_now fields keep their values. A
+    # row the target created meanwhile for the same unique key wins.
+    fields = model._meta.local_concrete_fields
+    for start in range(0, len(rows), BATCH_SIZE):
+        model._base_manager._insert(
+            rows[start:start + BATCH_SIZE], fields=fields, using=target, raw=True, on_conflict=OnConflict.IGNORE,
+        )
+    return len(rows)
+
+
+class Command(BaseCommand):
+    help = (
+        'Move users whose lesson progress and activity are not on the shard the hash places them on, '
+        'e.g. after adding a shard to DB_SHARDS or to empty one before removing it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exclude', action='append', default=[], metavar='ALIAS', help='Move every user off this shard',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--grace', type=float, default=None,
+            help='Seconds between switching users over and the final copy (default AUTH_USER_CACHE_TTL), '
+                 'long enough for requests that still see the old shard to finish',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        exclude = set(options['exclude'])
+        if exclude - set(settings.DATABASE_SHARDS):
+            raise CommandError(f'Unknown shards: {", ".join(sorted(exclude - set(settings.DATABASE_SHARDS)))}')
+        if exclude >= set(settings.DATABASE_SHARDS):
+            raise CommandError('Cannot exclude every shard')
+
+        User = get_user_model()
+        moves = defaultdict(list)
+        for user_id, shard in User.objects.order_by('pk').values_list('pk', 'shard').iterator():
+            source = shard or placement(user_id)
+            target = placement(user_id, exclude)
+            if source != target:
+                moves[source, target].append(user_id)
+        for (source, target), user_ids in sorted(moves.items()):
+            self.stdout.write(f'{source} -> {target}: {len(user_ids)} users')
+        if options['dry_run'] or not moves:
+            return
+
+        # Copy, then switch the users over; requests that started before the
+        # switch may still write to the source until the grace period ends,
+        # so whatever they wrote is copied again before the source is cleared
+        batches = []
+        for (source, target), user_ids in moves.items():
+            for start in range(0, len(user_ids), options['batch_size']):
+                batch = user_ids[start:start + options['batch_size']]
+                started = timezone.now()
+                for model, changed_field in sharded_models():
+                    copy_rows(model, source, target, batch, changed_field)
+                with transaction.atomic():
+                    User.objects.filter(pk__in=batch).update(shard=target)
+                    for user_id in batch:
+                        bump_user(user_id)
+                batches.append((source, target, batch, started))
+
+        grace = settings.AUTH_USER_CACHE_TTL if options['grace'] is None else options['grace']
+        self.stdout.write(f'Waiting {grace:g}s for requests on the old shards to finish')
+        time.sleep(grace)
+
+        copied = 0
+        for source, target, batch, started in batches:
+            for model, changed_field in sharded_models():
+                copied += copy_rows(model, source, target, batch, changed_field, since=started)
+                model._base_manager.using(source).filter(user_id__in=batch).delete()
+        moved = sum(len(batch) for _, _, batch, _ in batches)
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} users ({copied} rows written during the move)'))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="activity_bitmap",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="last_active_date",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_user_activity_bitmap"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="total_xp",
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+    ]
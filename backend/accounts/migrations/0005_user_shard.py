@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_revoked_tokens"),
+    ]
+
+    operations = [
+        # Existing users' rows are on the primary
+        migrations.AddField(
+            model_name="user",
+            name="shard",
+            field=models.CharField(
+                blank=True, default="default", editable=False, max_length=32
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="shard",
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
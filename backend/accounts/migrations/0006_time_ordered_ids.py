@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:22
+
+from django.db import migrations, models
+import slokcamp.ids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_user_shard"),
+    ]
+
+    # The default is applied by Django, not the database: nothing to alter
+    # there (SQLite would rebuild every table to change it)
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="user",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
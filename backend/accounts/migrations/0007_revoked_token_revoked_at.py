@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0006_time_ordered_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="revokedtoken",
+            name="revoked_at",
+            field=models.DateTimeField(
+                db_index=True, default=django.utils.timezone.now
+            ),
+        ),
+    ]
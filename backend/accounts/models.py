@@ -1,6 +1,10 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
-import uuid
+from django.utils import timezone
+
+from slokcamp.db.sharding import placement
+from slokcamp.counters import CounterFieldsMixin
+from slokcamp.ids import new_id
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -18,25 +22,33 @@ class UserManager(BaseUserManager):
         extra_fields.setdefault('role', 'admin')
         return self.create_user(email, password, **extra_fields)
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     ROLE_CHOICES = (
         ('user', 'User'),
         ('admin', 'Admin'),
     )
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
     username = None
     email = models.EmailField(unique=True)
     full_name = models.CharField(max_length=255)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='user')
     is_active = models.BooleanField(default=True)
-    total_xp = models.IntegerField(default=0)
+    total_xp = models.IntegerField(default=0, db_index=True)
     current_streak = models.IntegerField(default=0)
+    # Bit n set means the user completed a lesson n days before last_active_date
+    activity_bitmap = models.BigIntegerField(default=0, editable=False)
+    last_active_date = models.DateField(null=True, blank=True, editable=False)
+    # Database alias holding the user's lesson progress and activity
+    shard = models.CharField(max_length=32, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserManager()
 
+    # Maintained by courses.xp as lessons are completed
+    counter_fields = ('total_xp', 'current_streak', 'activity_bitmap', 'last_active_date')
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['full_name']
 
@@ -47,3 +59,21 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        if not self.shard:
+            self.shard = placement(self.pk)
+        super().save(*args, **kwargs)
+
+class RevokedToken(models.Model):
+    # simplejwt's jti is a uuid4 hex, stored in 16 bytes instead of 32 characters
+    jti = models.UUIDField(primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # Polled by workers without a shared cache, see accounts.revocation
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'revoked_tokens'
+
+    def __str__(self):
+        return self.jti.hex
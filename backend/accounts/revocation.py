@@ -0,0 +1,163 @@
+"""
+Revoked JWTs.
+
+Revoked token ids (jti) are persisted in RevokedToken until the token would
+have expired anyway, so revocations survive restarts; prune_revoked_tokens
+deletes the rest. Each process also keeps a bloom filter of the table,
+built on first use, so checking a token that was never revoked (nearly all
+of them) costs a few hashes and one cache read to stay in sync, with no
+query. Only a filter hit is confirmed against the table.
+
+Revocations made through other processes reach the filter through a
+CacheJournal. The filter is rebuilt from the table when the journal cannot
+catch it up and every REVOKED_TOKENS_RELOAD_INTERVAL seconds, which also
+drops pruned ids and resizes it to the table. Both read the primary, which
+never lags behind a revocation that is already in the journal.
+
+Without SHARED_CACHE the journal would stay inside one process. The filter
+then polls the table instead, at most every REVOKED_TOKENS_POLL_INTERVAL
+seconds: one index range read of the rows revoked since the last poll
+(less POLL_OVERLAP, for transactions that commit after a later revocation).
+Checks in between query nothing, so a token revoked through another
+process may still be accepted for up to the poll interval.
+"""
+import hashlib
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from slokcamp.journal import CacheJournal
+
+from .models import RevokedToken
+
+ERROR_RATE = 0.001
+POLL_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+journal = CacheJournal('revoked-tokens')
+_lock = threading.Lock()
+_filter = None
+_applied = None
+_loaded_at = 0.0
+# The revocation time the last load or poll read up to, and when it ran
+_high_water = None
+_polled_at = 0.0
+
+
+def _jti(token):
+    return uuid.UUID(str(token[api_settings.JTI_CLAIM]))
+
+
+def load():
+    jtis = list(
+        RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(expires_at__gt=timezone.now()).values_list('jti', flat=True).iterator()
+    )
+    bloom = BloomFilter(max(settings.REVOKED_TOKENS_BLOOM_CAPACITY, 2 * len(jtis)))
+    for jti in jtis:
+        bloom.add(jti.hex)
+    return bloom
+
+
+def _reload():
+    global _filter, _loaded_at, _high_water, _polled_at
+    high_water = timezone.now()
+    _filter = load()
+    _loaded_at = _polled_at = time.monotonic()
+    _high_water = high_water
+
+
+def _poll():
+    global _high_water, _polled_at
+    if time.monotonic() - _polled_at < settings.REVOKED_TOKENS_POLL_INTERVAL:
+        return
+    high_water = timezone.now()
+    revoked = RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(revoked_at__gte=_high_water - POLL_OVERLAP)
+    for jti in revoked.values_list('jti', flat=True):
+        _filter.add(jti.hex)
+    _high_water = high_water
+    _polled_at = time.monotonic()
+
+
+def _sync():
+    global _applied
+    stale = _filter is None or time.monotonic() - _loaded_at > settings.REVOKED_TOKENS_RELOAD_INTERVAL
+    if not settings.SHARED_CACHE:
+        if stale:
+            _reload()
+        else:
+            _poll()
+        return
+    position, events = journal.read(None if stale else _applied)
+    if events is None:
+        _reload()
+    else:
+        for jti in events:
+            _filter.add(jti)
+    _applied = position
+
+
+def _remember(jti):
+    # This process knows at once, whatever the others wait for
+    with _lock:
+        if _filter is not None:
+            _filter.add(jti)
+    if settings.SHARED_CACHE:
+        journal.append(jti)
+
+
+def is_revoked(token):
+    """Whether ``token`` has been revoked; raises ValueError for a malformed jti."""
+    jti = _jti(token)
+    with _lock:
+        _sync()
+        maybe = jti.hex in _filter
+    return maybe and RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(jti=jti).exists()
+
+
+def revoke(token):
+    """
+    Revoke ``token`` until it expires.
+
+    Returns False if it was already revoked. The insert is the source of
+    truth, so of two concurrent calls for one token exactly one returns True.
+    """
+    jti = _jti(token)
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    _, created = RevokedToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+    if created:
+        transaction.on_commit(lambda: _remember(jti.hex))
+    return created
+
+
+def prune():
+    """Delete revocations of tokens that have expired; returns how many."""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -1,14 +1,25 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from courses.xp import current_streak
+from .revocation import revoke
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
+    current_streak = serializers.SerializerMethodField()
+    
     class Meta:
         model = User
         fields = ('id', 'email', 'full_name', 'role', 'is_active', 'total_xp', 'current_streak', 'created_at')
         read_only_fields = ('id', 'created_at', 'total_xp', 'current_streak')
+    
+    def get_current_streak(self, obj):
+        return current_streak(obj)
 
 class UserCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
@@ -26,3 +37,21 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         data = super().validate(attrs)
         data['user'] = UserSerializer(self.user).data
         return data
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # Revoke the presented token before issuing new ones; a token that was
+        # already revoked, e.g. replayed after a rotation, is refused.
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            if not revoke(RefreshToken(attrs['refresh'])):
+                raise TokenError('Token has been revoked')
+        return super().validate(attrs)
+
+class SignoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+    
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError as e:
+            raise serializers.ValidationError(str(e))
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from slokcamp.db.sharding import shard_for, sharded_models
+
+from .cache import bump_user
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_user(sender, instance, **kwargs):
+    bump_user(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def delete_sharded_rows(sender, instance, **kwargs):
+    # The cascade only reached the primary's copy of the sharded tables
+    shard, user_id = shard_for(instance), instance.pk
+
+    def delete():
+        for model, _ in sharded_models():
+            model._base_manager.using(shard).filter(user_id=user_id).delete()
+
+    transaction.on_commit(delete)
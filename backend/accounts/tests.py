@@ -1,3 +1,163 @@
-from django.test import TestCase
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import revocation
+from .async_views import AsyncSigninView
+from .models import RevokedToken, User
+
+
+class CachedUserTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='learner@example.com', password=None, full_name='Learner')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def deactivate_elsewhere(self):
+        # Like a save on another worker: nothing reaches this process's cache
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_shared_cache_serves_the_user(self):
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+        self.deactivate_elsewhere()
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_process_local_cache_reads_the_database(self):
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+        self.deactivate_elsewhere()
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 401)
+
+
+class AsyncSigninTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='learner@example.com', full_name='Learner', password=make_password('dharma-123', hasher='pbkdf2_sha1'),
+        )
+
+    async def signin(self, password):
+        request = AsyncRequestFactory().post(
+            '/api/auth/signin/', json.dumps({'email': 'learner@example.com', 'password': password}),
+            content_type='application/json',
+        )
+        response = await AsyncSigninView.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    async def test_signs_in_through_the_auth_backends(self):
+        status, data = await self.signin('dharma-123')
+        self.assertEqual((status, data['user']['email']), (200, 'learner@example.com'))
+        self.assertIn('access', data)
+        # Logging in upgrades the password to the preferred hasher
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+    async def test_failures_are_signalled(self):
+        failures = []
+
+        def handler(sender, credentials, **kwargs):
+            failures.append(credentials['email'])
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        status, _ = await self.signin('wrong')
+        self.assertEqual((status, failures), (401, ['learner@example.com']))
+
+
+@override_settings(SHARED_CACHE=False)
+class RevocationPollTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        # Every test starts from a filter loaded on the first check
+        patcher = mock.patch.object(revocation, '_filter', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def token(self):
+        return {'jti': uuid.uuid4().hex, 'exp': int(time.time()) + 3600}
+
+    @override_settings(REVOKED_TOKENS_POLL_INTERVAL=60)
+    def test_checks_between_polls_query_nothing(self):
+        self.assertFalse(revocation.is_revoked(self.token()))
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation.is_revoked(self.token()))
+        # This process's own revocations count at once
+        token = self.token()
+        with self.captureOnCommitCallbacks(execute=True):
+            revocation.revoke(token)
+        self.assertTrue(revocation.is_revoked(token))
+
+    @override_settings(REVOKED_TOKENS_POLL_INTERVAL=0)
+    def test_polls_pick_up_revocations_made_elsewhere(self):
+        token = self.token()
+        self.assertFalse(revocation.is_revoked(token))
+        # Like a revocation through another worker: nothing reaches this one
+        RevokedToken.objects.create(jti=token['jti'], expires_at=timezone.now() + timedelta(hours=1))
+        self.assertTrue(revocation.is_revoked(token))
+
+
+def revocation_worker(path, create, pipe):
+    # A worker process of its own, on a database file the other worker shares
+    connections.settings[DEFAULT_DB_ALIAS]['NAME'] = path
+    del connections[DEFAULT_DB_ALIAS]
+    if create:
+        with connection.schema_editor() as editor:
+            editor.create_model(RevokedToken)
+    pipe.send('ready')
+    for command, token in iter(pipe.recv, None):
+        pipe.send(getattr(revocation, command)(token))
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), 'needs fork')
+class CrossProcessRevocationTests(SimpleTestCase):
+    def start_worker(self, path, create=False):
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.get_context('fork').Process(
+            target=revocation_worker, args=(path, create, child), daemon=True,
+        )
+        process.start()
+        self.addCleanup(process.join, 5)
+        self.addCleanup(parent.send, None)
+
+        def receive():
+            self.assertTrue(parent.poll(10), 'the worker did not answer')
+            return parent.recv()
+
+        def call(command, token):
+            parent.send((command, token))
+            return receive()
+        self.assertEqual(receive(), 'ready')
+        return call
+
+    @override_settings(SHARED_CACHE=False, REVOKED_TOKENS_POLL_INTERVAL=0)
+    def test_revocation_reaches_the_other_workers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'revocations.sqlite3')
+        first = self.start_worker(path, create=True)
+        second = self.start_worker(path)
+        token = {'jti': uuid.uuid4().hex, 'exp': int(time.time()) + 3600}
+        # The second worker has seen the token before it is revoked
+        self.assertFalse(second('is_revoked', token))
+        self.assertTrue(first('revoke', token))
+        self.assertTrue(second('is_revoked', token))
@@ -1,13 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from .views import SignupView, CustomTokenObtainPairView, CurrentUserView, AllUsersView
-from rest_framework_simplejwt.views import TokenRefreshView
+from .views import (
+    SignupView, CustomTokenObtainPairView, RotatingTokenRefreshView, SignoutView, CurrentUserView, AllUsersView
+)
 
 app_name = 'accounts'
 
+if settings.ASYNC_VIEWS:
+    from .async_views import AsyncSignupView as SignupView, AsyncSigninView as CustomTokenObtainPairView
+
 urlpatterns = [
     path('signup/', SignupView.as_view(), name='signup'),
     path('signin/', CustomTokenObtainPairView.as_view(), name='signin'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', RotatingTokenRefreshView.as_view(), name='token_refresh'),
+    path('signout/', SignoutView.as_view(), name='signout'),
     path('me/', CurrentUserView.as_view(), name='current_user'),
     path('users/', AllUsersView.as_view(), name='all_users'),
 ]
@@ -1,9 +1,14 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
-from .serializers import UserSerializer, UserCreateSerializer, CustomTokenObtainPairSerializer
+from slokcamp.middleware import pin_to_primary
+from .revocation import revoke
+from .serializers import (
+    UserSerializer, UserCreateSerializer, CustomTokenObtainPairSerializer, RotatingTokenRefreshSerializer,
+    SignoutSerializer
+)
 
 User = get_user_model()
 
@@ -16,6 +21,8 @@ class SignupView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        # The new user's next requests must not miss them on a lagging replica
+        pin_to_primary(user.pk)
         
         # Generate tokens
         from rest_framework_simplejwt.tokens import RefreshToken
@@ -31,6 +38,21 @@ class SignupView(generics.CreateAPIView):
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+class RotatingTokenRefreshView(TokenRefreshView):
+    serializer_class = RotatingTokenRefreshSerializer
+
+class SignoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = SignoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        revoke(request.auth)
+        refresh = serializer.validated_data.get('refresh')
+        if refresh is not None:
+            revoke(refresh)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class CurrentUserView(generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
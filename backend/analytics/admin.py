@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import UserActivity, Discussion, DiscussionReply
+from slokcamp.admin import ShardedModelAdmin
+from .models import UserActivity, Discussion, DiscussionReply, DiscussionReplyVote
 
 @admin.register(UserActivity)
-class UserActivityAdmin(admin.ModelAdmin):
+class UserActivityAdmin(ShardedModelAdmin):
     list_display = ('user', 'activity_type', 'created_at')
     list_filter = ('activity_type', 'created_at')
     search_fields = ('user__email',)
@@ -24,3 +25,10 @@ class DiscussionReplyAdmin(admin.ModelAdmin):
     search_fields = ('content', 'user__email', 'discussion__title')
     ordering = ('-created_at',)
     readonly_fields = ('upvotes', 'created_at', 'updated_at')
+
+@admin.register(DiscussionReplyVote)
+class DiscussionReplyVoteAdmin(admin.ModelAdmin):
+    list_display = ('reply', 'user', 'created_at')
+    search_fields = ('user__email',)
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at',)
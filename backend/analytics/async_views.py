@@ -0,0 +1,24 @@
+from asgiref.sync import sync_to_async
+
+from slokcamp.async_views import AsyncReadView
+from slokcamp.pagination import KeysetPagination
+
+from .view_counts import current_views
+from .views import DiscussionListCreateView
+
+
+class AsyncDiscussionListCreateView(AsyncReadView):
+    http_method_names = ['get', 'post', 'head', 'options']
+    drf_view = DiscussionListCreateView
+    # Like the DRF view, no ETag and no Cache-Control
+    cache_control = {}
+
+    async def get_data(self, request):
+        view = self.get_drf_view(request)
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(view.get_queryset(), request, view)
+        view.views = await sync_to_async(current_views)(page)
+        return paginator.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+    async def post(self, request):
+        return await self.delegate(request)
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from analytics.view_counts import flush
+
+
+class Command(BaseCommand):
+    help = (
+        'Persist discussion view counts buffered in the cache, once or every N seconds '
+        '(run it next to the web workers when SHARED_CACHE is on)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every', type=float, nargs='?', const=settings.DISCUSSION_VIEWS_FLUSH_INTERVAL,
+            help='Keep running and flush every this many seconds (default DISCUSSION_VIEWS_FLUSH_INTERVAL)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            updated = flush()
+            if options['every'] is None:
+                break
+            if updated:
+                self.stdout.write(f'Flushed views for {updated} discussions')
+            time.sleep(options['every'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed views for {updated} discussions'))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+from courses.migrations._transliteration import phonetic_key
+
+
+def backfill_title_keys(apps, schema_editor):
+    Discussion = apps.get_model("analytics", "Discussion")
+    rows = list(Discussion.objects.only("id", "title"))
+    for row in rows:
+        row.title_key = phonetic_key(row.title)[:255]
+    Discussion.objects.bulk_update(rows, ["title_key"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_discussion_discussionreply"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="discussion",
+            name="title_key",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(backfill_title_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("analytics", "0003_discussion_title_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DiscussionReplyVote",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "reply",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="votes",
+                        to="analytics.discussionreply",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reply_votes",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "discussion_reply_votes",
+                "unique_together": {("reply", "user")},
+            },
+        ),
+        migrations.CreateModel(
+            name="DiscussionReplyUpvoteShard",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "reply",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upvote_shards",
+                        to="analytics.discussionreply",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "discussion_reply_upvote_shards",
+                "unique_together": {("reply", "shard")},
+            },
+        ),
+    ]
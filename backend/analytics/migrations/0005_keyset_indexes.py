@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0004_discussion_reply_votes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="discussion",
+            index=models.Index(
+                fields=["created_at", "id"], name="discussions_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="discussion",
+            index=models.Index(
+                fields=["course", "created_at", "id"],
+                name="discussions_course_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0005_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="useractivity",
+            index=models.Index(
+                fields=["user", "created_at"], name="user_activities_recent_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("analytics", "0006_user_activity_recent_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="useractivity",
+            name="user",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="activities",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:22
+
+from django.db import migrations, models
+import slokcamp.ids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0007_user_activity_sharding"),
+    ]
+
+    # The default is applied by Django, not the database: nothing to alter
+    # there (SQLite would rebuild every table to change it)
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="discussion",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="discussionreply",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="discussionreplyupvoteshard",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="discussionreplyvote",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="useractivity",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
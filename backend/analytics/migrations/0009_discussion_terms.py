@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from courses.migrations._transliteration import phonetic_words
+
+TERM_LENGTH = 64
+
+
+def title_terms(title):
+    words = phonetic_words(title)
+    terms = ("".join(words[start:])[:TERM_LENGTH] for start in range(len(words)))
+    return {term for term in terms if term}
+
+
+def backfill_terms(apps, schema_editor):
+    Discussion = apps.get_model("analytics", "Discussion")
+    DiscussionTerm = apps.get_model("analytics", "DiscussionTerm")
+    DiscussionTerm.objects.bulk_create(
+        (
+            DiscussionTerm(discussion_id=pk, term=term)
+            for pk, title in Discussion.objects.values_list("id", "title").iterator()
+            for term in title_terms(title)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0008_time_ordered_ids"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DiscussionTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                (
+                    "discussion",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="terms",
+                        to="analytics.discussion",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "discussion_terms",
+                "unique_together": {("term", "discussion")},
+            },
+        ),
+        migrations.RunPython(backfill_terms, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="discussion",
+            name="title_key",
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
-import uuid
+
+from slokcamp.counters import CounterFieldsMixin
+from slokcamp.ids import new_id
 
 class UserActivity(models.Model):
     ACTIVITY_TYPES = (
@@ -10,8 +12,11 @@ class UserActivity(models.Model):
         ('course_complete', 'Course Complete'),
     )
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='activities', on_delete=models.CASCADE)
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
+    # Sharded by user (slokcamp.db.sharding): users are on another database
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='activities', on_delete=models.CASCADE, db_constraint=False
+    )
     activity_type = models.CharField(max_length=50, choices=ACTIVITY_TYPES)
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -19,13 +24,16 @@ class UserActivity(models.Model):
     class Meta:
         db_table = 'user_activities'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='user_activities_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.activity_type}"
 
 
-class Discussion(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+class Discussion(CounterFieldsMixin, models.Model):
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='discussions', on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     content = models.TextField()
@@ -35,16 +43,36 @@ class Discussion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Flushed from the cache by analytics.view_counts
+    counter_fields = ('views',)
+
     class Meta:
         db_table = 'discussions'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='discussions_keyset_idx'),
+            models.Index(fields=['course', 'created_at', 'id'], name='discussions_course_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
-class DiscussionReply(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+class DiscussionTerm(models.Model):
+    # Maintained by analytics.search
+    discussion = models.ForeignKey(Discussion, related_name='terms', on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = 'discussion_terms'
+        unique_together = ('term', 'discussion')
+
+    def __str__(self):
+        return self.term
+
+
+class DiscussionReply(CounterFieldsMixin, models.Model):
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
     discussion = models.ForeignKey(Discussion, related_name='replies', on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='discussion_replies', on_delete=models.CASCADE)
     content = models.TextField()
@@ -53,9 +81,41 @@ class DiscussionReply(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Maintained by analytics.upvotes
+    counter_fields = ('upvotes',)
+
     class Meta:
         db_table = 'discussion_replies'
         ordering = ['created_at']
 
     def __str__(self):
         return f"Reply to {self.discussion.title} by {self.user.email}"
+
+
+class DiscussionReplyVote(models.Model):
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
+    reply = models.ForeignKey(DiscussionReply, related_name='votes', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='reply_votes', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'discussion_reply_votes'
+        unique_together = ('reply', 'user')
+
+    def __str__(self):
+        return f"{self.user.email} upvoted {self.reply_id}"
+
+
+class DiscussionReplyUpvoteShard(models.Model):
+    """Extra upvote counter rows for a reply, see analytics.upvotes."""
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
+    reply = models.ForeignKey(DiscussionReply, related_name='upvote_shards', on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'discussion_reply_upvote_shards'
+        unique_together = ('reply', 'shard')
+
+    def __str__(self):
+        return f"{self.reply_id} [{self.shard}] {self.count}"
@@ -0,0 +1,42 @@
+"""
+Discussion search by title.
+
+Every title is indexed as DiscussionTerm rows: the phonetic key of the title
+from each of its words to the end, cut to TERM_LENGTH. A query in any script
+or romanisation then matches when its key starts one of those terms, which
+is a single range scan of the term index: "Gita", "gita chapter", "भगवद्गीता"
+and "Bhagavad Gita ch" all find "Bhagavad Gita chapter 2".
+"""
+from django.db import transaction
+
+from courses.transliteration import phonetic_key, phonetic_words, prefix_range
+
+from .models import DiscussionTerm
+
+TERM_LENGTH = 64
+
+
+def title_terms(title):
+    """The term of ``title`` starting at each of its words."""
+    words = phonetic_words(title)
+    terms = (''.join(words[start:])[:TERM_LENGTH] for start in range(len(words)))
+    return {term for term in terms if term}
+
+
+def index_discussion(discussion):
+    """Replace the indexed terms of ``discussion`` with those of its title."""
+    with transaction.atomic():
+        DiscussionTerm.objects.filter(discussion=discussion).delete()
+        DiscussionTerm.objects.bulk_create(
+            DiscussionTerm(discussion=discussion, term=term) for term in title_terms(discussion.title)
+        )
+
+
+def search_discussions(queryset, query):
+    """The discussions of ``queryset`` with a run of title words matching ``query``."""
+    key = phonetic_key(query)[:TERM_LENGTH]
+    if not key:
+        return queryset.none()
+    return queryset.filter(
+        id__in=DiscussionTerm.objects.filter(**prefix_range('term', key)).values('discussion')
+    )
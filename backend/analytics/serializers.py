@@ -4,33 +4,50 @@ from accounts.serializers import UserSerializer
 
 class DiscussionReplySerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    upvotes = serializers.SerializerMethodField()
     
     class Meta:
         model = DiscussionReply
         fields = '__all__'
-        read_only_fields = ('user', 'upvotes')
+        read_only_fields = ('user',)
+    
+    def get_upvotes(self, obj):
+        # Includes the shard counters when the reply came through with_upvotes()
+        return getattr(obj, 'total_upvotes', obj.upvotes)
 
 class DiscussionSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     replies_count = serializers.SerializerMethodField()
+    views = serializers.SerializerMethodField()
     
     class Meta:
         model = Discussion
         fields = '__all__'
-        read_only_fields = ('user', 'views')
+        read_only_fields = ('user',)
     
     def get_replies_count(self, obj):
+        if hasattr(obj, 'replies_total'):
+            return obj.replies_total or 0
         return obj.replies.count()
+    
+    def get_views(self, obj):
+        # Includes views still buffered in the cache, see analytics.view_counts
+        return self.context.get('views', {}).get(obj.pk, obj.views)
 
 class DiscussionDetailSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     replies = DiscussionReplySerializer(many=True, read_only=True)
     replies_count = serializers.SerializerMethodField()
+    views = serializers.SerializerMethodField()
     
     class Meta:
         model = Discussion
         fields = '__all__'
-        read_only_fields = ('user', 'views')
+        read_only_fields = ('user',)
     
     def get_replies_count(self, obj):
         return obj.replies.count()
+    
+    def get_views(self, obj):
+        # Includes views still buffered in the cache, see analytics.view_counts
+        return self.context.get('views', {}).get(obj.pk, obj.views)
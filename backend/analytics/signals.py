@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.dashboard import bump_dashboard
+from .models import Discussion, DiscussionReply, UserActivity
+from .search import index_discussion
+from .versions import bump_discussion_version
+
+
+@receiver(post_save, sender=DiscussionReply)
+@receiver(post_delete, sender=DiscussionReply)
+def invalidate_discussion(sender, instance, **kwargs):
+    bump_discussion_version(instance.discussion_id)
+
+
+@receiver(post_save, sender=Discussion)
+def index_title(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'title' in update_fields:
+        index_discussion(instance)
+
+
+@receiver(post_save, sender=UserActivity)
+def invalidate_dashboard(sender, instance, **kwargs):
+    bump_dashboard(instance.user_id)
@@ -1,3 +1,196 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from slokcamp.models import Version
+
+from .models import Discussion, DiscussionReply, DiscussionReplyVote
+from .upvotes import unvote, upvote, upvote_count
+from .view_counts import current_views, flush, record_view
+
+
+class ReplyUpvoteConcurrencyTests(TransactionTestCase):
+    # Reads outside a transaction go to the replicas when DB_REPLICAS is set
+    databases = '__all__'
+    voters = 8
+    votes_per_voter = 5
+
+    def setUp(self):
+        author = User.objects.create_user(email='author@example.com', password=None, full_name='Author')
+        discussion = Discussion.objects.create(user=author, title='Gita 2.47', content='karmaṇy evādhikāras te')
+        self.reply = DiscussionReply.objects.create(discussion=discussion, user=author, content='Reply')
+        self.users = [
+            User.objects.create_user(email=f'voter{n}@example.com', password=None, full_name=f'Voter {n}')
+            for n in range(self.voters)
+        ]
+
+    def vote_concurrently(self, action):
+        """Have every user call ``action`` repeatedly at the same time."""
+        barrier = threading.Barrier(len(self.users))
+        errors = []
+
+        def run(user):
+            try:
+                barrier.wait()
+                for _ in range(self.votes_per_voter):
+                    while True:
+                        try:
+                            action(self.reply, user)
+                            break
+                        except OperationalError:
+                            # SQLite refuses a second writer instead of queueing it
+                            time.sleep(0.001)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(user,)) for user in self.users]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        self.assertEqual(errors, [])
+        return len(self.users) * self.votes_per_voter / elapsed
+
+    def assert_counted(self, expected):
+        self.assertEqual(upvote_count(self.reply.pk), expected)
+        self.assertEqual(DiscussionReplyVote.objects.filter(reply=self.reply).count(), expected)
+
+    def test_concurrent_upvotes_count_each_user_once(self):
+        throughput = self.vote_concurrently(upvote)
+        self.assert_counted(self.voters)
+        self.assertGreater(throughput, 0)
+
+    def test_concurrent_unvotes_count_each_user_once(self):
+        for user in self.users:
+            upvote(self.reply, user)
+        self.vote_concurrently(unvote)
+        self.assert_counted(0)
+
+    @override_settings(DISCUSSION_UPVOTE_SHARDS=4)
+    def test_sharded_counter_sums_on_read(self):
+        self.vote_concurrently(upvote)
+        self.assert_counted(self.voters)
+        self.reply.refresh_from_db()
+        self.assertEqual(self.reply.upvotes, 0)
+        unvote(self.reply, self.users[0])
+        self.assert_counted(self.voters - 1)
+
+    def test_upvote_endpoint_is_idempotent(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        url = f'/api/discussion-replies/{self.reply.pk}/upvote/'
+        for _ in range(3):
+            response = client.post(url)
+        self.assertEqual(response.json(), {'upvotes': 1, 'upvoted': True})
+        response = client.delete(url)
+        self.assertEqual(response.json(), {'upvotes': 0, 'upvoted': False})
+        response = client.delete(url)
+        self.assertEqual(response.json(), {'upvotes': 0, 'upvoted': False})
+
+
+class DiscussionSearchTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        author = User.objects.create_user(email='author@example.com', password=None, full_name='Author')
+        Discussion.objects.create(user=author, title='Bhagavad Gita chapter 2', content='')
+        Discussion.objects.create(user=author, title='Yoga Sutras', content='')
+
+    def search(self, query):
+        response = APIClient().get('/api/discussions/', {'search': query})
+        return [discussion['title'] for discussion in response.json()['results']]
+
+    def test_matches_any_run_of_words_in_any_script(self):
+        for query in ['Gita', 'chapter', 'gita chapter', 'bhagavadgītā', 'भगवद्गीता', 'Bhagavad Gita ch']:
+            with self.subTest(query):
+                self.assertEqual(self.search(query), ['Bhagavad Gita chapter 2'])
+        self.assertEqual(self.search('Upanishad'), [])
+
+    def test_matches_from_the_start_of_a_word(self):
+        self.assertEqual(self.search('sut'), ['Yoga Sutras'])
+        self.assertEqual(self.search('avad'), [])
+
+    def test_renamed_titles_are_reindexed(self):
+        discussion = Discussion.objects.get(title='Yoga Sutras')
+        discussion.content = 'Patanjali'
+        discussion.save(update_fields=['content'])
+        self.assertEqual(self.search('yoga'), ['Yoga Sutras'])
+        discussion.title = 'Upanishads'
+        discussion.save()
+        self.assertEqual(self.search('yoga'), [])
+        self.assertEqual(self.search('उपनिषद्'), ['Upanishads'])
+
+
+class ViewCountTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(email='author@example.com', password=None, full_name='Author')
+        self.discussion = Discussion.objects.create(user=author, title='Gita 2.47', content='')
+
+    def stored_views(self):
+        return Discussion.objects.get().views
+
+    @override_settings(SHARED_CACHE=True)
+    def test_buffered_views_are_flushed_once(self):
+        for _ in range(3):
+            record_view(self.discussion)
+        self.assertEqual(self.stored_views(), 0)
+        self.assertEqual(current_views([Discussion.objects.get()]), {self.discussion.pk: 3})
+        self.assertEqual(flush(), 1)
+        self.assertEqual(flush(), 0)
+        self.assertEqual(self.stored_views(), 3)
+        self.assertEqual(current_views([Discussion.objects.get()]), {self.discussion.pk: 3})
+
+    @override_settings(SHARED_CACHE=True)
+    def test_failed_flush_hands_the_views_back(self):
+        record_view(self.discussion)
+        with mock.patch('analytics.view_counts.Discussion.objects.filter', side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                flush()
+        record_view(self.discussion)
+        self.assertEqual(flush(), 1)
+        self.assertEqual(self.stored_views(), 2)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_without_a_shared_cache_views_are_written_at_once(self):
+        self.assertEqual(record_view(self.discussion), 1)
+        self.assertEqual(self.stored_views(), 1)
+        self.assertEqual(flush(), 0)
+
+
+@override_settings(SHARED_CACHE=False)
+class DiscussionConditionalTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(email='author@example.com', password=None, full_name='Author')
+        self.discussion = Discussion.objects.create(user=self.author, title='Gita 2.47', content='')
+        self.url = f'/api/discussions/{self.discussion.pk}/'
+
+    def test_revalidation_is_answered_and_counted(self):
+        etag = APIClient().get(self.url)['ETag']
+        self.assertEqual(APIClient().get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(Discussion.objects.get().views, 2)
+
+    def test_reply_through_another_worker_changes_the_etag(self):
+        etag = APIClient().get(self.url)['ETag']
+        # Posted and bumped through another worker: nothing reaches this one's cache
+        DiscussionReply.objects.create(discussion=self.discussion, user=self.author, content='Karma yoga')
+        Version.objects.filter(key=f'discussion-version:{self.discussion.pk}').update(value=F('value') + 1)
+        response = APIClient().get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([reply['content'] for reply in response.json()['replies']], ['Karma yoga'])
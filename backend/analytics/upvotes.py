@@ -0,0 +1,67 @@
+"""
+Per-user reply upvotes.
+
+Votes are DiscussionReplyVote rows, unique per (reply, user), so upvoting
+twice or removing a vote that does not exist changes nothing. The count is
+moved with F() in the same transaction as the vote row, never read and
+written back. With DISCUSSION_UPVOTE_SHARDS above 1 each vote lands on one of
+that many DiscussionReplyUpvoteShard rows chosen at random instead of the
+reply itself, so concurrent voters on a hot reply rarely queue on one row
+lock; readers add the shards to DiscussionReply.upvotes via with_upvotes().
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import DiscussionReply, DiscussionReplyUpvoteShard, DiscussionReplyVote
+from .versions import bump_discussion_version
+
+
+def _adjust(reply, delta):
+    bump_discussion_version(reply.discussion_id)
+    reply_id = reply.pk
+    shards = settings.DISCUSSION_UPVOTE_SHARDS
+    if shards <= 1:
+        DiscussionReply.objects.filter(pk=reply_id).update(upvotes=F('upvotes') + delta)
+        return
+    shard = random.randrange(shards)
+    counter = DiscussionReplyUpvoteShard.objects.filter(reply_id=reply_id, shard=shard)
+    if not counter.update(count=F('count') + delta):
+        DiscussionReplyUpvoteShard.objects.bulk_create(
+            [DiscussionReplyUpvoteShard(reply_id=reply_id, shard=shard)], ignore_conflicts=True
+        )
+        counter.update(count=F('count') + delta)
+
+
+def upvote(reply, user):
+    """Record ``user``'s upvote on ``reply``. Returns False if it already existed."""
+    with transaction.atomic():
+        _, created = DiscussionReplyVote.objects.get_or_create(reply=reply, user=user)
+        if created:
+            _adjust(reply, 1)
+    return created
+
+
+def unvote(reply, user):
+    """Withdraw ``user``'s upvote on ``reply``. Returns False if there was none."""
+    with transaction.atomic():
+        deleted, _ = DiscussionReplyVote.objects.filter(reply=reply, user=user).delete()
+        if deleted:
+            _adjust(reply, -1)
+    return bool(deleted)
+
+
+def with_upvotes(queryset):
+    """Annotate replies with ``total_upvotes``, the column plus its shards."""
+    shards = (
+        DiscussionReplyUpvoteShard.objects.filter(reply=OuterRef('pk'))
+        .order_by().values('reply').annotate(total=Sum('count')).values('total')
+    )
+    return queryset.annotate(total_upvotes=F('upvotes') + Coalesce(Subquery(shards), 0))
+
+
+def upvote_count(reply_id):
+    return with_upvotes(DiscussionReply.objects.filter(pk=reply_id)).values_list('total_upvotes', flat=True).get()
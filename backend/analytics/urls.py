@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     DiscussionListCreateView, DiscussionDetailView,
@@ -6,6 +7,9 @@ from .views import (
 
 app_name = 'analytics'
 
+if settings.ASYNC_VIEWS:
+    from .async_views import AsyncDiscussionListCreateView as DiscussionListCreateView
+
 urlpatterns = [
     path('discussions/', DiscussionListCreateView.as_view(), name='discussion_list'),
     path('discussions/<uuid:pk>/', DiscussionDetailView.as_view(), name='discussion_detail'),
@@ -0,0 +1,28 @@
+"""
+Per-discussion version numbers used to validate conditional GETs.
+
+A discussion's own row carries updated_at, but replies and votes change what
+its detail endpoint returns without touching that row, so they bump this
+version instead. Without a shared cache the versions are kept in the
+database, so a reply posted through one worker reaches the ETags of all.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from slokcamp.conditional import SharedVersions
+
+
+def _key(discussion_id):
+    return f'discussion-version:{discussion_id}'
+
+
+def discussion_version(discussion_id):
+    return SharedVersions(cache).get(_key(discussion_id))
+
+
+def discussion_modified(discussion_id):
+    return SharedVersions(cache).modified(_key(discussion_id))
+
+
+def bump_discussion_version(discussion_id):
+    transaction.on_commit(lambda: SharedVersions(cache).bump(_key(discussion_id)))
@@ -0,0 +1,127 @@
+"""
+Write-behind buffer for Discussion.views.
+
+A view only touches the shared cache: it bumps a pending counter that is
+later added to the row with one F() update per discussion, and a running
+total that is what readers see, so the reported count never goes backwards
+while pending views are being persisted. `manage.py flush_discussion_views
+--every N` persists them; a cache lock makes sure only one flush runs at a
+time. Without a shared cache (SHARED_CACHE) each view is written straight to
+the row instead, since no flusher could see the other workers' buffers.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import Discussion
+
+PREFIX = 'discussion-views'
+SEQUENCE_KEY = f'{PREFIX}:seq'
+FLUSHED_KEY = f'{PREFIX}:flushed'
+FLUSH_LOCK_KEY = f'{PREFIX}:flush-lock'
+
+# Running totals are re-seeded from the row once they expire
+TOTAL_TIMEOUT = 24 * 60 * 60
+
+
+def _pending_key(discussion_id):
+    return f'{PREFIX}:pending:{discussion_id}'
+
+
+def _total_key(discussion_id):
+    return f'{PREFIX}:total:{discussion_id}'
+
+
+def _slot_key(slot):
+    return f'{PREFIX}:dirty:{slot}'
+
+
+def _incr(key, delta=1, timeout=None):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key, delta)
+
+
+def _mark_dirty(discussion_id):
+    cache.set(_slot_key(_incr(SEQUENCE_KEY)), str(discussion_id), timeout=None)
+
+
+def record_view(discussion):
+    """Count one view of ``discussion`` and return its up-to-date total."""
+    if not settings.SHARED_CACHE:
+        Discussion.objects.filter(pk=discussion.pk).update(views=F('views') + 1)
+        return discussion.views + 1
+    pending = _incr(_pending_key(discussion.pk))
+    if pending == 1:
+        _mark_dirty(discussion.pk)
+    try:
+        return cache.incr(_total_key(discussion.pk))
+    except ValueError:
+        total = discussion.views + pending
+        if cache.add(_total_key(discussion.pk), total, timeout=TOTAL_TIMEOUT):
+            return total
+        return cache.incr(_total_key(discussion.pk))
+
+
+def current_views(discussions):
+    """Return ``{discussion_id: views}`` including views not yet persisted."""
+    if not settings.SHARED_CACHE:
+        return {d.pk: d.views for d in discussions}
+    totals = cache.get_many([_total_key(d.pk) for d in discussions])
+    missing = [d for d in discussions if _total_key(d.pk) not in totals]
+    pending = cache.get_many([_pending_key(d.pk) for d in missing])
+    views = {d.pk: totals[_total_key(d.pk)] for d in discussions if _total_key(d.pk) in totals}
+    for discussion in missing:
+        views[discussion.pk] = discussion.views + pending.get(_pending_key(discussion.pk), 0)
+    return views
+
+
+def flush():
+    """Persist pending views to the database. Returns the number of rows updated."""
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=60):
+        return 0
+    try:
+        flushed = cache.get(FLUSHED_KEY, 0)
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        if sequence <= flushed:
+            return 0
+        slots = list(range(flushed + 1, sequence + 1))
+        dirty = cache.get_many([_slot_key(slot) for slot in slots])
+        # A slot can be numbered but not yet written by a concurrent view;
+        # stop short of it so it is picked up by the next flush.
+        for slot in slots:
+            if _slot_key(slot) not in dirty:
+                sequence = slot - 1
+                break
+        slots = slots[:sequence - flushed]
+        ids = {dirty[_slot_key(slot)] for slot in slots}
+        pending = cache.get_many([_pending_key(pk) for pk in ids])
+
+        # Claim the views before writing them: a flush that dies in between
+        # loses that batch rather than counting it again on the next run
+        claimed = {}
+        for pk in ids:
+            count = pending.get(_pending_key(pk), 0)
+            if count:
+                claimed[pk] = count
+                if cache.decr(_pending_key(pk), count) > 0:
+                    # Views that arrived since the read keep the id dirty
+                    _mark_dirty(pk)
+        try:
+            with transaction.atomic():
+                for pk, count in claimed.items():
+                    Discussion.objects.filter(pk=pk).update(views=F('views') + count)
+        except Exception:
+            # Hand the claimed views back for the next flush
+            for pk, count in claimed.items():
+                if _incr(_pending_key(pk), count) == count:
+                    _mark_dirty(pk)
+            raise
+        cache.set(FLUSHED_KEY, sequence, timeout=None)
+        cache.delete_many([_slot_key(slot) for slot in slots])
+        return len(claimed)
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
@@ -1,12 +1,27 @@
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from slokcamp.conditional import ConditionalGetMixin
+from slokcamp.pagination import KeysetPagination
 from .models import Discussion, DiscussionReply
+from .search import search_discussions
 from .serializers import DiscussionSerializer, DiscussionDetailSerializer, DiscussionReplySerializer
+from .upvotes import unvote, upvote, upvote_count, with_upvotes
+from .versions import discussion_modified, discussion_version
+from .view_counts import current_views, record_view
 
 class DiscussionListCreateView(generics.ListCreateAPIView):
-    queryset = Discussion.objects.all()
+    queryset = Discussion.objects.select_related('user').annotate(
+        replies_total=Subquery(
+            DiscussionReply.objects.filter(discussion=OuterRef('pk'))
+            .order_by().values('discussion').annotate(n=Count('pk')).values('n')
+        )
+    )
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    views = None
     
     def get_serializer_class(self):
         return DiscussionSerializer
@@ -19,24 +34,59 @@ class DiscussionListCreateView(generics.ListCreateAPIView):
         if course_id:
             queryset = queryset.filter(course_id=course_id)
         if search:
-            queryset = queryset.filter(title__icontains=search)
+            queryset = search_discussions(queryset, search)
         
         return queryset
     
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.views = current_views(page)
+        return page
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['views'] = self.views or {}
+        return context
+    
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class DiscussionDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Discussion.objects.all()
+class DiscussionDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Discussion.objects.prefetch_related(
+        Prefetch('replies', queryset=with_upvotes(DiscussionReply.objects.select_related('user')))
+    )
     serializer_class = DiscussionDetailSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    # Always revalidate so every view reaches record_view()
+    cache_control = {'public': True, 'no_cache': True}
+    discussion = None
+    views = None
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.views += 1
-        instance.save()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    def get(self, request, *args, **kwargs):
+        # Count the view before the ETag check, a 304 is still a view. The
+        # count is buffered in a shared cache; without one every view,
+        # revalidations included, is an UPDATE (see analytics.view_counts).
+        self.discussion = get_object_or_404(Discussion.objects.only('id', 'views', 'updated_at'), pk=kwargs['pk'])
+        self.views = {self.discussion.pk: record_view(self.discussion)}
+        return super().get(request, *args, **kwargs)
+    
+    def get_etag(self, request, *args, **kwargs):
+        # The view count is left out on purpose, it changes on every request
+        return '%s-%s-%s' % (
+            self.discussion.updated_at.timestamp(),
+            discussion_version(self.discussion.pk),
+            request.accepted_renderer.format,
+        )
+    
+    def get_last_modified(self, request, *args, **kwargs):
+        modified = discussion_modified(self.discussion.pk)
+        return max(self.discussion.updated_at, modified) if modified else self.discussion.updated_at
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['views'] = self.views or {}
+        return context
     
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -69,13 +119,21 @@ class DiscussionReplyUpvoteView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, pk):
+        return self.vote(request, pk, upvote)
+    
+    def delete(self, request, pk):
+        return self.vote(request, pk, unvote)
+    
+    def vote(self, request, pk, action):
         try:
             reply = DiscussionReply.objects.get(id=pk)
-            reply.upvotes += 1
-            reply.save()
-            return Response({'upvotes': reply.upvotes})
         except DiscussionReply.DoesNotExist:
             return Response(
                 {"detail": "Reply not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        action(reply, request.user)
+        return Response({
+            'upvotes': upvote_count(reply.pk),
+            'upvoted': action is upvote,
+        })
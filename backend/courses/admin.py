@@ -1,4 +1,5 @@
 from django.contrib import admin
+from slokcamp.admin import ShardedModelAdmin
 from .models import Course, Lesson, Enrollment, LessonProgress, Review
 
 class LessonInline(admin.TabularInline):
@@ -18,9 +19,10 @@ class CourseAdmin(admin.ModelAdmin):
         ('Course Info', {'fields': ('title', 'short_description', 'description', 'category', 'difficulty')}),
         ('Instructor', {'fields': ('instructor_name', 'instructor_bio', 'instructor_image')}),
         ('Media', {'fields': ('thumbnail_image',)}),
-        ('Stats', {'fields': ('rating', 'total_reviews', 'total_students', 'duration_hours')}),
+        ('Stats', {'fields': ('rating', 'total_reviews', 'total_students', 'lessons_count', 'duration_hours')}),
         ('Publishing', {'fields': ('is_published',)}),
     )
+    readonly_fields = ('rating', 'total_reviews', 'total_students', 'lessons_count')
 
 @admin.register(Lesson)
 class LessonAdmin(admin.ModelAdmin):
@@ -35,10 +37,10 @@ class EnrollmentAdmin(admin.ModelAdmin):
     list_filter = ('enrolled_at', 'course')
     search_fields = ('user__email', 'course__title')
     ordering = ('-enrolled_at',)
-    readonly_fields = ('enrolled_at', 'last_accessed')
+    readonly_fields = ('progress_percentage', 'completed_lessons', 'enrolled_at', 'last_accessed')
 
 @admin.register(LessonProgress)
-class LessonProgressAdmin(admin.ModelAdmin):
+class LessonProgressAdmin(ShardedModelAdmin):
     list_display = ('user', 'lesson', 'is_completed', 'completion_percentage', 'completed_at')
     list_filter = ('is_completed', 'completed_at')
     search_fields = ('user__email', 'lesson__title')
@@ -0,0 +1,38 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+
+from slokcamp.pagination import AsyncPageNumberPagination
+
+from .cache import AsyncCatalogView
+from .models import Course
+from .views import CourseDetailView, CourseListView
+
+
+class AsyncCourseListView(AsyncCatalogView):
+    drf_view = CourseListView
+
+    async def build(self, request):
+        view = self.get_drf_view(request)
+        if request.query_params.get('search'):
+            # Ranking the matches runs queries while building the queryset
+            queryset = await sync_to_async(view.get_queryset)()
+        else:
+            queryset = view.get_queryset()
+        paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(queryset, request, view)
+        if page is None:
+            return view.get_serializer([course async for course in queryset], many=True).data
+        return paginator.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+
+class AsyncCourseDetailView(AsyncCatalogView):
+    drf_view = CourseDetailView
+
+    async def build(self, request, pk):
+        view = self.get_drf_view(request, pk=pk)
+        try:
+            # aget() runs the query and its prefetches together
+            course = await view.get_queryset().aget(pk=pk)
+        except Course.DoesNotExist:
+            raise Http404
+        return view.get_serializer(course).data
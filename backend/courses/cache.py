@@ -0,0 +1,168 @@
+"""
+Versioned response cache for the public course catalog.
+
+Every cached response is keyed on the catalog version, so bumping the version
+after a Course, Lesson or Review change orphans all earlier entries at once
+without scanning for keys; they simply age out after CATALOG_CACHE_TTL.
+Enrollments do not bump it, or every enrollment would empty the cache: the
+student counts of cached responses may lag by up to CATALOG_CACHE_TTL. With a shared cache (Redis, SHARED_CACHE) the version
+lives next to the responses. Otherwise every worker caches responses of its
+own, and the version is kept in the database so a bump in one worker still
+orphans the entries of the others; the hit/miss counters are then those of
+the worker answering.
+
+Entries are built from the primary. The version is bumped when the primary
+commits, so a lagging replica would file its old rows under the new version
+(and ETag) for CATALOG_CACHE_TTL; requests the cache answers query nothing.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from slokcamp.async_views import AsyncReadView
+from slokcamp.conditional import ConditionalGetMixin, SharedVersions
+from slokcamp.db.routers import use_primary
+
+PREFIX = 'catalog'
+VERSION_KEY = f'{PREFIX}:version'
+HITS_KEY = f'{PREFIX}:hits'
+MISSES_KEY = f'{PREFIX}:misses'
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+async def _acount(key):
+    cache = get_cache()
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        return await cache.aincr(key)
+
+
+def versions():
+    return SharedVersions(get_cache())
+
+
+def catalog_version():
+    return versions().get(VERSION_KEY)
+
+
+async def acatalog_version():
+    return await versions().aget(VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response and catalog ETag."""
+    return versions().bump(VERSION_KEY)
+
+
+def bump_catalog_version_on_commit():
+    # Bumping before commit would let a reader cache the old rows under the
+    # new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+def request_digest(request, format):
+    """
+    Identify a catalog request by host, path, query and negotiated format:
+    the cached data holds absolute URLs, and the ETag differs per renderer.
+    """
+    params = sorted(request.query_params.lists())
+    return hashlib.sha1(f'{format}:{request.get_host()}{request.path}?{params}'.encode()).hexdigest()
+
+
+def request_version(request):
+    """The catalog version ``request`` is answered from, read once so its ETag and cache entry agree."""
+    if not hasattr(request, 'catalog_version'):
+        request.catalog_version = catalog_version()
+    return request.catalog_version
+
+
+def catalog_key(request, format):
+    return f'{PREFIX}:{request_version(request)}:{request_digest(request, format)}'
+
+
+def cache_stats():
+    cache = get_cache()
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    return {
+        'version': catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+class CatalogCacheMixin:
+    """Serve GET responses of a public catalog view from the versioned cache."""
+
+    def get(self, request, *args, **kwargs):
+        key = catalog_key(request, request.accepted_renderer.format)
+        data = get_cache().get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            return Response(data)
+        _count(MISSES_KEY)
+        with use_primary():
+            response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            get_cache().set(key, response.data, settings.CATALOG_CACHE_TTL)
+        return response
+
+
+class CatalogConditionalMixin(ConditionalGetMixin):
+    """Conditional GET for catalog views, validated by the catalog version alone."""
+
+    def get_etag(self, request, *args, **kwargs):
+        return f'{request_version(request)}-{request_digest(request, request.accepted_renderer.format)}'
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return versions().modified(VERSION_KEY)
+
+
+class AsyncCatalogView(AsyncReadView):
+    """
+    Async counterpart of CatalogConditionalMixin and CatalogCacheMixin, sharing
+    their ETags and cache entries. Subclasses implement ``build()``.
+    """
+    # The format JSONRenderer is negotiated as in the DRF views
+    format = 'json'
+
+    async def get_etag(self, request, *args, **kwargs):
+        self.version = await acatalog_version()
+        return f'{self.version}-{request_digest(request, self.format)}'
+
+    async def get_last_modified(self, request, *args, **kwargs):
+        return await versions().amodified(VERSION_KEY)
+
+    async def get_data(self, request, *args, **kwargs):
+        key = f'{PREFIX}:{self.version}:{request_digest(request, self.format)}'
+        data = await get_cache().aget(key)
+        if data is not None:
+            await _acount(HITS_KEY)
+            return data
+        await _acount(MISSES_KEY)
+        with use_primary():
+            data = await self.build(request, *args, **kwargs)
+        await get_cache().aset(key, data, settings.CATALOG_CACHE_TTL)
+        return data
+
+    async def build(self, request, *args, **kwargs):
+        raise NotImplementedError
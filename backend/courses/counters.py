@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+from .models import Course, Enrollment, Lesson, Review
+
+
+def average_rating(rating_total, total_reviews):
+    return Coalesce(
+        Round(Cast(rating_total, FloatField()) / NullIf(total_reviews, 0), 2),
+        Value(0.0),
+    )
+
+
+def adjust_course(course_id, lessons=0, students=0, reviews=0, rating=0):
+    """Apply counter deltas to one course in a single UPDATE."""
+    changes = {}
+    if lessons:
+        changes['lessons_count'] = F('lessons_count') + lessons
+    if students:
+        changes['total_students'] = F('total_students') + students
+    if reviews or rating:
+        # Every right-hand side sees the pre-update row, so the average is
+        # computed from the new totals without a second statement.
+        total_reviews = F('total_reviews') + reviews
+        rating_total = F('rating_total') + rating
+        changes['total_reviews'] = total_reviews
+        changes['rating_total'] = rating_total
+        changes['rating'] = average_rating(rating_total, total_reviews)
+    if changes:
+        Course.objects.filter(pk=course_id).update(**changes)
+
+
+def _count(queryset):
+    return Coalesce(
+        Subquery(queryset.values('course').annotate(n=Count('pk')).values('n')),
+        0,
+    )
+
+
+def recount(queryset):
+    """Recompute every maintained counter for the courses in ``queryset``."""
+    course = OuterRef('pk')
+    reviews = Review.objects.filter(course=course).order_by()
+    with transaction.atomic():
+        updated = queryset.update(
+            lessons_count=_count(Lesson.objects.filter(course=course, is_published=True).order_by()),
+            total_students=_count(Enrollment.objects.filter(course=course).order_by()),
+            total_reviews=_count(reviews),
+            rating_total=Coalesce(
+                Subquery(reviews.values('course').annotate(total=Sum('rating')).values('total')),
+                0,
+            ),
+        )
+        queryset.update(rating=average_rating(F('rating_total'), F('total_reviews')))
+    return updated
+
+
+def lesson_saved(lesson, created):
+    before = None if created else getattr(lesson, '_counted', None)
+    after = (lesson.course_id, lesson.is_published)
+    if not created and before is None:
+        # Saved through an instance that was never loaded from the database,
+        # so there is nothing to diff against.
+        recount(Course.objects.filter(pk=lesson.course_id))
+    elif before != after:
+        if before and before[1]:
+            adjust_course(before[0], lessons=-1)
+        if after[1]:
+            adjust_course(after[0], lessons=1)
+    lesson._counted = after
+
+
+def lesson_deleted(lesson):
+    course_id, is_published = getattr(lesson, '_counted', (lesson.course_id, lesson.is_published))
+    if is_published:
+        adjust_course(course_id, lessons=-1)
+
+
+def enrollment_saved(enrollment, created):
+    if created:
+        adjust_course(enrollment.course_id, students=1)
+
+
+def enrollment_deleted(enrollment):
+    adjust_course(enrollment.course_id, students=-1)
+
+
+def review_saved(review, created):
+    if created:
+        adjust_course(review.course_id, reviews=1, rating=review.rating)
+    elif getattr(review, '_counted', None) is None:
+        recount(Course.objects.filter(pk=review.course_id))
+    else:
+        course_id, rating = review._counted
+        if course_id != review.course_id:
+            adjust_course(course_id, reviews=-1, rating=-rating)
+            adjust_course(review.course_id, reviews=1, rating=review.rating)
+        elif rating != review.rating:
+            adjust_course(course_id, rating=review.rating - rating)
+    review._counted = (review.course_id, review.rating)
+
+
+def review_deleted(review):
+    course_id, rating = getattr(review, '_counted', (review.course_id, review.rating))
+    adjust_course(course_id, reviews=-1, rating=-rating)
@@ -0,0 +1,115 @@
+"""
+The learner dashboard: enrollments with progress and the lesson to resume,
+recent activity, XP and streak, in one response.
+
+It always costs the same four queries whatever the number of enrollments,
+two of them on the user's shard (five when that is not the primary), and the
+result is cached per user. The cache key carries a per-user version that
+progress writes, enrollments and new activity bump; renamed courses and
+lessons show up once the entry expires after DASHBOARD_CACHE_TTL. Only a
+shared cache (SHARED_CACHE) is used: a per-process cache would miss the
+bumps of the other workers, so without one the dashboard is built on every
+request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+
+from accounts.serializers import UserSerializer
+from analytics.models import UserActivity
+from slokcamp.conditional import bump_version, get_version
+from slokcamp.db.sharding import shard_for
+
+from .models import Enrollment, Lesson, LessonProgress
+from .serializers import EnrollmentSerializer
+
+RECENT_ACTIVITY = 10
+
+
+def _version_key(user_id):
+    return f'dashboard-version:{user_id}'
+
+
+def bump_dashboard(user_id):
+    """Invalidate the cached dashboard of ``user_id`` once the transaction commits."""
+    transaction.on_commit(lambda: bump_version(cache, _version_key(user_id)))
+
+
+def _first_unfinished(course_ids, completed):
+    """Ids of the first published lesson of each course that is not in ``completed``."""
+    first = {}
+    lessons = Lesson.objects.filter(course_id__in=course_ids, is_published=True).order_by('course_id', 'order', 'id')
+    for lesson_id, course_id in lessons.values_list('id', 'course_id').iterator():
+        if course_id not in first and lesson_id not in completed:
+            first[course_id] = lesson_id
+    return first.values()
+
+
+def next_lessons(course_ids, user, shard, completed):
+    """The first published lesson of each course that ``user`` has not completed."""
+    lessons = Lesson.objects.filter(course_id__in=course_ids, is_published=True)
+    if shard == settings.DATABASE_SHARDS[0]:
+        # The progress is next to the lessons (replicas copy the primary)
+        lessons = lessons.exclude(Exists(
+            LessonProgress.objects.filter(user=user, lesson=OuterRef('pk'), is_completed=True)
+        ))
+    else:
+        lessons = lessons.filter(id__in=list(_first_unfinished(course_ids, completed)))
+    lessons = (
+        lessons.annotate(rank=Window(RowNumber(), partition_by=F('course_id'), order_by=[F('order'), F('id')]))
+        .filter(rank=1)
+        .only('id', 'course_id', 'title', 'order', 'lesson_type', 'duration_minutes')
+    )
+    return {lesson.course_id: lesson for lesson in lessons}
+
+
+def build_dashboard(user):
+    shard = shard_for(user)
+    enrollments = list(
+        Enrollment.objects.filter(user=user).select_related('course').order_by('-last_accessed')
+    )
+    # Progress is on the shard, so it cannot be joined to the lessons
+    progress = LessonProgress.objects.using(shard).filter(user=user)
+    positions = {}
+    completed = set()
+    for lesson_id, is_completed, position in progress.values_list(
+        'lesson_id', 'is_completed', 'last_position_seconds'
+    ):
+        positions[lesson_id] = position
+        if is_completed:
+            completed.add(lesson_id)
+    lessons = next_lessons([enrollment.course_id for enrollment in enrollments], user, shard, completed)
+    activity = UserActivity.objects.using(shard).filter(user=user).values(
+        'id', 'activity_type', 'metadata', 'created_at'
+    )[:RECENT_ACTIVITY]
+
+    items = []
+    for enrollment, data in zip(enrollments, EnrollmentSerializer(enrollments, many=True).data):
+        lesson = lessons.get(enrollment.course_id)
+        data['next_lesson'] = lesson and {
+            'id': lesson.id,
+            'title': lesson.title,
+            'order': lesson.order,
+            'lesson_type': lesson.lesson_type,
+            'duration_minutes': lesson.duration_minutes,
+            'last_position_seconds': positions.get(lesson.id, 0),
+        }
+        items.append(data)
+    return {
+        'user': UserSerializer(user).data,
+        'enrollments': items,
+        'recent_activity': list(activity),
+    }
+
+
+def get_dashboard(user):
+    if not settings.SHARED_CACHE:
+        return build_dashboard(user)
+    key = f'dashboard:{user.pk}:{get_version(cache, _version_key(user.pk))}'
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(user)
+        cache.set(key, data, settings.DASHBOARD_CACHE_TTL)
+    return data
@@ -0,0 +1,293 @@
+"""
+XP leaderboards: global, per course and for the current week.
+
+Each worker process keeps the boards it serves as a SortedList of integer
+keys ordering users by score, highest first, then by id. A rank is one
+bisection, the top N and a user's neighbours are slices next to an index
+lookup, and an update is a remove plus an insert: all O(log n) however many
+learners there are. Boards are loaded from the indexed score columns
+(User.total_xp, Enrollment.xp_earned, WeeklyXP.xp) on first use, or when
+the process starts through warm().
+
+Processes learn about XP earned through the others from a CacheJournal:
+every committed award appends an event with the user's new absolute
+scores, and each read first applies the events it has not seen.
+Because scores are absolute, replaying an event is harmless. A process
+that falls too far behind, finds an event evicted or has held its boards
+for LEADERBOARD_RELOAD_INTERVAL seconds drops them and reloads.
+
+The journal needs a shared cache (SHARED_CACHE); in a per-process cache no
+worker would hear of the others' awards. Without one, boards are read from
+the score columns on every request instead (StoredBoard), a handful of index
+range scans and counts.
+"""
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from sortedcontainers import SortedList
+
+from slokcamp.db.routers import use_primary
+from slokcamp.journal import CacheJournal
+
+from .models import Enrollment, WeeklyXP
+
+SCORE_LIMIT = 1 << 63
+ID_BITS = 128
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def _as_int(user_id):
+    if isinstance(user_id, int):
+        return user_id
+    return (user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))).int
+
+
+def _key(user_id, score):
+    return (SCORE_LIMIT - score) << ID_BITS | user_id
+
+
+class Leaderboard:
+    """Users with a positive score, highest first; ties ordered by user id."""
+
+    def __init__(self, scores=()):
+        self.scores = {}
+        for user_id, score in scores:
+            if score > 0:
+                self.scores[_as_int(user_id)] = score
+        self.keys = SortedList(_key(user_id, score) for user_id, score in self.scores.items())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set(self, user_id, score):
+        user_id = _as_int(user_id)
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self.keys.remove(_key(user_id, old))
+        if score > 0:
+            self.scores[user_id] = score
+            self.keys.add(_key(user_id, score))
+
+    def score(self, user_id):
+        return self.scores.get(_as_int(user_id), 0)
+
+    def rank(self, user_id):
+        """One more than the number of users with a strictly higher score."""
+        return self.keys.bisect_left(_key(0, self.score(user_id))) + 1
+
+    def entries(self, start, stop):
+        entries = []
+        previous = rank = None
+        for position, key in enumerate(self.keys.islice(start, stop), start):
+            score = SCORE_LIMIT - (key >> ID_BITS)
+            if score != previous:
+                rank = self.keys.bisect_left(_key(0, score)) + 1 if previous is None else position + 1
+                previous = score
+            entries.append({'rank': rank, 'user_id': uuid.UUID(int=key & ID_MASK), 'score': score})
+        return entries
+
+    def top(self, count):
+        return self.entries(0, count)
+
+    def around(self, user_id, count):
+        """Up to ``count`` users either side of ``user_id``, who is included when ranked."""
+        user_id = _as_int(user_id)
+        score = self.scores.get(user_id)
+        position = self.keys.index(_key(user_id, score)) if score else len(self.keys)
+        return self.entries(max(position - count, 0), position + count + 1)
+
+
+journal = CacheJournal('leaderboard')
+_lock = threading.RLock()
+_boards = {}
+_applied = None
+_loaded_at = 0.0
+
+
+def global_board():
+    return 'global'
+
+
+def course_board(course_id):
+    return f'course:{course_id}'
+
+
+def weekly_board(week=None):
+    if week is None:
+        today = timezone.localdate()
+        week = today - timedelta(days=today.weekday())
+    return f'weekly:{week.isoformat()}'
+
+
+def _source(name):
+    """The rows of board ``name`` with a positive score, its user id and its score column."""
+    kind, _, arg = name.partition(':')
+    if kind == 'course':
+        return Enrollment.objects.filter(course_id=arg, xp_earned__gt=0), 'user_id', 'xp_earned'
+    if kind == 'weekly':
+        return WeeklyXP.objects.filter(week=arg, xp__gt=0), 'user_id', 'xp'
+    return get_user_model().objects.filter(total_xp__gt=0), 'pk', 'total_xp'
+
+
+class StoredBoard:
+    """
+    Board ``name`` answered from its indexed score column, like a Leaderboard
+    loaded on every call.
+    """
+
+    def __init__(self, name):
+        self.rows, self.user, self.field = _source(name)
+        self.scores = {}
+
+    def __len__(self):
+        return self.rows.count()
+
+    def _values(self, queryset, *ordering):
+        return list(queryset.order_by(*ordering).values_list(self.user, self.field))
+
+    def _higher(self, score):
+        return self.rows.filter(**{f'{self.field}__gt': score}).count()
+
+    def score(self, user_id):
+        if user_id not in self.scores:
+            score = self.rows.filter(**{self.user: user_id}).values_list(self.field, flat=True).first()
+            self.scores[user_id] = score or 0
+        return self.scores[user_id]
+
+    def rank(self, user_id):
+        return self._higher(self.score(user_id)) + 1
+
+    def _entries(self, rows, start):
+        entries = []
+        previous = rank = None
+        for position, (user_id, score) in enumerate(rows, start):
+            if score != previous:
+                rank = self._higher(score) + 1 if previous is None and position else position + 1
+                previous = score
+            entries.append({'rank': rank, 'user_id': user_id, 'score': score})
+        return entries
+
+    def top(self, count):
+        return self._entries(self._values(self.rows, f'-{self.field}', self.user)[:count], 0)
+
+    def around(self, user_id, count):
+        score = self.score(user_id)
+        if not score:
+            before = self._values(self.rows, self.field, f'-{self.user}')[:count]
+            return self._entries(before[::-1], len(self) - len(before))
+        tie = {self.field: score}
+        before = self._values(self.rows.filter(**tie, **{f'{self.user}__lt': user_id}), f'-{self.user}')[:count]
+        position = self._higher(score) + self.rows.filter(**tie, **{f'{self.user}__lt': user_id}).count()
+        if len(before) < count:
+            higher = self.rows.filter(**{f'{self.field}__gt': score})
+            before += self._values(higher, self.field, f'-{self.user}')[:count - len(before)]
+        after = self._values(self.rows.filter(**tie, **{f'{self.user}__gt': user_id}), self.user)[:count]
+        if len(after) < count:
+            lower = self.rows.filter(**{f'{self.field}__lt': score})
+            after += self._values(lower, f'-{self.field}', self.user)[:count - len(after)]
+        return self._entries(before[::-1] + [(user_id, score)] + after, position - len(before))
+
+
+def load(name):
+    rows, user, field = _source(name)
+    # From the primary, so no score older than the journal position is read
+    with use_primary():
+        return Leaderboard(rows.values_list(user, field).iterator(chunk_size=10000))
+
+
+def _reset(seq):
+    global _applied, _loaded_at
+    _boards.clear()
+    _applied = seq
+    _loaded_at = time.monotonic()
+
+
+def _sync():
+    global _applied
+    stale = time.monotonic() - _loaded_at > settings.LEADERBOARD_RELOAD_INTERVAL
+    position, events = journal.read(None if stale else _applied)
+    if events is None:
+        _reset(position)
+        return
+    for user_id, scores in events:
+        for name, score in scores:
+            board = _boards.get(name)
+            if board is not None:
+                board.set(user_id, score)
+    _applied = position
+
+
+def get_board(name):
+    """The up-to-date board ``name``, loading it if this process has not yet."""
+    with _lock:
+        _sync()
+        board = _boards.get(name)
+        if board is None:
+            if name.startswith('weekly:'):
+                for stale in [key for key in _boards if key.startswith('weekly:')]:
+                    del _boards[stale]
+            board = _boards[name] = load(name)
+        return board
+
+
+def warm():
+    """Load the global and weekly boards, e.g. when a worker starts."""
+    try:
+        get_board(global_board())
+        get_board(weekly_board())
+    finally:
+        # Runs in its own thread: hand the connection back
+        connection.close()
+
+
+def publish(user_id, course_ids, week):
+    """Append the current scores of ``user_id`` to the journal."""
+    User = get_user_model()
+    with use_primary():
+        scores = [(global_board(), User.objects.filter(pk=user_id).values_list('total_xp', flat=True).first() or 0)]
+        scores += [
+            (course_board(course_id), xp)
+            for course_id, xp in Enrollment.objects.filter(user_id=user_id, course_id__in=course_ids)
+            .values_list('course_id', 'xp_earned')
+        ]
+        weekly = WeeklyXP.objects.filter(user_id=user_id, week=week).values_list('xp', flat=True).first()
+    scores.append((weekly_board(week), weekly or 0))
+    journal.append((str(user_id), scores))
+
+
+def publish_on_commit(user_id, course_ids, week):
+    # Without a shared cache no process keeps boards to tell, see standings()
+    if settings.SHARED_CACHE:
+        transaction.on_commit(lambda: publish(user_id, course_ids, week))
+
+
+def reload_all():
+    """Make every process reload its boards, e.g. after a bulk rebuild."""
+    journal.skip()
+
+
+def _read(board, user, limit, neighbours):
+    me = {'rank': board.rank(user.pk), 'score': board.score(user.pk)}
+    return len(board), board.top(limit), board.around(user.pk, neighbours), me
+
+
+def standings(name, user, limit, neighbours):
+    """The top ``limit`` of board ``name`` and ``user``'s rank and neighbours."""
+    if settings.SHARED_CACHE:
+        with _lock:
+            size, top, around, me = _read(get_board(name), user, limit, neighbours)
+    else:
+        size, top, around, me = _read(StoredBoard(name), user, limit, neighbours)
+    names = dict(
+        get_user_model().objects.filter(pk__in={entry['user_id'] for entry in top + around})
+        .values_list('pk', 'full_name')
+    )
+    for entry in top + around:
+        entry['full_name'] = names.get(entry['user_id'], '')
+    return {'board': name, 'size': size, 'me': me, 'top': top, 'around': around}
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from slokcamp.db.sharding import is_sharded
+from slokcamp.ids import time_keyed_models, uuid7
+
+
+class Command(BaseCommand):
+    help = (
+        'Rewrite the random (v4) ids of tables nothing refers to as time-ordered ids of their creation time, '
+        'so they can be paged by id alone (KEYSET_BY_ID). Run with TIME_ORDERED_IDS on; safe to interrupt and rerun'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the ids to rewrite')
+
+    def handle(self, *args, **options):
+        if not settings.TIME_ORDERED_IDS and not options['dry_run']:
+            # New rows would keep getting random ids
+            raise CommandError('Set TIME_ORDERED_IDS=1 for the deployment first')
+        for model, created_field in sorted(time_keyed_models().items(), key=lambda item: item[0]._meta.label):
+            databases = settings.DATABASE_SHARDS if is_sharded(model) else [DEFAULT_DB_ALIAS]
+            rewritten = 0
+            for database in databases:
+                rewritten += self.backfill(model, created_field, database, options['batch_size'], options['dry_run'])
+            action = 'to rewrite' if options['dry_run'] else 'rewritten'
+            self.stdout.write(f'{model._meta.label}: {rewritten} ids {action}')
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def backfill(self, model, created_field, database, batch_size, dry_run):
+        rows = model._base_manager.using(database).order_by('pk')
+        rewritten, last = 0, None
+        while True:
+            batch = rows.filter(pk__gt=last) if last is not None else rows
+            batch = list(batch.values_list('pk', created_field)[:batch_size])
+            if not batch:
+                return rewritten
+            last = batch[-1][0]
+            # Rewritten ids may sort after ``last`` and come round again
+            batch = [(pk, created) for pk, created in batch if pk.version != 7]
+            rewritten += len(batch)
+            if dry_run:
+                continue
+            with transaction.atomic(using=database):
+                for pk, created in batch:
+                    model._base_manager.using(database).filter(pk=pk).update(id=uuid7(at=created))
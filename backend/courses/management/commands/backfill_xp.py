@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.cache import bump_user
+from courses import leaderboard
+from courses.dashboard import bump_dashboard
+from courses.xp import rebuild
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild XP, streaks and enrollment progress of all or the given users from their completed lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', help='Only rebuild these users')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        if options['user_ids']:
+            ids = ids.filter(pk__in=options['user_ids'])
+        ids = list(ids)
+        updated = 0
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            updated += rebuild(User.objects.filter(pk__in=batch))
+            for user_id in batch:
+                bump_dashboard(user_id)
+                bump_user(user_id)
+        leaderboard.reload_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt XP, streaks and enrollment progress for {updated} users'))
@@ -0,0 +1,47 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.leaderboard import Leaderboard
+
+
+def _per_call(func, args):
+    start = time.perf_counter()
+    for arg in args:
+        func(arg)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+class Command(BaseCommand):
+    help = 'Time leaderboard builds, rank lookups and updates with synthetic learners'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='Numbers of learners to benchmark',
+        )
+        parser.add_argument('--lookups', type=int, default=10000, help='Operations timed per size')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f'{"learners":>10} {"build s":>8} {"top10 us":>9} {"rank us":>8} '
+            f'{"around us":>10} {"update us":>10}'
+        )
+        for size in options['sizes']:
+            # XP is heavily skewed: most learners have little, a few a lot
+            scores = [(rng.getrandbits(128), int(rng.paretovariate(1.2) * 10)) for _ in range(size)]
+            start = time.perf_counter()
+            board = Leaderboard(scores)
+            build = time.perf_counter() - start
+
+            users = [user_id for user_id, _ in rng.sample(scores, min(options['lookups'], size))]
+            top = _per_call(lambda _: board.top(10), users)
+            rank = _per_call(board.rank, users)
+            around = _per_call(lambda user_id: board.around(user_id, 2), users)
+            update = _per_call(lambda user_id: board.set(user_id, board.score(user_id) + 10), users)
+            self.stdout.write(
+                f'{size:>10} {build:>8.2f} {top:>9.1f} {rank:>8.1f} {around:>10.1f} {update:>10.1f}'
+            )
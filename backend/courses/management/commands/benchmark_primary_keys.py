@@ -0,0 +1,100 @@
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from analytics.models import UserActivity
+from courses.models import LessonProgress
+from slokcamp.ids import uuid7
+
+ALIAS = 'benchmark-primary-keys'
+KEYS = {'uuid4': uuid.uuid4, 'uuid7': uuid7}
+
+
+def _progress(rng, make_id, index):
+    # 40 lessons per learner, so (user, lesson) stays unique
+    return LessonProgress(
+        id=make_id(), user_id=uuid.UUID(int=index // 40), lesson_id=uuid.UUID(int=index % 40),
+        last_position_seconds=rng.randrange(3600),
+    )
+
+
+def _activity(rng, make_id, index):
+    return UserActivity(
+        id=make_id(), user_id=uuid.UUID(int=rng.randrange(10000)), activity_type='lesson_complete',
+    )
+
+
+def _sizes(connection):
+    """Bytes of each table and index, from SQLite's dbstat."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT name, SUM(pgsize), SUM(unused) FROM dbstat GROUP BY name')
+        return {name: (size, unused) for name, size, unused in cursor.fetchall()}
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert throughput and table and index sizes of lesson_progress and user_activities '
+        'with random (v4) and time-ordered (v7) primary keys, each in a fresh SQLite database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Rows inserted per table')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per insert and transaction')
+        parser.add_argument(
+            '--cache-kib', type=int, default=2000,
+            help='SQLite page cache; keep it well below the index size, as on a table larger than memory',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"table":<16} {"keys":<6} {"rows/s":>8} {"table MiB":>10} {"pk index MiB":>13} {"pk index free":>14}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for table, model, make_row in [
+                ('lesson_progress', LessonProgress, _progress),
+                ('user_activities', UserActivity, _activity),
+            ]:
+                for keys, make_id in KEYS.items():
+                    self.run(directory, table, model, make_row, keys, make_id, options)
+
+    def run(self, directory, table, model, make_row, keys, make_id, options):
+        connections.settings[ALIAS] = dict(
+            connections.settings['default'], ENGINE='slokcamp.db.sqlite3',
+            PRAGMAS=dict(settings.SQLITE_PRAGMAS, cache_size=-options['cache_kib'], mmap_size=0),
+            JOURNAL_MODE=settings.SQLITE_JOURNAL_MODE,
+            NAME=os.path.join(directory, f'{table}-{keys}.sqlite3'),
+        )
+        connection = connections[ALIAS]
+        try:
+            connection.set_journal_mode()
+            with connection.schema_editor() as editor:
+                editor.create_model(model)
+            rng = random.Random(options['seed'])
+            rows = options['rows']
+            batch_size = options['batch_size']
+            start = time.perf_counter()
+            for offset in range(0, rows, batch_size):
+                batch = [make_row(rng, make_id, index) for index in range(offset, min(offset + batch_size, rows))]
+                with transaction.atomic(using=ALIAS):
+                    model.objects.using(ALIAS).bulk_create(batch)
+            elapsed = time.perf_counter() - start
+
+            sizes = _sizes(connection)
+            # SQLite keeps a char(32) primary key in an index beside the rowid table
+            pk_index = next(name for name in sizes if name.startswith(f'sqlite_autoindex_{table}_1'))
+            index_size, index_unused = sizes[pk_index]
+            self.stdout.write(
+                f'{table:<16} {keys:<6} {rows / elapsed:>8.0f} {sizes[table][0] / 2**20:>10.1f} '
+                f'{index_size / 2**20:>13.1f} {index_unused / index_size:>13.0%}'
+            )
+        finally:
+            connection.close()
+            del connections[ALIAS]
+            del connections.settings[ALIAS]
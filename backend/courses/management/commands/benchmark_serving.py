@@ -0,0 +1,100 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+
+BENCH_EMAIL = 'benchmark@slokcamp.local'
+BENCH_PASSWORD = 'benchmark-password'
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def _worker(base, requests, latencies, errors):
+    parts = urlsplit(base)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    for method, path, body in requests:
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+            elif response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+        except (OSError, http.client.HTTPException) as exc:
+            errors.append(exc)
+            connection.close()
+        latencies.append((path, time.perf_counter() - start))
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and latency of running deployments, e.g. the WSGI and ASGI profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', dest='targets', metavar='NAME=URL',
+            help='Deployment to benchmark (default wsgi=http://localhost:8000 and asgi=http://localhost:8001)',
+        )
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per read scenario')
+        parser.add_argument('--signins', type=int, default=64, help='Sign-ins in the mixed scenario')
+
+    def handle(self, *args, **options):
+        targets = [target.split('=', 1) for target in options['targets'] or [
+            'wsgi=http://localhost:8000', 'asgi=http://localhost:8001',
+        ]]
+        User = get_user_model()
+        if not User.objects.filter(email=BENCH_EMAIL).exists():
+            User.objects.create_user(email=BENCH_EMAIL, password=BENCH_PASSWORD, full_name='Benchmark')
+        course = Course.objects.filter(is_published=True).values_list('id', flat=True).first()
+        signin = json.dumps({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+
+        count = options['requests']
+        scenarios = [
+            ('catalog', [('GET', '/api/courses/', None)] * count),
+            ('course detail', [('GET', f'/api/courses/{course}/', None)] * count),
+            ('discussions', [('GET', '/api/discussions/', None)] * count),
+            # Reads while sign-ins hash passwords: only the reads' latency is reported
+            ('catalog + signin', [
+                request
+                for index in range(count)
+                for request in [('GET', '/api/courses/', None)]
+                + ([('POST', '/api/auth/signin/', signin)] if index < options['signins'] else [])
+            ]),
+        ]
+
+        self.stdout.write(f'{"target":<8} {"scenario":<18} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}')
+        for name, base in targets:
+            for scenario, requests in scenarios:
+                latencies, errors = [], []
+                workers = [
+                    threading.Thread(target=_worker, args=(
+                        base, requests[index::options['concurrency']], latencies, errors,
+                    ))
+                    for index in range(options['concurrency'])
+                ]
+                start = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - start
+                reads = [latency for path, latency in latencies if path != '/api/auth/signin/']
+                self.stdout.write(
+                    f'{name:<8} {scenario:<18} {len(latencies) / elapsed:>8.0f} '
+                    f'{_percentile(reads, 0.5) * 1000:>8.1f} {_percentile(reads, 0.99) * 1000:>8.1f} '
+                    f'{len(errors):>7}'
+                )
@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from courses.models import Lesson
+from courses.progress import record_progress
+from slokcamp.db.routers import use_primary
+
+# Connection settings compared, each on its own copy of the database
+PROFILES = {
+    # Django's SQLite defaults: rollback journal, deferred transactions
+    'django': {'ENGINE': 'django.db.backends.sqlite3', 'PRAGMAS': {}, 'JOURNAL_MODE': None, 'WRITE_LOCK': False},
+    'tuned': {
+        'ENGINE': 'slokcamp.db.sqlite3', 'PRAGMAS': settings.SQLITE_PRAGMAS,
+        'JOURNAL_MODE': settings.SQLITE_JOURNAL_MODE, 'WRITE_LOCK': False,
+    },
+    'tuned+lock': {
+        'ENGINE': 'slokcamp.db.sqlite3', 'PRAGMAS': settings.SQLITE_PRAGMAS,
+        'JOURNAL_MODE': settings.SQLITE_JOURNAL_MODE, 'WRITE_LOCK': True,
+    },
+}
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def _use_database(settings_dict):
+    """Point the default alias at ``settings_dict``; processes forked next inherit it."""
+    connections.close_all()
+    connections[DEFAULT_DB_ALIAS]  # so there is a connection to drop
+    del connections[DEFAULT_DB_ALIAS]
+    connections.settings[DEFAULT_DB_ALIAS] = settings_dict
+
+
+def _write(user, lessons, deadline, latencies, errors):
+    rng = random.Random(user.pk.int)
+    try:
+        with use_primary():
+            while time.monotonic() < deadline:
+                lesson = rng.choice(lessons)
+                if rng.random() < 0.8:
+                    data = {'last_position_seconds': rng.randrange(3600)}
+                else:
+                    data = {'is_completed': rng.random() < 0.5}
+                start = time.perf_counter()
+                try:
+                    record_progress(user, lesson, data)
+                except OperationalError as exc:
+                    errors.append(str(exc))
+                else:
+                    latencies.append(time.perf_counter() - start)
+    finally:
+        connections.close_all()
+
+
+def _worker(users, lessons, deadline, results):
+    """One worker process: a thread per user, writing progress until ``deadline``."""
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=_write, args=(user, lessons, deadline, latencies, errors))
+        for user in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare progress write throughput of worker processes on SQLite with Django\'s defaults, '
+        'the tuned connection settings, and the tuned settings with the write lock'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help='Worker processes, as gunicorn runs')
+        parser.add_argument('--threads', type=int, default=1, help='Writing threads per worker')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--profile', action='append', dest='profiles', choices=PROFILES)
+
+    def handle(self, *args, **options):
+        database = connections[DEFAULT_DB_ALIAS]
+        if database.vendor != 'sqlite' or database.is_in_memory_db():
+            raise CommandError('The default database is not an SQLite file')
+        lessons = list(Lesson.objects.filter(is_published=True)[:50])
+        if not lessons:
+            raise CommandError('No published lessons to record progress on')
+        original = connections.settings[DEFAULT_DB_ALIAS]
+        context = multiprocessing.get_context('fork')
+
+        self.stdout.write(
+            f'{"profile":<11} {"workers":>7} {"writes/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"errors":>7}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['profiles'] or list(PROFILES):
+                path = os.path.join(directory, f'{name}.sqlite3')
+                source, copy = sqlite3.connect(original['NAME']), sqlite3.connect(path)
+                source.backup(copy)
+                source.close()
+                profile = dict(original, NAME=path, **PROFILES[name])
+                profile.pop('POOL', None)
+                copy.execute(f'PRAGMA journal_mode = {profile.get("JOURNAL_MODE") or "delete"}')
+                copy.close()
+
+                _use_database(profile)
+                try:
+                    User = get_user_model()
+                    users = [
+                        User.objects.create_user(
+                            email=f'sqlite-writer-{index}@slokcamp.local', password=None,
+                            full_name='Benchmark', shard=DEFAULT_DB_ALIAS,
+                        )
+                        for index in range(options['workers'] * options['threads'])
+                    ]
+                    connections.close_all()
+
+                    results = context.Queue()
+                    deadline = time.monotonic() + options['seconds']
+                    workers = [
+                        context.Process(target=_worker, args=(
+                            users[index::options['workers']], lessons, deadline, results,
+                        ))
+                        for index in range(options['workers'])
+                    ]
+                    start = time.perf_counter()
+                    for worker in workers:
+                        worker.start()
+                    latencies, errors = [], []
+                    for _ in workers:
+                        worker_latencies, worker_errors = results.get()
+                        latencies += worker_latencies
+                        errors += worker_errors
+                    for worker in workers:
+                        worker.join()
+                    elapsed = time.perf_counter() - start
+                finally:
+                    _use_database(original)
+
+                self.stdout.write(
+                    f'{name:<11} {options["workers"]:>7} {len(latencies) / elapsed:>9.0f} '
+                    f'{_percentile(latencies, 0.5) * 1000:>8.1f} {_percentile(latencies, 0.99) * 1000:>8.1f} '
+                    f'{len(errors):>7}'
+                )
+                for error in sorted(set(errors)):
+                    self.stdout.write(f'  {errors.count(error)} x {error}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses.cache import bump_catalog_version
+from courses.counters import recount
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized lesson, student and review counters on courses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', help='Only recount these courses')
+
+    def handle(self, *args, **options):
+        queryset = Course.objects.all()
+        if options['course_ids']:
+            queryset = queryset.filter(pk__in=options['course_ids'])
+        updated = recount(queryset)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Recounted {updated} courses'))
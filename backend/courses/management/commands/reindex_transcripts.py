@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Lesson
+from courses.transcript_index import index_lesson
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the transcript search index for all or the given lessons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('lesson_ids', nargs='*', help='Only reindex these lessons')
+
+    def handle(self, *args, **options):
+        lessons = Lesson.objects.defer(None)
+        if options['lesson_ids']:
+            lessons = lessons.filter(pk__in=options['lesson_ids'])
+        segments = 0
+        for lesson in lessons.iterator(chunk_size=100):
+            segments += index_lesson(lesson)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {segments} segments'))
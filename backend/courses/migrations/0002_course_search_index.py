@@ -0,0 +1,80 @@
+from django.db import migrations
+
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(
+        course_id UNINDEXED, title, short_description, description, category, instructor_name,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO courses_fts (course_id, title, short_description, description, category, instructor_name)
+    SELECT id, title, short_description, description, category, instructor_name FROM courses
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_insert AFTER INSERT ON courses BEGIN
+        INSERT INTO courses_fts (course_id, title, short_description, description, category, instructor_name)
+        VALUES (new.id, new.title, new.short_description, new.description, new.category, new.instructor_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_update
+    AFTER UPDATE OF title, short_description, description, category, instructor_name ON courses BEGIN
+        DELETE FROM courses_fts WHERE course_id = old.id;
+        INSERT INTO courses_fts (course_id, title, short_description, description, category, instructor_name)
+        VALUES (new.id, new.title, new.short_description, new.description, new.category, new.instructor_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_delete AFTER DELETE ON courses BEGIN
+        DELETE FROM courses_fts WHERE course_id = old.id;
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS courses_fts_insert",
+    "DROP TRIGGER IF EXISTS courses_fts_update",
+    "DROP TRIGGER IF EXISTS courses_fts_delete",
+    "DROP TABLE IF EXISTS courses_fts",
+]
+
+POSTGRES_CREATE = [
+    """
+    ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(category, '') || ' ' || coalesce(instructor_name, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(short_description, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS courses_search_vector_idx ON courses USING GIN (search_vector)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS courses_search_vector_idx",
+    "ALTER TABLE courses DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def forwards(apps, schema_editor):
+    statements = {"sqlite": SQLITE_CREATE, "postgresql": POSTGRES_CREATE}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    statements = {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:22
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+
+def count_existing_rows(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    Lesson = apps.get_model("courses", "Lesson")
+    Enrollment = apps.get_model("courses", "Enrollment")
+    Review = apps.get_model("courses", "Review")
+
+    def count(queryset):
+        return Coalesce(
+            Subquery(queryset.values("course").annotate(n=Count("pk")).values("n")),
+            0,
+        )
+
+    course = OuterRef("pk")
+    reviews = Review.objects.filter(course=course).order_by()
+    Course.objects.update(
+        lessons_count=count(
+            Lesson.objects.filter(course=course, is_published=True).order_by()
+        ),
+        total_students=count(Enrollment.objects.filter(course=course).order_by()),
+        total_reviews=count(reviews),
+        rating_total=Coalesce(
+            Subquery(
+                reviews.values("course").annotate(total=Sum("rating")).values("total")
+            ),
+            0,
+        ),
+    )
+    Course.objects.update(
+        rating=Coalesce(
+            Round(
+                Cast(F("rating_total"), FloatField()) / NullIf(F("total_reviews"), 0),
+                2,
+            ),
+            Value(0.0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0003_course_title_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="lessons_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="rating_total",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
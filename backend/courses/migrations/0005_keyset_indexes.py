@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0004_course_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["user", "enrolled_at", "id"], name="enrollments_user_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["course", "created_at", "id"], name="reviews_course_keyset_idx"
+            ),
+        ),
+    ]
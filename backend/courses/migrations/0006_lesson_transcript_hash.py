@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:33
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def transcript_digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def hash_transcripts(apps, schema_editor):
+    Lesson = apps.get_model("courses", "Lesson")
+    rows = []
+    for row in Lesson.objects.only("id", "transcript").iterator(chunk_size=200):
+        row.transcript_hash = transcript_digest(row.transcript)
+        row.transcript_length = len(row.transcript.encode())
+        rows.append(row)
+        if len(rows) == 200:
+            Lesson.objects.bulk_update(rows, ["transcript_hash", "transcript_length"])
+            rows = []
+    Lesson.objects.bulk_update(rows, ["transcript_hash", "transcript_length"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0005_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="transcript_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="transcript_length",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(hash_transcripts, migrations.RunPython.noop),
+    ]
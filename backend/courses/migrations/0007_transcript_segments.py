@@ -0,0 +1,167 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+import uuid
+
+from courses.migrations._transliteration import phonetic_key
+
+TIMECODE_RE = re.compile(
+    r"^(?:\[(?:(\d+):)?(\d{1,2}):(\d{2})(?:[.,]\d+)?\]"
+    r"|(\d+):(\d{2}):(\d{2})(?:[.,]\d+)?(?:\s*-->\s*\S+)?)\s*"
+)
+TERM_RE = re.compile(r"[\w\u0900-\u097F]+")
+MAX_SEGMENT_CHARS = 1000
+TERM_LENGTH = 64
+
+
+def _timecode_seconds(match):
+    groups = match.groups()
+    hours, minutes, seconds = groups[:3] if groups[1] is not None else groups[3:]
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def parse_segments(text):
+    segments = []
+    lines = []
+    seconds = offset = None
+    size = position = 0
+
+    def close():
+        if lines:
+            segments.append((seconds, offset, " ".join(lines)))
+            lines.clear()
+
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        match = TIMECODE_RE.match(stripped)
+        if match or not stripped or size >= MAX_SEGMENT_CHARS:
+            close()
+            size = 0
+        if match:
+            seconds = _timecode_seconds(match)
+            stripped = stripped[match.end() :]
+        if stripped:
+            if not lines:
+                offset = position
+            lines.append(stripped)
+            size += len(stripped)
+        position += len(line.encode())
+    close()
+    return segments
+
+
+def segment_terms(text):
+    words = {word.lower() for word in TERM_RE.findall(text)}
+    return {key[:TERM_LENGTH] for key in map(phonetic_key, words) if key}
+
+
+def index_transcripts(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS transcript_segments_text_idx ON transcript_segments "
+            "USING GIN (to_tsvector('simple', text))"
+        )
+    Lesson = apps.get_model("courses", "Lesson")
+    TranscriptSegment = apps.get_model("courses", "TranscriptSegment")
+    TranscriptTerm = apps.get_model("courses", "TranscriptTerm")
+    lessons = Lesson.objects.exclude(transcript="").only("id", "transcript")
+    for lesson in lessons.iterator(chunk_size=100):
+        segments = TranscriptSegment.objects.bulk_create(
+            [
+                TranscriptSegment(
+                    lesson=lesson,
+                    position=position,
+                    start_seconds=seconds,
+                    byte_offset=offset,
+                    text=text,
+                )
+                for position, (seconds, offset, text) in enumerate(
+                    parse_segments(lesson.transcript)
+                )
+            ]
+        )
+        if schema_editor.connection.vendor != "postgresql":
+            TranscriptTerm.objects.bulk_create(
+                [
+                    TranscriptTerm(segment=segment, term=term)
+                    for segment in segments
+                    for term in segment_terms(segment.text)
+                ],
+                batch_size=1000,
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS transcript_segments_text_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0006_lesson_transcript_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranscriptSegment",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("start_seconds", models.PositiveIntegerField(blank=True, null=True)),
+                ("byte_offset", models.PositiveIntegerField()),
+                ("text", models.TextField()),
+                (
+                    "lesson",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transcript_segments",
+                        to="courses.lesson",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "transcript_segments",
+                "ordering": ["lesson", "position"],
+                "unique_together": {("lesson", "position")},
+            },
+        ),
+        migrations.CreateModel(
+            name="TranscriptTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                (
+                    "segment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="terms",
+                        to="courses.transcriptsegment",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "transcript_terms",
+                "unique_together": {("term", "segment")},
+            },
+        ),
+        migrations.RunPython(index_transcripts, drop_index),
+    ]
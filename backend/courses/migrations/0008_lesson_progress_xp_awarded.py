@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0007_transcript_segments"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lessonprogress",
+            name="xp_awarded",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
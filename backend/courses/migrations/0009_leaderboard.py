@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("courses", "0008_lesson_progress_xp_awarded"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeeklyXP",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("week", models.DateField(help_text="Monday the week starts on")),
+                ("xp", models.IntegerField(default=0)),
+            ],
+            options={
+                "db_table": "weekly_xp",
+            },
+        ),
+        migrations.AddField(
+            model_name="enrollment",
+            name="xp_earned",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["course", "xp_earned"], name="enrollments_course_xp_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="weeklyxp",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="weekly_xp",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="weeklyxp",
+            index=models.Index(fields=["week", "xp"], name="weekly_xp_week_xp_idx"),
+        ),
+        migrations.AlterUniqueTogether(
+            name="weeklyxp",
+            unique_together={("user", "week")},
+        ),
+    ]
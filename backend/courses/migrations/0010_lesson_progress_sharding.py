@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("courses", "0009_leaderboard"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="lessonprogress",
+            name="lesson",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="progress",
+                to="courses.lesson",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="lessonprogress",
+            name="user",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lesson_progress",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
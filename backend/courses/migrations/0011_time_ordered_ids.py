@@ -0,0 +1,90 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:22
+
+from django.db import migrations, models
+import slokcamp.ids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0010_lesson_progress_sharding"),
+    ]
+
+    # The default is applied by Django, not the database: nothing to alter
+    # there (SQLite would rebuild every table to change it)
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="course",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="enrollment",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="lesson",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="lessonprogress",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="review",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="transcriptsegment",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="weeklyxp",
+                    name="id",
+                    field=models.UUIDField(
+                        default=slokcamp.ids.new_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
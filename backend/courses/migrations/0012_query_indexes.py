@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:40
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0011_time_ordered_ids"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["-created_at"],
+                name="courses_published_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                django.db.models.functions.text.Upper("category"),
+                models.F("difficulty"),
+                condition=models.Q(("is_published", True)),
+                name="courses_catalog_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="enrollment",
+            index=models.Index(
+                fields=["user", "last_accessed"], name="enrollments_user_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lessonprogress",
+            index=models.Index(
+                condition=models.Q(("is_completed", True)),
+                fields=["user", "lesson"],
+                name="lesson_progress_done_idx",
+            ),
+        ),
+    ]
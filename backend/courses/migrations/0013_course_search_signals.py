@@ -0,0 +1,29 @@
+from django.db import migrations
+
+SQLITE_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS courses_fts_insert",
+    "DROP TRIGGER IF EXISTS courses_fts_update",
+    "DROP TRIGGER IF EXISTS courses_fts_delete",
+    "DELETE FROM courses_fts",
+    """
+    INSERT INTO courses_fts (course_id, title, short_description, description, category, instructor_name)
+    SELECT id, title, short_description, description, category, instructor_name FROM courses
+    """,
+]
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_STATEMENTS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0012_query_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,23 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.conf import settings
-import uuid
 
-class Course(models.Model):
+from slokcamp.counters import CounterFieldsMixin
+from slokcamp.ids import new_id
+
+from .transcripts import transcript_digest
+from .transliteration import phonetic_key
+
+class Course(CounterFieldsMixin, models.Model):
     DIFFICULTY_CHOICES = (
         ('beginner', 'Beginner'),
         ('intermediate', 'Intermediate'),
         ('advanced', 'Advanced'),
     )
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
     title = models.CharField(max_length=255)
+    title_key = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
     description = models.TextField()
     short_description = models.CharField(max_length=500)
     difficulty = models.CharField(max_length=20, choices=DIFFICULTY_CHOICES, default='beginner')
@@ -20,20 +27,47 @@ class Course(models.Model):
     instructor_bio = models.TextField(blank=True)
     instructor_image = models.URLField(blank=True)
     thumbnail_image = models.URLField(blank=True)
+    # Maintained by courses.counters as lessons, enrollments and reviews change
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
+    rating_total = models.IntegerField(default=0, editable=False)
     total_reviews = models.IntegerField(default=0)
     total_students = models.IntegerField(default=0)
+    lessons_count = models.IntegerField(default=0)
     is_published = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    counter_fields = ('rating', 'rating_total', 'total_reviews', 'total_students', 'lessons_count')
+
     class Meta:
         db_table = 'courses'
         ordering = ['-created_at']
+        indexes = [
+            # The catalog: only published courses, newest first or filtered
+            # (category is matched case-insensitively)
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_published=True), name='courses_published_recent_idx',
+            ),
+            models.Index(
+                Upper('category'), 'difficulty', condition=models.Q(is_published=True), name='courses_catalog_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.title_key = phonetic_key(self.title)[:255]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_key'}
+        super().save(*args, **kwargs)
+
+class LessonManager(models.Manager):
+    def get_queryset(self):
+        # Transcripts are served by their own endpoint, see courses.transcripts
+        return super().get_queryset().defer('transcript')
+
 class Lesson(models.Model):
     LESSON_TYPE_CHOICES = (
         ('video', 'Video'),
@@ -42,7 +76,7 @@ class Lesson(models.Model):
         ('practice', 'Practice'),
     )
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
     course = models.ForeignKey(Course, related_name='lessons', on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -52,11 +86,15 @@ class Lesson(models.Model):
     video_url = models.URLField(blank=True)
     audio_url = models.URLField(blank=True)
     transcript = models.TextField(blank=True)
+    transcript_hash = models.CharField(max_length=64, blank=True, editable=False)
+    transcript_length = models.PositiveIntegerField(default=0, editable=False)
     xp_reward = models.IntegerField(default=10)
     is_published = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LessonManager()
+
     class Meta:
         db_table = 'lessons'
         ordering = ['course', 'order']
@@ -64,44 +102,132 @@ class Lesson(models.Model):
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
-class Enrollment(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'course_id' in instance.__dict__ and 'is_published' in instance.__dict__:
+            instance._counted = (instance.course_id, instance.is_published)
+        if 'transcript_hash' in instance.__dict__:
+            instance._indexed_hash = instance.transcript_hash
+        return instance
+
+    def save(self, *args, **kwargs):
+        if 'transcript' not in self.get_deferred_fields():
+            self.transcript_hash = transcript_digest(self.transcript)
+            self.transcript_length = len(self.transcript.encode())
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'transcript' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'transcript_hash', 'transcript_length'}
+        # Keep the row and the course counters updated by post_save together
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+class TranscriptSegment(models.Model):
+    """A searchable stretch of a lesson transcript, see courses.transcript_index."""
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
+    lesson = models.ForeignKey(Lesson, related_name='transcript_segments', on_delete=models.CASCADE)
+    position = models.PositiveIntegerField()
+    start_seconds = models.PositiveIntegerField(null=True, blank=True)
+    byte_offset = models.PositiveIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        db_table = 'transcript_segments'
+        ordering = ['lesson', 'position']
+        unique_together = ('lesson', 'position')
+
+    def __str__(self):
+        return f"{self.lesson_id} #{self.position}"
+
+class TranscriptTerm(models.Model):
+    segment = models.ForeignKey(TranscriptSegment, related_name='terms', on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = 'transcript_terms'
+        unique_together = ('term', 'segment')
+
+    def __str__(self):
+        return self.term
+
+class Enrollment(CounterFieldsMixin, models.Model):
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='enrollments', on_delete=models.CASCADE)
     course = models.ForeignKey(Course, related_name='enrollments', on_delete=models.CASCADE)
     progress_percentage = models.IntegerField(default=0)
     completed_lessons = models.IntegerField(default=0)
     total_lessons = models.IntegerField(default=0)
+    xp_earned = models.IntegerField(default=0, editable=False)
     last_accessed = models.DateTimeField(auto_now=True)
     enrolled_at = models.DateTimeField(auto_now_add=True)
 
+    # Maintained by courses.progress and courses.xp
+    counter_fields = ('completed_lessons', 'progress_percentage', 'xp_earned')
+
     class Meta:
         db_table = 'enrollments'
         unique_together = ('user', 'course')
+        indexes = [
+            models.Index(fields=['user', 'enrolled_at', 'id'], name='enrollments_user_keyset_idx'),
+            models.Index(fields=['user', 'last_accessed'], name='enrollments_user_recent_idx'),
+            models.Index(fields=['course', 'xp_earned'], name='enrollments_course_xp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.course.title}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class LessonProgress(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='lesson_progress', on_delete=models.CASCADE)
-    lesson = models.ForeignKey(Lesson, related_name='progress', on_delete=models.CASCADE)
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
+    # Sharded by user (slokcamp.db.sharding): users and lessons are on another database
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='lesson_progress', on_delete=models.CASCADE, db_constraint=False
+    )
+    lesson = models.ForeignKey(Lesson, related_name='progress', on_delete=models.CASCADE, db_constraint=False)
     is_completed = models.BooleanField(default=False)
     completion_percentage = models.IntegerField(default=0)
     time_spent_seconds = models.IntegerField(default=0)
     last_position_seconds = models.IntegerField(default=0)
     completed_at = models.DateTimeField(null=True, blank=True)
+    xp_awarded = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'lesson_progress'
         unique_together = ('user', 'lesson')
+        indexes = [
+            # A user's completions, for the XP and enrollment recounts; their
+            # courses come from the lessons on the primary (progress is sharded)
+            models.Index(
+                fields=['user', 'lesson'], condition=models.Q(is_completed=True), name='lesson_progress_done_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.lesson.title}"
 
+class WeeklyXP(models.Model):
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='weekly_xp', on_delete=models.CASCADE)
+    week = models.DateField(help_text='Monday the week starts on')
+    xp = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'weekly_xp'
+        unique_together = ('user', 'week')
+        indexes = [
+            models.Index(fields=['week', 'xp'], name='weekly_xp_week_xp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.week}: {self.xp}"
+
 class Review(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_id, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='reviews', on_delete=models.CASCADE)
     course = models.ForeignKey(Course, related_name='reviews', on_delete=models.CASCADE)
     rating = models.IntegerField()
@@ -112,6 +238,20 @@ class Review(models.Model):
     class Meta:
         db_table = 'reviews'
         unique_together = ('user', 'course')
+        indexes = [
+            models.Index(fields=['course', 'created_at', 'id'], name='reviews_course_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.course.title} - {self.rating}/5"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'course_id' in instance.__dict__ and 'rating' in instance.__dict__:
+            instance._counted = (instance.course_id, instance.rating)
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
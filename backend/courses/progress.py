@@ -0,0 +1,242 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from analytics.models import UserActivity
+from slokcamp.db.sharding import scatter_gather, shard_for
+
+from .dashboard import bump_dashboard
+from .models import Enrollment, Lesson, LessonProgress
+from .xp import award_completions
+
+PROGRESS_FIELDS = (
+    'is_completed', 'completion_percentage', 'time_spent_seconds',
+    'last_position_seconds', 'completed_at',
+)
+
+# How often a report re-reads the row after losing an is_completed race
+MAX_ATTEMPTS = 3
+
+
+def diff_progress(progress, data):
+    """Return the field values in ``data`` that differ from ``progress``."""
+    changes = {field: value for field, value in data.items() if getattr(progress, field) != value}
+    if 'is_completed' in changes and 'completed_at' not in data:
+        changes['completed_at'] = timezone.now() if changes['is_completed'] else None
+    return changes
+
+
+def apply_completion_delta(user_id, course_id, delta):
+    """Move the enrollment's completion counters by ``delta`` lessons."""
+    completed = F('completed_lessons') + delta
+    Enrollment.objects.filter(user_id=user_id, course_id=course_id).update(
+        completed_lessons=completed,
+        progress_percentage=Coalesce(completed * 100 / NullIf(F('total_lessons'), 0), 0),
+        last_accessed=timezone.now(),
+    )
+
+
+def write_progress(user, lesson, data):
+    """
+    Write one progress report from ``user`` for ``lesson``.
+
+    Only the fields that actually change are written. A change to
+    ``is_completed`` is a compare-and-set on the old value, so concurrent
+    reports from several tabs can neither lose nor double-count a completion.
+    The row is on ``user``'s shard.
+
+    Returns the progress row, whether anything was written, the change in
+    completed lessons (-1, 0 or 1) for the caller to apply to the enrollment,
+    and the XP earned. The lesson's xp_reward is earned by the first
+    completion only; xp_awarded is flipped by the same guarded write.
+    """
+    data = {field: value for field, value in data.items() if field in PROGRESS_FIELDS}
+    shard = shard_for(user)
+    for _ in range(MAX_ATTEMPTS):
+        with transaction.atomic(using=shard):
+            defaults = dict(data)
+            if defaults.get('is_completed'):
+                defaults.setdefault('completed_at', timezone.now())
+                defaults['xp_awarded'] = True
+            progress, created = LessonProgress.objects.using(shard).get_or_create(
+                user=user, lesson=lesson, defaults=defaults
+            )
+            progress.lesson = lesson
+            if created:
+                if progress.is_completed:
+                    return progress, True, 1, lesson.xp_reward
+                return progress, True, 0, 0
+
+            changes = diff_progress(progress, data)
+            if not changes:
+                return progress, False, 0, 0
+
+            queryset = LessonProgress.objects.using(shard).filter(pk=progress.pk)
+            if 'is_completed' in changes:
+                queryset = queryset.filter(is_completed=progress.is_completed)
+                if changes['is_completed'] and not progress.xp_awarded:
+                    changes['xp_awarded'] = True
+            changes['updated_at'] = timezone.now()
+            if queryset.update(**changes):
+                for field, value in changes.items():
+                    setattr(progress, field, value)
+                if 'is_completed' not in changes:
+                    return progress, True, 0, 0
+                if not progress.is_completed:
+                    return progress, True, -1, 0
+                return progress, True, 1, lesson.xp_reward if 'xp_awarded' in changes else 0
+        # Another request flipped is_completed first; re-read and diff again
+    raise RuntimeError('Could not apply progress update after %d attempts' % MAX_ATTEMPTS)
+
+
+def record_progress(user, lesson, data):
+    """
+    Apply one progress report, moving the enrollment by its completion delta
+    and crediting XP and streak for a completion.
+
+    Returns the progress row and whether anything was written.
+    """
+    # The shard commits first: if the primary then fails, the completion is
+    # on record and backfill_xp recomputes what it is owed
+    with transaction.atomic(), transaction.atomic(using=shard_for(user)):
+        progress, written, delta, xp = write_progress(user, lesson, data)
+        if delta:
+            apply_completion_delta(user.pk, lesson.course_id, delta)
+        if delta > 0:
+            award_completions(user, [(lesson, xp)])
+        if written:
+            bump_dashboard(user.pk)
+    return progress, written
+
+
+def coalesce_events(events):
+    """
+    Merge ``(index, lesson_id, data)`` events per lesson, later fields winning.
+
+    Returns ``{lesson_id: (index, data)}`` keyed in first-seen order, where
+    ``index`` is the last event folded into that lesson.
+    """
+    merged = {}
+    for index, lesson_id, data in events:
+        _, previous = merged.get(lesson_id, (None, {}))
+        merged[lesson_id] = (index, {**previous, **data})
+    return merged
+
+
+def record_progress_batch(user, events):
+    """
+    Apply a batch of ``(index, lesson_id, data)`` progress events for ``user``.
+
+    Events are coalesced per lesson so only the latest value of each field is
+    written. Plain position/time updates go through one bulk insert and a bulk
+    update per set of changed fields; completion flips take the same
+    compare-and-set path as single reports. Each affected enrollment is then
+    moved once by its net delta.
+
+    Returns ``{index: status}`` for the events that were applied.
+    """
+    merged = coalesce_events(events)
+    shard = shard_for(user)
+    lessons = Lesson.objects.only('id', 'course_id', 'xp_reward').in_bulk(list(merged))
+    now = timezone.now()
+    statuses = {}
+    to_create = {}
+    to_update = defaultdict(list)
+    deltas = defaultdict(int)
+    completions = []
+
+    def write(index, lesson, data, existed):
+        _, written, delta, xp = write_progress(user, lesson, data)
+        deltas[lesson.course_id] += delta
+        if delta > 0:
+            completions.append((lesson, xp))
+        statuses[index] = ('updated' if existed else 'created') if written else 'unchanged'
+
+    # Committed shard first, as in record_progress
+    with transaction.atomic(), transaction.atomic(using=shard):
+        # Read in the transaction, so the absolute values bulk_update writes
+        # below are based on the rows as they are now (locked on Postgres)
+        existing = {
+            progress.lesson_id: progress
+            for progress in LessonProgress.objects.using(shard).select_for_update()
+            .filter(user=user, lesson_id__in=list(lessons))
+        }
+        for lesson_id, (index, data) in merged.items():
+            lesson = lessons.get(lesson_id)
+            if lesson is None:
+                statuses[index] = 'not_found'
+                continue
+            data = {field: value for field, value in data.items() if field in PROGRESS_FIELDS}
+            progress = existing.get(lesson_id)
+
+            if progress is None and not data.get('is_completed'):
+                to_create[index] = (lesson, data, LessonProgress(user=user, lesson=lesson, **data))
+                continue
+            changes = diff_progress(progress, data) if progress else None
+            if progress is None or 'is_completed' in changes:
+                write(index, lesson, data, progress is not None)
+            elif changes:
+                for field, value in changes.items():
+                    setattr(progress, field, value)
+                progress.updated_at = now
+                to_update[tuple(sorted(changes))].append(progress)
+                statuses[index] = 'updated'
+            else:
+                statuses[index] = 'unchanged'
+
+        if to_create:
+            rows = [row for _, _, row in to_create.values()]
+            LessonProgress.objects.using(shard).bulk_create(rows, ignore_conflicts=True)
+            inserted = set(
+                LessonProgress.objects.using(shard).filter(pk__in=[row.pk for row in rows]).values_list('pk', flat=True)
+            )
+            for index, (lesson, data, row) in to_create.items():
+                if row.pk in inserted:
+                    statuses[index] = 'created'
+                else:
+                    # Another request created the row first; update it instead
+                    write(index, lesson, data, True)
+        for fields, rows in to_update.items():
+            LessonProgress.objects.using(shard).bulk_update(rows, [*fields, 'updated_at'])
+        for course_id, delta in deltas.items():
+            if delta:
+                apply_completion_delta(user.pk, course_id, delta)
+        award_completions(user, completions)
+        if any(status in ('created', 'updated') for status in statuses.values()):
+            bump_dashboard(user.pk)
+    return statuses
+
+
+def _shard_stats(shard, since):
+    stats = LessonProgress.objects.using(shard).aggregate(
+        progress_rows=Count('pk'),
+        completions=Count('pk', filter=Q(is_completed=True)),
+        recent_completions=Count('pk', filter=Q(is_completed=True, completed_at__gte=since)),
+        # A user's rows are all on one shard, so per-shard counts add up
+        recent_learners=Count('user', distinct=True, filter=Q(updated_at__gte=since)),
+    )
+    stats['activities'] = dict(
+        UserActivity.objects.using(shard).order_by().values('activity_type')
+        .annotate(n=Count('pk')).values_list('activity_type', 'n')
+    )
+    return stats
+
+
+def learning_stats(days=7):
+    """Progress and activity totals over every shard, and per shard."""
+    since = timezone.now() - timedelta(days=days)
+    shards = scatter_gather(lambda shard: _shard_stats(shard, since))
+    totals = defaultdict(int)
+    activities = defaultdict(int)
+    for stats in shards.values():
+        for key, value in stats.items():
+            if key == 'activities':
+                for activity_type, count in value.items():
+                    activities[activity_type] += count
+            else:
+                totals[key] += value
+    return {'days': days, **totals, 'activities': dict(activities), 'shards': shards}
@@ -0,0 +1,158 @@
+import re
+import uuid
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, When
+from django.db.models.expressions import RawSQL
+
+from .transliteration import phonetic_key, prefix_range
+
+# Indexed by courses_fts on SQLite and the search_vector column on Postgres,
+# both created by migration 0002
+SEARCH_FIELDS = ('title', 'short_description', 'description', 'category', 'instructor_name')
+
+# Relative weight of each SEARCH_FIELDS column when ranking matches
+FTS5_WEIGHTS = (10.0, 4.0, 1.0, 3.0, 3.0)
+
+TERM_RE = re.compile(r'[\w\u0900-\u097F]+')
+
+
+def index_course(course):
+    """Refresh the FTS5 row for ``course``; Postgres maintains its own."""
+    connection = connections[course._state.db]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM courses_fts WHERE course_id = %s', [course.id.hex])
+        cursor.execute(
+            'INSERT INTO courses_fts (course_id, %s) VALUES (%%s, %s)'
+            % (', '.join(SEARCH_FIELDS), ', '.join(['%s'] * len(SEARCH_FIELDS))),
+            [course.id.hex] + [getattr(course, field) for field in SEARCH_FIELDS],
+        )
+
+
+def unindex_course(course):
+    connection = connections[course._state.db]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM courses_fts WHERE course_id = %s', [course.id.hex])
+
+
+def query_terms(query):
+    return TERM_RE.findall(query)
+
+
+def _fts5_query(terms):
+    # Quote every term so user input can never be parsed as FTS5 syntax, and
+    # prefix-match the last one since the catalog searches as the user types.
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _tsquery(terms):
+    quoted = ["'%s'" % term for term in terms]
+    quoted[-1] += ':*'
+    return ' & '.join(quoted)
+
+
+def _candidates(queryset, **filters):
+    queryset = queryset.filter(**filters).order_by().values('id')
+    return queryset.query.get_compiler(connection=connections[queryset.db]).as_sql()
+
+
+def _sqlite_hits(cursor, terms, queryset, limit):
+    # Each hit is checked by primary key; an IN list would first collect
+    # every course the view's filters leave
+    sql, params = _candidates(queryset, id=RawSQL('courses_fts.course_id', ()))
+    cursor.execute(
+        """
+        SELECT course_id, snippet(courses_fts, -1, '<mark>', '</mark>', '…', 16)
+        FROM courses_fts
+        WHERE courses_fts MATCH %s AND EXISTS ({candidates})
+        ORDER BY bm25(courses_fts, 0.0, {weights})
+        LIMIT %s
+        """.format(candidates=sql, weights=', '.join(str(w) for w in FTS5_WEIGHTS)),
+        [_fts5_query(terms), *params, limit],
+    )
+    return cursor.fetchall()
+
+
+def _postgres_hits(cursor, terms, queryset, limit):
+    sql, params = _candidates(queryset)
+    cursor.execute(
+        """
+        SELECT id, ts_headline(
+            'simple', short_description || ' ' || description, query,
+            'StartSel=<mark>, StopSel=</mark>, MaxFragments=1, MaxWords=24, MinWords=8'
+        )
+        FROM courses, to_tsquery('simple', %s) AS query
+        WHERE search_vector @@ query AND id IN ({candidates})
+        ORDER BY ts_rank_cd(search_vector, query) DESC
+        LIMIT %s
+        """.format(candidates=sql),
+        [_tsquery(terms), *params, limit],
+    )
+    return cursor.fetchall()
+
+
+SEARCH_BACKENDS = {
+    'sqlite': _sqlite_hits,
+    'postgresql': _postgres_hits,
+}
+
+
+def search_courses(queryset, query, limit=None):
+    """
+    Restrict ``queryset`` to the courses matching ``query``, best match first.
+
+    Courses whose title transliterates to the same phonetic key as the query
+    (in any script or romanisation) rank ahead of full-text matches. Returns
+    the filtered queryset and a ``{course_id: snippet}`` map with the matched
+    text highlighted in ``<mark>`` tags.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset, {}
+    limit = limit or settings.COURSE_SEARCH_MAX_RESULTS
+    key = phonetic_key(query)
+
+    connection = connections[queryset.db]
+    backend = SEARCH_BACKENDS.get(connection.vendor)
+    if backend is None:
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': query})
+        if key:
+            condition |= Q(**prefix_range('title_key', key))
+        return queryset.filter(condition), {}
+
+    ids = []
+    if key:
+        ids = list(
+            queryset.filter(**prefix_range('title_key', key))
+            .order_by('title_key')
+            .values_list('id', flat=True)[:limit]
+        )
+    # Only the courses left by the view's filters compete for the limit
+    with connection.cursor() as cursor:
+        hits = backend(cursor, terms, queryset, limit)
+    snippets = {}
+    for course_id, snippet in hits:
+        snippets[uuid.UUID(str(course_id))] = snippet
+    seen = set(ids)
+    ids += [pk for pk in snippets if pk not in seen][:limit - len(ids)]
+    return rank_by(queryset, ids), snippets
+
+
+def rank_by(queryset, ids):
+    """Filter ``queryset`` to ``ids`` and keep it in the order given."""
+    if not ids:
+        return queryset.none()
+    ranking = Case(
+        *[When(id=pk, then=position) for position, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(id__in=ids).order_by(ranking)
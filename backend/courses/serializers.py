@@ -1,11 +1,22 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Course, Lesson, Enrollment, LessonProgress, Review
 from accounts.serializers import UserSerializer
+from slokcamp.pagination import encode_cursor, keyset_ordering
 
 class LessonSerializer(serializers.ModelSerializer):
+    transcript_url = serializers.SerializerMethodField()
+    
     class Meta:
         model = Lesson
-        fields = '__all__'
+        exclude = ('transcript',)
+    
+    def get_transcript_url(self, obj):
+        if not obj.transcript_length:
+            return None
+        url = reverse('courses:lesson_transcript', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 class ReviewSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -16,26 +27,56 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ('user',)
 
 class CourseSerializer(serializers.ModelSerializer):
-    lessons_count = serializers.SerializerMethodField()
+    search_snippet = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
-        fields = '__all__'
+        exclude = ('title_key', 'rating_total')
     
-    def get_lessons_count(self, obj):
-        return obj.lessons.filter(is_published=True).count()
+    def get_search_snippet(self, obj):
+        return self.context.get('search_snippets', {}).get(obj.id)
 
 class CourseDetailSerializer(serializers.ModelSerializer):
-    lessons = LessonSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
-    lessons_count = serializers.SerializerMethodField()
+    """
+    Course with optional embedded lessons and reviews.
+
+    The view passes ``fields`` (course fields to keep, all when None) and
+    ``include`` (which of EMBEDS to embed) through the context. Lessons come
+    without transcripts and reviews are the latest few, in the order of the
+    paginated reviews endpoint, with ``reviews_next`` pointing at the rest.
+    """
+    EMBEDS = ('lessons', 'reviews')
+    
+    lessons = LessonSerializer(source='published_lessons', many=True, read_only=True)
+    reviews = ReviewSerializer(source='recent_reviews', many=True, read_only=True)
+    reviews_next = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
-        fields = '__all__'
+        exclude = ('title_key', 'rating_total')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        include = self.context.get('include', self.EMBEDS)
+        for name in list(self.fields):
+            embed = 'reviews' if name == 'reviews_next' else name
+            if embed in self.EMBEDS:
+                keep = embed in include
+            else:
+                keep = fields is None or name in fields or name == 'id'
+            if not keep:
+                self.fields.pop(name)
     
-    def get_lessons_count(self, obj):
-        return obj.lessons.filter(is_published=True).count()
+    def get_reviews_next(self, obj):
+        reviews = obj.recent_reviews
+        if len(reviews) >= obj.total_reviews or not reviews:
+            return None
+        url = reverse('courses:course_reviews', args=[obj.pk])
+        cursor = encode_cursor(reviews[-1], keyset_ordering(Review))
+        request = self.context.get('request')
+        url = f'{url}?cursor={cursor}'
+        return request.build_absolute_uri(url) if request else url
 
 class EnrollmentSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
@@ -44,7 +85,7 @@ class EnrollmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Enrollment
         fields = '__all__'
-        read_only_fields = ('user', 'progress_percentage', 'completed_lessons', 'total_lessons')
+        read_only_fields = ('user', 'progress_percentage', 'completed_lessons', 'total_lessons', 'xp_earned')
 
 class LessonProgressSerializer(serializers.ModelSerializer):
     lesson = LessonSerializer(read_only=True)
@@ -0,0 +1,95 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from slokcamp.db.sharding import scatter_gather
+
+from . import counters, transcript_index
+from .cache import bump_catalog_version_on_commit
+from .dashboard import bump_dashboard
+from .models import Course, Enrollment, Lesson, LessonProgress, Review
+from .search import SEARCH_FIELDS, index_course, unindex_course
+
+
+@receiver(post_save, sender=Course)
+def reindex_course(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+        index_course(instance)
+
+
+@receiver(post_delete, sender=Course)
+def drop_course_from_index(sender, instance, **kwargs):
+    unindex_course(instance)
+
+
+@receiver(post_save, sender=Lesson)
+def count_lesson(sender, instance, created, **kwargs):
+    counters.lesson_saved(instance, created)
+
+
+@receiver(post_save, sender=Lesson)
+def reindex_transcript(sender, instance, **kwargs):
+    # Only when the transcript was loaded and actually changed
+    if 'transcript' in instance.get_deferred_fields():
+        return
+    if getattr(instance, '_indexed_hash', None) != instance.transcript_hash:
+        transcript_index.index_lesson(instance)
+        instance._indexed_hash = instance.transcript_hash
+
+
+@receiver(post_delete, sender=Lesson)
+def uncount_lesson(sender, instance, **kwargs):
+    counters.lesson_deleted(instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def delete_progress(sender, instance, **kwargs):
+    # The cascade only reached the primary's shard
+    lesson_id = instance.pk
+    transaction.on_commit(lambda: scatter_gather(
+        lambda shard: LessonProgress.objects.using(shard).filter(lesson_id=lesson_id).delete()
+    ))
+
+
+@receiver(post_save, sender=Enrollment)
+def count_enrollment(sender, instance, created, **kwargs):
+    counters.enrollment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Enrollment)
+def uncount_enrollment(sender, instance, **kwargs):
+    counters.enrollment_deleted(instance)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_dashboard(sender, instance, **kwargs):
+    bump_dashboard(instance.user_id)
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, **kwargs):
+    counters.review_saved(instance, created)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    counters.review_deleted(instance)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_catalog(sender, **kwargs):
+    bump_catalog_version_on_commit()
+
+
+def set_journal_mode(using, **kwargs):
+    # Connected in CoursesConfig.ready(): migrate is the deploy step that
+    # writes SQLite's journal mode into the database file
+    connection = connections[using]
+    if hasattr(connection, 'set_journal_mode'):
+        connection.set_journal_mode()
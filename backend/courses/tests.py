@@ -1,3 +1,770 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import uuid
+from decimal import Decimal
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.db.models.query import QuerySet
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from slokcamp.db.plans import full_scans, record_queries
+from slokcamp.db.sharding import shard_for
+from slokcamp.models import Version
+from slokcamp.pagination import encode_cursor
+
+from .async_views import AsyncCourseDetailView, AsyncCourseListView
+from .cache import VERSION_KEY, cache_stats, catalog_version
+from .counters import adjust_course
+from .dashboard import next_lessons
+from .models import (
+    Course, Enrollment, Lesson, LessonProgress, Review, TranscriptSegment, TranscriptTerm, WeeklyXP,
+)
+from . import counters, leaderboard, progress
+from .progress import record_progress
+from .search import search_courses
+from .transcript_index import parse_segments, search_transcripts, uses_term_table
+from .transcripts import parse_range
+from .transliteration import phonetic_key, phonetic_words, prefix_range
+from .xp import record_activity
+
+
+def make_course(title, **fields):
+    fields = {
+        'description': '', 'short_description': '', 'instructor_name': 'Teacher', 'is_published': True,
+        **fields,
+    }
+    return Course.objects.create(title=title, **fields)
+
+
+class CourseSearchTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        # Catalog versions are bumped on commit, which TestCase never reaches
+        cache.clear()
+        response = APIClient().get('/api/courses/', {'search': query, **params})
+        return [(course['title'], course['search_snippet']) for course in response.json()['results']]
+
+    def test_ranks_title_matches_first_and_highlights_snippets(self):
+        make_course('Upanishads', description='The Gita retold')
+        make_course('Bhagavad Gita', description='Chapter two of the Gita')
+        results = self.search('gita')
+        self.assertEqual([title for title, _ in results], ['Bhagavad Gita', 'Upanishads'])
+        self.assertIn('<mark>Gita</mark>', results[1][1])
+
+    def test_index_follows_saves_and_deletes(self):
+        course = make_course('Yoga Sutras', description='karma')
+        course.description = 'bhakti'
+        course.save()
+        self.assertEqual(self.search('karma'), [])
+        self.assertEqual([title for title, _ in self.search('bhakti')], ['Yoga Sutras'])
+        course.delete()
+        self.assertEqual(self.search('bhakti'), [])
+
+    @override_settings(COURSE_SEARCH_MAX_RESULTS=3)
+    def test_filters_apply_before_the_result_limit(self):
+        # Better matches the catalog hides must not crowd out the ones it shows
+        for n in range(5):
+            make_course(f'Draft {n}', description='dharma dharma dharma', is_published=False)
+            make_course(f'Other {n}', description='dharma dharma dharma', difficulty='advanced')
+        make_course('Gita', description='on dharma', difficulty='beginner')
+        self.assertEqual([title for title, _ in self.search('dharma', difficulty='beginner')], ['Gita'])
+        queryset, _ = search_courses(Course.objects.filter(is_published=True), 'dharma')
+        self.assertEqual(queryset.count(), 3)
+
+
+class TransliterationTests(TestCase):
+    databases = '__all__'
+
+    def test_every_script_shares_one_key(self):
+        spellings = ['Bhagavad Gita', 'bhagavadgītā', 'bhagavadgItA', 'भगवद्गीता', 'BHAGAVAD-GEETA']
+        self.assertEqual({phonetic_key(spelling) for spelling in spellings}, {'bhagavadgit'})
+        self.assertEqual(phonetic_words('Śrī Kṛṣṇa'), phonetic_words('shri krishna'))
+        self.assertEqual(phonetic_key('saṃsāra'), phonetic_key('संसार'))
+        self.assertEqual(phonetic_key('!!'), '')
+
+    def test_prefix_range(self):
+        self.assertEqual(prefix_range('title_key', 'bhag'), {'title_key__gte': 'bhag', 'title_key__lt': 'bhah'})
+
+    def test_catalog_finds_titles_in_any_script(self):
+        make_course('भगवद्गीता')
+        make_course('Yoga Sutras')
+        for query in ('bhagavad', 'Bhagavad Gītā', 'भगवद्'):
+            with self.subTest(query):
+                queryset, _ = search_courses(Course.objects.all(), query)
+                self.assertEqual([course.title for course in queryset], ['भगवद्गीता'])
+        course = Course.objects.get(title='Yoga Sutras')
+        course.title = 'योगसूत्र'
+        course.save()
+        queryset, _ = search_courses(Course.objects.all(), 'yogasutra')
+        self.assertEqual([course.title for course in queryset], ['योगसूत्र'])
+
+
+class CounterSaveTests(TestCase):
+    databases = '__all__'
+
+    def test_saving_a_stale_instance_keeps_concurrent_deltas(self):
+        course = make_course('Gita')
+        user = User.objects.create_user(email='learner@example.com', password=None, full_name='Learner')
+        stale_course, stale_user = Course.objects.get(), User.objects.get()
+        Enrollment.objects.create(user=user, course=course)
+        adjust_course(course.pk, reviews=1, rating=4)
+        record_activity(user.pk, 10)
+
+        stale_course.title = 'Bhagavad Gita'
+        stale_course.save()
+        stale_user.full_name = 'Arjuna'
+        stale_user.save()
+
+        course = Course.objects.get()
+        self.assertEqual((course.title, course.total_students, course.total_reviews), ('Bhagavad Gita', 1, 1))
+        user = User.objects.get()
+        self.assertEqual((user.full_name, user.total_xp, user.current_streak), ('Arjuna', 10, 1))
+
+    def test_counters_can_be_written_on_purpose(self):
+        course = make_course('Gita')
+        course.total_students = 5
+        course.save(update_fields=['total_students'])
+        self.assertEqual(Course.objects.get().total_students, 5)
+
+
+class CounterSignalTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.gita, self.sutras = make_course('Gita'), make_course('Sutras')
+        self.users = [
+            User.objects.create_user(email=f'learner{n}@example.com', password=None, full_name='Learner')
+            for n in range(3)
+        ]
+
+    def counters(self, course):
+        course.refresh_from_db()
+        return course.lessons_count, course.total_reviews, course.rating_total, course.rating
+
+    def test_lesson_publish_move_and_delete(self):
+        lesson = Lesson.objects.create(course=self.gita, title='2.47')
+        Lesson.objects.create(course=self.gita, title='Draft', is_published=False)
+        self.assertEqual(self.counters(self.gita)[0], 1)
+        lesson.is_published = False
+        lesson.save()
+        self.assertEqual(self.counters(self.gita)[0], 0)
+        lesson.is_published = True
+        lesson.save()
+        self.assertEqual(self.counters(self.gita)[0], 1)
+
+        lesson = Lesson.objects.get(pk=lesson.pk)
+        lesson.course = self.sutras
+        lesson.save()
+        self.assertEqual((self.counters(self.gita)[0], self.counters(self.sutras)[0]), (0, 1))
+        lesson.delete()
+        self.assertEqual(self.counters(self.sutras)[0], 0)
+
+    def test_review_rating_change_and_delete(self):
+        reviews = [
+            Review.objects.create(user=user, course=self.gita, rating=rating, comment='')
+            for user, rating in zip(self.users, (5, 4, 3))
+        ]
+        self.assertEqual(self.counters(self.gita)[1:], (3, 12, 4))
+        review = Review.objects.get(pk=reviews[2].pk)
+        review.rating = 1
+        review.save()
+        self.assertEqual(self.counters(self.gita)[1:], (3, 10, Decimal('3.33')))
+        review.course = self.sutras
+        review.save()
+        self.assertEqual((self.counters(self.gita)[1:], self.counters(self.sutras)[1:]), ((2, 9, Decimal('4.5')), (1, 1, 1)))
+        review.delete()
+        self.assertEqual(self.counters(self.sutras)[1:], (0, 0, 0))
+
+    def test_queries_do_not_grow_with_the_course(self):
+        lessons = [Lesson.objects.create(course=self.gita, title=f'2.{n}') for n in range(20)]
+        for user in self.users:
+            Review.objects.create(user=user, course=self.gita, rating=4, comment='')
+        lesson, review = Lesson.objects.get(pk=lessons[0].pk), Review.objects.get(user=self.users[0])
+        # One UPDATE of each course whose counters move, and none otherwise
+        lesson.is_published = False
+        with self.assertNumQueries(1):
+            counters.lesson_saved(lesson, created=False)
+        with self.assertNumQueries(0):
+            counters.lesson_saved(lesson, created=False)
+        lesson.course, lesson.is_published = self.sutras, True
+        with self.assertNumQueries(1):
+            counters.lesson_saved(lesson, created=False)
+        lesson.course = self.gita
+        with self.assertNumQueries(2):
+            counters.lesson_saved(lesson, created=False)
+        with self.assertNumQueries(1):
+            counters.lesson_deleted(lesson)
+        review.rating = 2
+        with self.assertNumQueries(1):
+            counters.review_saved(review, created=False)
+        review.course = self.sutras
+        with self.assertNumQueries(2):
+            counters.review_saved(review, created=False)
+        with self.assertNumQueries(1):
+            counters.review_deleted(review)
+
+
+class ProgressBatchTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='learner@example.com', password=None, full_name='Learner')
+        course = make_course('Gita')
+        self.lessons = [Lesson.objects.create(course=course, title=f'2.{n}', order=n) for n in range(5)]
+        Enrollment.objects.create(user=self.user, course=course, total_lessons=5)
+        record_progress(self.user, self.lessons[1], {'last_position_seconds': 10})
+        record_progress(self.user, self.lessons[2], {'is_completed': True})
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, events):
+        response = self.client.post('/api/courses/lesson-progress/batch/', {'events': events}, format='json')
+        return [result['status'] for result in response.json()['results']]
+
+    def test_statuses_and_net_enrollment_delta(self):
+        a, b, c, d, e = (str(lesson.pk) for lesson in self.lessons)
+        statuses = self.post([
+            {'lesson_id': a, 'last_position_seconds': 5},
+            {'lesson_id': a, 'is_completed': True},
+            {'lesson_id': b, 'last_position_seconds': 10},
+            {'lesson_id': c, 'is_completed': False},
+            {'lesson_id': d, 'last_position_seconds': 20},
+            {'lesson_id': e, 'is_completed': True},
+            {'lesson_id': str(uuid.uuid4()), 'last_position_seconds': 1},
+            {'last_position_seconds': 1},
+        ])
+        self.assertEqual(
+            statuses, ['coalesced', 'created', 'unchanged', 'updated', 'created', 'created', 'not_found', 'invalid'],
+        )
+        stored = LessonProgress.objects.using(shard_for(self.user)).filter(user=self.user)
+        rows = {row.lesson_id: row for row in stored}
+        first = rows[self.lessons[0].pk]
+        self.assertEqual((first.is_completed, first.last_position_seconds), (True, 5))
+        self.assertEqual(rows[self.lessons[3].pk].last_position_seconds, 20)
+        self.assertFalse(rows[self.lessons[2].pk].is_completed)
+
+        # Two completions and one withdrawn: one lesson more than before
+        enrollment = Enrollment.objects.get()
+        self.assertEqual((enrollment.completed_lessons, enrollment.progress_percentage), (2, 40))
+        # XP is only ever earned, once per lesson
+        self.assertEqual(User.objects.get().total_xp, 30)
+
+    def test_replaying_a_batch_changes_nothing(self):
+        events = [{'lesson_id': str(self.lessons[0].pk), 'is_completed': True, 'last_position_seconds': 60}]
+        self.assertEqual(self.post(events), ['created'])
+        self.assertEqual(self.post(events), ['unchanged'])
+        self.assertEqual(Enrollment.objects.get().completed_lessons, 2)
+
+
+class CompletionRaceTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='learner@example.com', password=None, full_name='Learner')
+        course = make_course('Gita')
+        self.lesson = Lesson.objects.create(course=course, title='2.47')
+        Enrollment.objects.create(user=self.user, course=course, total_lessons=1)
+        record_progress(self.user, self.lesson, {'last_position_seconds': 10})
+
+    def test_completion_racing_another_tab_counts_once(self):
+        diff_progress = progress.diff_progress
+        raced = []
+
+        def other_tab_first(row, data):
+            # The other tab completes the lesson after this report read the row
+            if not raced:
+                raced.append(True)
+                record_progress(self.user, self.lesson, {'is_completed': True})
+            return diff_progress(row, data)
+
+        with mock.patch('courses.progress.diff_progress', side_effect=other_tab_first):
+            row, written = record_progress(self.user, self.lesson, {'is_completed': True})
+        self.assertEqual((row.is_completed, written), (True, False))
+        enrollment = Enrollment.objects.get()
+        self.assertEqual((enrollment.completed_lessons, enrollment.progress_percentage), (1, 100))
+        self.assertEqual(User.objects.get().total_xp, 10)
+
+    def test_gives_up_after_losing_every_attempt(self):
+        with mock.patch.object(QuerySet, 'update', return_value=0) as update:
+            with self.assertRaises(RuntimeError):
+                record_progress(self.user, self.lesson, {'is_completed': True})
+        self.assertEqual(update.call_count, progress.MAX_ATTEMPTS)
+        self.assertFalse(LessonProgress.objects.using(shard_for(self.user)).get().is_completed)
+        self.assertEqual(Enrollment.objects.get().completed_lessons, 0)
+
+
+class KeysetPagingTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.course = make_course('Gita')
+        self.users = [
+            User.objects.create_user(email=f'learner{n}@example.com', password=None, full_name=f'Learner {n}')
+            for n in range(5)
+        ]
+        for n, user in enumerate(self.users):
+            Review.objects.create(user=user, course=self.course, rating=5, comment=f'review {n}')
+        self.client = APIClient()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, url):
+        """Every page from ``url`` on, following next links."""
+        pages = []
+        while url:
+            page = self.get(url)
+            pages.append(page)
+            url = page['next']
+        return pages
+
+    def test_next_and_previous_links(self):
+        pages = self.walk(f'/api/courses/{self.course.pk}/reviews/?page_size=2')
+        comments = [[review['comment'] for review in page['results']] for page in pages]
+        self.assertEqual(comments, [['review 4', 'review 3'], ['review 2', 'review 1'], ['review 0']])
+        self.assertIsNone(pages[0]['previous'])
+        self.assertEqual(self.get(pages[2]['previous'])['results'], pages[1]['results'])
+        self.assertEqual(self.get(pages[1]['previous'])['results'], pages[0]['results'])
+
+    def test_rows_added_while_paging_are_not_repeated(self):
+        first = self.get(f'/api/courses/{self.course.pk}/reviews/?page_size=2')
+        newcomer = User.objects.create_user(email='late@example.com', password=None, full_name='Late')
+        Review.objects.create(user=newcomer, course=self.course, rating=4, comment='late')
+        second = self.get(first['next'])
+        self.assertEqual([review['comment'] for review in second['results']], ['review 2', 'review 1'])
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ['garbage', 'eyJ2IjpbXX0=', 'eyJ2IjpbIm5vdC1hLWRhdGUiLCJ4Il19']:
+            with self.subTest(cursor):
+                response = self.client.get(f'/api/courses/{self.course.pk}/reviews/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(TIME_ORDERED_IDS=True, KEYSET_BY_ID=True)
+    def test_keyset_by_id(self):
+        user = self.users[0]
+        courses = [make_course(f'Course {n}') for n in range(3)]
+        for course in courses:
+            Enrollment.objects.create(user=user, course=course)
+        self.client.force_authenticate(user)
+        pages = self.walk('/api/courses/my-enrollments/?page_size=2')
+        titles = [enrollment['course']['title'] for page in pages for enrollment in page['results']]
+        self.assertEqual(titles, ['Course 2', 'Course 1', 'Course 0'])
+        # The cursor holds the id alone
+        cursor = parse_qs(urlsplit(pages[0]['next']).query)['cursor'][0]
+        values = json.loads(base64.urlsafe_b64decode(cursor))['v']
+        self.assertEqual(len(values), 1)
+        # A cursor with a value too many is rejected, not cut down to the id
+        extra = encode_cursor(Enrollment.objects.get(course=courses[1]), ('-id', '-enrolled_at'))
+        response = self.client.get('/api/courses/my-enrollments/', {'cursor': extra})
+        self.assertEqual(response.status_code, 404)
+
+
+class LessonXPTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='learner@example.com', password=None, full_name='Learner')
+        self.course = make_course('Gita')
+        self.lessons = [Lesson.objects.create(course=self.course, title=f'2.{n}', xp_reward=15) for n in range(2)]
+        Enrollment.objects.create(user=self.user, course=self.course, total_lessons=2)
+
+    def assert_xp(self, xp, streak=1):
+        user = User.objects.get()
+        self.assertEqual((user.total_xp, user.current_streak), (xp, streak))
+        self.assertEqual(Enrollment.objects.get().xp_earned, xp)
+        self.assertEqual(sum(WeeklyXP.objects.values_list('xp', flat=True)), xp)
+
+    def test_each_lesson_pays_out_once(self):
+        first, second = self.lessons
+        record_progress(self.user, first, {'is_completed': True})
+        self.assert_xp(15)
+        # Completing it again after taking the completion back earns nothing
+        record_progress(self.user, first, {'is_completed': False})
+        record_progress(self.user, first, {'is_completed': True})
+        self.assert_xp(15)
+        record_progress(self.user, second, {'is_completed': True})
+        self.assert_xp(30)
+        self.assertEqual(Enrollment.objects.get().completed_lessons, 2)
+
+    def test_rebuild_agrees_with_the_running_totals(self):
+        for lesson in self.lessons:
+            record_progress(self.user, lesson, {'is_completed': True})
+        record_progress(self.user, self.lessons[0], {'is_completed': False})
+        record_progress(self.user, self.lessons[0], {'is_completed': True})
+        call_command('backfill_xp', stdout=io.StringIO())
+        self.assert_xp(30)
+
+
+class CatalogVersionTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.course = make_course('Gita')
+        self.user = User.objects.create_user(email='learner@example.com', password=None, full_name='Learner')
+
+    def test_enrollments_leave_the_catalog_cached(self):
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(user=self.user, course=self.course)
+        self.assertEqual(catalog_version(), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=self.user, course=self.course, rating=5)
+        self.assertEqual(catalog_version(), version + 1)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_bump_in_another_worker_reaches_this_one(self):
+        client = APIClient()
+        first = client.get('/api/courses/')
+        # Another worker's rename and bump reach the database, not this worker's cache
+        Course.objects.filter(pk=self.course.pk).update(title='Bhagavad Gita')
+        Version.objects.filter(key=VERSION_KEY).update(value=F('value') + 1)
+        second = client.get('/api/courses/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['results'][0]['title'], 'Bhagavad Gita')
+
+    @override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_entries_are_kept_per_host(self):
+        for n in range(20):
+            make_course(f'Sutra {n}')
+        for host in ('a.example', 'b.example'):
+            response = APIClient().get('/api/courses/?page=2', HTTP_HOST=host)
+            self.assertTrue(response.json()['previous'].startswith(f'http://{host}/'))
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_responses_vary_on_accept(self):
+        client = APIClient()
+        json_response = client.get('/api/courses/')
+        html_response = client.get('/api/courses/', HTTP_ACCEPT='text/html')
+        self.assertIn('Accept', json_response['Vary'])
+        self.assertNotEqual(json_response['ETag'], html_response['ETag'])
+        self.assertEqual(client.get('/api/courses/', HTTP_IF_NONE_MATCH=json_response['ETag']).status_code, 304)
+
+    def test_etag_and_cache_entry_share_one_version(self):
+        # A bump between the two reads must not file the body under another ETag
+        with mock.patch('courses.cache.catalog_version', side_effect=[1, 2]):
+            response = APIClient().get('/api/courses/')
+        self.assertTrue(response['ETag'].startswith('"1-'))
+        with mock.patch('courses.cache.catalog_version', return_value=1):
+            APIClient().get('/api/courses/')
+        self.assertEqual((cache_stats()['misses'], cache_stats()['hits']), (1, 1))
+
+
+@override_settings(DATABASE_REPLICAS=['lagging'])
+class CatalogCacheFillTests(TransactionTestCase):
+    # Outside TestCase's transaction, which would keep every read on the primary
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.course = make_course('Gita')
+        Lesson.objects.create(course=self.course, title='2.1')
+
+    def test_cache_misses_read_the_primary(self):
+        # The "lagging" replica is not configured, so reading it would fail
+        for url in ('/api/courses/', f'/api/courses/{self.course.pk}/', '/api/courses/?search=gita'):
+            self.assertEqual(APIClient().get(url).status_code, 200)
+
+    async def test_async_cache_misses_read_the_primary(self):
+        factory = AsyncRequestFactory()
+        response = await AsyncCourseListView.as_view()(factory.get('/api/courses/'))
+        self.assertEqual(json.loads(response.content)['count'], 1)
+        response = await AsyncCourseDetailView.as_view()(factory.get('/'), pk=self.course.pk)
+        self.assertEqual(json.loads(response.content)['title'], 'Gita')
+
+
+class DashboardTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='learner@example.com', password=None, full_name='Learner')
+        self.courses = [make_course('Gita'), make_course('Sutras')]
+        self.lessons = [
+            [Lesson.objects.create(course=course, title=f'{course.title} {n}', order=n) for n in range(3)]
+            for course in self.courses
+        ]
+        for course in self.courses:
+            Enrollment.objects.create(user=self.user, course=course, total_lessons=3)
+        record_progress(self.user, self.lessons[0][0], {'is_completed': True})
+        record_progress(self.user, self.lessons[0][1], {'last_position_seconds': 30})
+        for lesson in self.lessons[1]:
+            record_progress(self.user, lesson, {'is_completed': True})
+
+    def test_next_lesson_skips_completed_ones(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        enrollments = self.client.get('/api/courses/dashboard/').json()['enrollments']
+        resume = {item['course']['title']: item['next_lesson'] for item in enrollments}
+        first, finished = resume['Gita'], resume['Sutras']
+        self.assertEqual((first['title'], first['last_position_seconds']), ('Gita 1', 30))
+        self.assertIsNone(finished)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_progress_through_another_worker_shows_at_once(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/courses/dashboard/')
+        # Like a write through another worker: TestCase never commits, so
+        # no bump reaches this process's cache either
+        record_progress(self.user, self.lessons[0][1], {'is_completed': True})
+        enrollments = self.client.get('/api/courses/dashboard/').json()['enrollments']
+        resume = {item['course']['title']: item['next_lesson'] for item in enrollments}
+        self.assertEqual(resume['Gita']['title'], 'Gita 2')
+
+    def test_progress_on_another_shard(self):
+        completions = LessonProgress.objects.using(shard_for(self.user)).filter(is_completed=True)
+        completed = set(completions.values_list('lesson_id', flat=True))
+        lessons = next_lessons([course.pk for course in self.courses], self.user, 'shard1', completed)
+        self.assertEqual({lesson.title for lesson in lessons.values()}, {'Gita 1'})
+
+
+class LeaderboardTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        leaderboard.reload_all()
+        self.course = make_course('Gita')
+        self.users = []
+        for n, xp in enumerate([50, 30, 30, 30, 10, 0]):
+            user = User.objects.create_user(email=f'learner{n}@example.com', password=None, full_name=f'Learner {n}')
+            User.objects.filter(pk=user.pk).update(total_xp=xp)
+            Enrollment.objects.create(user=user, course=self.course)
+            Enrollment.objects.filter(user=user).update(xp_earned=xp // 10)
+            self.users.append(user)
+        self.tied = sorted(user.pk for user in self.users[1:4])
+
+    def test_ties_share_a_rank(self):
+        board = leaderboard.StoredBoard(leaderboard.global_board())
+        self.assertEqual([(entry['rank'], entry['score']) for entry in board.top(10)], [
+            (1, 50), (2, 30), (2, 30), (2, 30), (5, 10),
+        ])
+        self.assertEqual([entry['user_id'] for entry in board.top(10)[1:4]], self.tied)
+        self.assertEqual((board.rank(self.users[2].pk), board.rank(self.users[5].pk)), (2, 6))
+
+    def test_stored_board_answers_like_the_memory_board(self):
+        for name in (leaderboard.global_board(), leaderboard.course_board(self.course.pk)):
+            memory, stored = leaderboard.load(name), leaderboard.StoredBoard(name)
+            self.assertEqual(len(memory), len(stored))
+            self.assertEqual(memory.top(3), stored.top(3))
+            for user in self.users:
+                self.assertEqual(memory.rank(user.pk), stored.rank(user.pk))
+                for count in range(4):
+                    with self.subTest(name, user=user.full_name, count=count):
+                        self.assertEqual(memory.around(user.pk, count), stored.around(user.pk, count))
+
+    def test_around_an_unranked_user_ends_the_board(self):
+        around = leaderboard.StoredBoard(leaderboard.global_board()).around(self.users[5].pk, 2)
+        self.assertEqual([(entry['rank'], entry['score']) for entry in around], [(2, 30), (5, 10)])
+
+    def get(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/courses/leaderboard/', params)
+
+    def test_endpoint_with_and_without_a_shared_cache(self):
+        responses = []
+        for shared in (True, False):
+            with self.subTest(shared=shared), override_settings(SHARED_CACHE=shared):
+                response = self.get(self.users[2], board='course', course=self.course.pk, limit=2, neighbours=1)
+                self.assertEqual(response.status_code, 200)
+                responses.append(response.json())
+        self.assertEqual(responses[0], responses[1])
+        data = responses[1]
+        self.assertEqual((data['size'], data['me']), (5, {'rank': 2, 'score': 3}))
+        first_tied = User.objects.get(pk=self.tied[0]).full_name
+        self.assertEqual([entry['full_name'] for entry in data['top']], ['Learner 0', first_tied])
+        self.assertEqual(data['around'][1]['user_id'], str(self.users[2].pk))
+
+    def test_endpoint_rejects_unknown_boards(self):
+        self.assertEqual(self.get(self.users[0], board='monthly').status_code, 400)
+        self.assertEqual(self.get(self.users[0], board='course').status_code, 400)
+
+
+class CourseDetailTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.course = make_course('Gita', description='Chapter two')
+        Lesson.objects.create(course=self.course, title='2.1', transcript='Verse 1.')
+        Lesson.objects.create(course=self.course, title='Draft', is_published=False)
+        self.url = f'/api/courses/{self.course.pk}/'
+
+    def add_reviews(self, count):
+        for n in range(count):
+            user = User.objects.create_user(email=f'{uuid.uuid4().hex}@example.com', password=None, full_name='Reviewer')
+            with self.captureOnCommitCallbacks(execute=True):
+                Review.objects.create(user=user, course=self.course, rating=5, comment=f'review {n}')
+
+    def get(self, url, **params):
+        cache.clear()
+        response = APIClient().get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_fields_and_include(self):
+        self.add_reviews(1)
+        data = self.get(self.url, fields='title', include='lessons')
+        self.assertEqual(set(data), {'id', 'title', 'lessons'})
+        self.assertEqual([lesson['title'] for lesson in data['lessons']], ['2.1'])
+        self.assertNotIn('transcript', data['lessons'][0])
+        self.assertEqual(set(self.get(self.url, include='')) & {'lessons', 'reviews', 'reviews_next'}, set())
+        self.assertIsNone(self.get(self.url)['reviews_next'])
+
+    @override_settings(COURSE_DETAIL_REVIEWS=2)
+    def test_reviews_next_continues_the_embedded_reviews(self):
+        for by_id in (False, True):
+            with self.subTest(by_id=by_id), override_settings(TIME_ORDERED_IDS=by_id, KEYSET_BY_ID=by_id):
+                User.objects.all().delete()
+                Course.objects.filter(pk=self.course.pk).update(total_reviews=0)
+                self.add_reviews(5)
+                data = self.get(self.url)
+                comments = [review['comment'] for review in data['reviews']]
+                rest = self.get(data['reviews_next'])['results']
+                comments += [review['comment'] for review in rest]
+                self.assertEqual(comments, [f'review {n}' for n in range(4, -1, -1)])
+
+    def test_query_count_does_not_grow_with_the_course(self):
+        # The catalog version (for the ETag and Last-Modified), the course,
+        # its lessons and its latest reviews with their authors
+        self.add_reviews(1)
+        with self.assertNumQueries(5):
+            self.get(self.url)
+        self.add_reviews(3)
+        for n in range(5):
+            Lesson.objects.create(course=self.course, title=f'3.{n}')
+        with self.assertNumQueries(5):
+            self.get(self.url)
+
+
+class TranscriptTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.text = ''.join(f'Verse {n}. ' for n in range(200))
+        lesson = Lesson.objects.create(course=make_course('Gita'), title='2.1', transcript=self.text)
+        self.url = f'/api/courses/lessons/{lesson.pk}/transcript/'
+        self.etag = f'"{lesson.transcript_hash}"'
+
+    def get(self, **headers):
+        return APIClient().get(self.url, **{f'HTTP_{name.upper()}': value for name, value in headers.items()})
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        for ignored in (None, '', 'bytes=-', 'bytes=0-1,5-6', 'items=0-1'):
+            self.assertIsNone(parse_range(ignored, 100))
+        for unsatisfiable in ('bytes=100-', 'bytes=9-2'):
+            with self.assertRaises(ValueError):
+                parse_range(unsatisfiable, 100)
+
+    def test_gzip_is_its_own_representation(self):
+        plain = self.get()
+        self.assertEqual((plain['ETag'], plain.content.decode()), (self.etag, self.text))
+        gzipped = self.get(accept_encoding='gzip')
+        self.assertEqual(gzipped['ETag'], self.etag[:-1] + '-gz"')
+        self.assertEqual(gzip.decompress(gzipped.content).decode(), self.text)
+        for response in (plain, gzipped):
+            self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(self.get(if_none_match=self.etag).status_code, 304)
+        self.assertEqual(self.get(if_none_match=self.etag, accept_encoding='gzip').status_code, 200)
+        self.assertEqual(self.get(if_none_match=gzipped['ETag'], accept_encoding='gzip').status_code, 304)
+
+    def test_ranges(self):
+        response = self.get(range='bytes=8-15', accept_encoding='gzip')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content.decode(), self.text[8:16])
+        self.assertEqual(response['Content-Range'], f'bytes 8-15/{len(self.text)}')
+        self.assertEqual(response['ETag'], self.etag)
+
+        response = self.get(range=f'bytes={len(self.text)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.text)}')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_if_range(self):
+        self.assertEqual(self.get(range='bytes=0-4', if_range=self.etag).status_code, 206)
+        # A validator of another representation or version gets the whole body
+        for stale in (self.etag[:-1] + '-gz"', '"other"'):
+            response = self.get(range='bytes=0-4', if_range=stale, accept_encoding='gzip')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(gzip.decompress(response.content).decode(), self.text)
+
+
+class TranscriptSearchTests(TestCase):
+    databases = '__all__'
+    text = '[00:05] Dhṛtarāṣṭra uvāca\n[1:02:03.5] karmaṇy evādhikāras te\nmā phaleṣu kadācana\n\nuntimed verse\n'
+
+    def setUp(self):
+        self.course = make_course('Gita')
+        self.lesson = Lesson.objects.create(course=self.course, title='2.47', transcript=self.text)
+
+    def search(self, query, course_id=None):
+        return [(row['lesson_id'], row['start_seconds']) for row in search_transcripts(query, course_id)]
+
+    def test_parse_segments(self):
+        lines = self.text.splitlines(keepends=True)
+        self.assertEqual(parse_segments(self.text), [
+            (5, 0, 'Dhṛtarāṣṭra uvāca'),
+            (3723, len(lines[0].encode()), 'karmaṇy evādhikāras te mā phaleṣu kadācana'),
+            # Untimed text inherits the last time code
+            (3723, len(''.join(lines[:4]).encode()), 'untimed verse'),
+        ])
+        self.assertEqual(
+            parse_segments('WEBVTT\n\n00:01:23.000 --> 00:01:30.000\nyoga-sthaḥ\n'),
+            [(None, 0, 'WEBVTT'), (83, 38, 'yoga-sthaḥ')],
+        )
+        self.assertEqual(parse_segments('[1:2:3] not a time code\n'), [(None, 0, '[1:2:3] not a time code')])
+
+    def test_search_in_any_romanisation(self):
+        for query in ('karmany eva', 'KARMANY EVADHI', 'कर्मण्य', 'phaleshu'):
+            with self.subTest(query):
+                self.assertEqual(self.search(query), [(self.lesson.pk, 3723)])
+        row = search_transcripts('uvaca')[0]
+        self.assertEqual((row['course_id'], row['byte_offset']), (self.course.pk, 0))
+        self.assertEqual(self.search('uvaca karmany'), [])
+        self.assertEqual(self.search('karmany', course_id=make_course('Sutras').pk), [])
+        Lesson.objects.filter(pk=self.lesson.pk).update(is_published=False)
+        self.assertEqual(self.search('karmany'), [])
+
+    def test_editing_the_transcript_reindexes(self):
+        self.lesson.title = '2.48'
+        self.lesson.save()
+        self.assertEqual(self.search('karmany'), [(self.lesson.pk, 3723)])
+        self.lesson.transcript = '[02:00] yogasthaḥ kuru karmāṇi\n'
+        self.lesson.save()
+        self.assertEqual(self.search('karmany'), [])
+        self.assertEqual(self.search('yogastha'), [(self.lesson.pk, 120)])
+        self.lesson.transcript = ''
+        self.lesson.save()
+        self.assertEqual(self.search('yogastha'), [])
+        self.assertFalse(TranscriptSegment.objects.filter(lesson=self.lesson).exists())
+        self.assertFalse(TranscriptTerm.objects.exists())
+
+    @skipUnless(uses_term_table(), 'the term table')
+    def test_term_lookups_are_indexed(self):
+        for query in ('karmany', 'karmany eva'):
+            for course_id in (None, self.course.pk):
+                with self.subTest(query=query, course_id=course_id):
+                    with record_queries(['default']) as statements:
+                        search_transcripts(query, course_id)
+                    self.assertEqual([full_scans(*statement) for statement in statements], [set()])
@@ -0,0 +1,162 @@
+"""
+Time-coded search over lesson transcripts.
+
+Transcripts are split into segments. A line opening with a time code such as
+"[01:23]", "[1:02:03]" or a WebVTT cue "00:01:23.000 --> 00:01:30.000"
+starts a new segment stamped with that time; untimed text is split on blank
+lines and inherits the last time seen. Each segment records the byte offset
+it starts at, which can be passed straight to the transcript endpoint as a
+Range.
+
+On Postgres segments are matched through the GIN index on their tsvector
+that migration 0007 creates. Other databases use TranscriptTerm rows filled
+in Python with the phonetic key of every word, so a query in any script or
+romanisation finds the verse.
+Lessons are re-indexed from a post_save signal whenever their transcript
+hash changes.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, F
+from django.db.models.expressions import RawSQL
+
+from .models import TranscriptSegment, TranscriptTerm
+from .search import _tsquery, query_terms
+from .transliteration import phonetic_key, prefix_range
+
+TIMECODE_RE = re.compile(
+    r'^(?:\[(?:(\d+):)?(\d{1,2}):(\d{2})(?:[.,]\d+)?\]'
+    r'|(\d+):(\d{2}):(\d{2})(?:[.,]\d+)?(?:\s*-->\s*\S+)?)\s*'
+)
+MAX_SEGMENT_CHARS = 1000
+TERM_LENGTH = 64
+SNIPPET_CONTEXT = 80
+
+
+def _timecode_seconds(match):
+    groups = match.groups()
+    hours, minutes, seconds = groups[:3] if groups[1] is not None else groups[3:]
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def parse_segments(text):
+    """Split ``text`` into ``[(start_seconds, byte_offset, text)]``."""
+    segments = []
+    lines = []
+    seconds = offset = None
+    size = position = 0
+
+    def close():
+        if lines:
+            segments.append((seconds, offset, ' '.join(lines)))
+            lines.clear()
+
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        match = TIMECODE_RE.match(stripped)
+        if match or not stripped or size >= MAX_SEGMENT_CHARS:
+            close()
+            size = 0
+        if match:
+            seconds = _timecode_seconds(match)
+            stripped = stripped[match.end():]
+        if stripped:
+            if not lines:
+                offset = position
+            lines.append(stripped)
+            size += len(stripped)
+        position += len(line.encode())
+    close()
+    return segments
+
+
+def segment_terms(text):
+    """Phonetic keys of the distinct words in ``text``."""
+    words = {word.lower() for word in query_terms(text)}
+    return {key[:TERM_LENGTH] for key in map(phonetic_key, words) if key}
+
+
+def uses_term_table():
+    return connection.vendor != 'postgresql'
+
+
+def index_lesson(lesson):
+    """Replace the indexed segments of ``lesson`` with its current transcript."""
+    with transaction.atomic():
+        TranscriptSegment.objects.filter(lesson=lesson).delete()
+        segments = TranscriptSegment.objects.bulk_create([
+            TranscriptSegment(
+                lesson=lesson, position=position, start_seconds=seconds,
+                byte_offset=offset, text=text,
+            )
+            for position, (seconds, offset, text) in enumerate(parse_segments(lesson.transcript))
+        ])
+        if uses_term_table():
+            TranscriptTerm.objects.bulk_create(
+                [
+                    TranscriptTerm(segment=segment, term=term)
+                    for segment in segments
+                    for term in segment_terms(segment.text)
+                ],
+                batch_size=1000,
+            )
+    return len(segments)
+
+
+def highlight(text, words):
+    """A window of ``text`` around the first literal match of ``words``."""
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+    match = pattern.search(text)
+    if match is None:
+        return text[:2 * SNIPPET_CONTEXT] + ('…' if len(text) > 2 * SNIPPET_CONTEXT else '')
+    start = max(match.start() - SNIPPET_CONTEXT, 0)
+    end = min(match.end() + SNIPPET_CONTEXT, len(text))
+    return '%s%s<mark>%s</mark>%s%s' % (
+        '…' if start else '', text[start:match.start()], match.group(),
+        text[match.end():end], '…' if end < len(text) else '',
+    )
+
+
+def search_transcripts(query, course_id=None, limit=20):
+    """
+    Segments of published lessons that mention every word of ``query``.
+
+    The last word matches as a prefix. Returns a list of dicts with the
+    lesson, course, time code, byte offset and a highlighted snippet.
+    """
+    words = query_terms(query)
+    if not words:
+        return []
+    segments = TranscriptSegment.objects.filter(
+        lesson__is_published=True, lesson__course__is_published=True,
+    )
+    if course_id:
+        segments = segments.filter(lesson__course_id=course_id)
+
+    if uses_term_table():
+        keys = [key[:TERM_LENGTH] for key in map(phonetic_key, words) if key]
+        if not keys:
+            return []
+        for key in keys[:-1]:
+            segments = segments.filter(id__in=TranscriptTerm.objects.filter(term=key).values('segment'))
+        segments = segments.filter(
+            id__in=TranscriptTerm.objects.filter(**prefix_range('term', keys[-1])).values('segment')
+        )
+    else:
+        segments = segments.alias(matched=RawSQL(
+            "to_tsvector('simple', transcript_segments.text) @@ to_tsquery('simple', %s)",
+            [_tsquery(words)], output_field=BooleanField(),
+        )).filter(matched=True)
+
+    rows = segments.order_by('lesson__course__title', 'lesson__order', 'position').values(
+        'text', 'start_seconds', 'byte_offset', 'lesson_id',
+        lesson_title=F('lesson__title'),
+        course_id=F('lesson__course'),
+        course_title=F('lesson__course__title'),
+    )[:limit]
+    results = []
+    for row in rows:
+        row['snippet'] = highlight(row.pop('text'), words)
+        results.append(row)
+    return results
@@ -0,0 +1,108 @@
+"""
+Serving lesson transcripts on their own endpoint.
+
+Transcripts run to hundreds of KB, so Lesson's default manager defers the
+column and lesson payloads carry only its hash and length. The transcript
+endpoint answers If-None-Match from the hash without loading the text,
+honours single byte ranges so players can fetch a section, and gzips full
+responses, keeping the compressed body in the cache under the hash. The
+gzipped body is another representation, so it has its own ETag (the hash
+with a ``-gz`` suffix), and ranges are only served from the plain text.
+"""
+import gzip
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+GZIP_TIMEOUT = 24 * 60 * 60
+
+
+def transcript_digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def parse_range(header, length):
+    """
+    Return the inclusive ``(start, end)`` byte range requested by ``header``.
+
+    Returns None when the header should be ignored (absent, malformed or a
+    multi-range request, which is answered with the whole body) and raises
+    ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N is the last N bytes
+        start, end = max(length - int(last), 0), length - 1
+    else:
+        start = int(first)
+        end = min(int(last), length - 1) if last else length - 1
+    if start >= length or start > end:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def _gzipped(digest, data):
+    key = f'transcript-gzip:{digest}'
+    body = cache.get(key)
+    if body is None:
+        body = gzip.compress(data, mtime=0)
+        cache.set(key, body, GZIP_TIMEOUT)
+    return body
+
+
+def _if_none_match(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+def transcript_response(request, digest, length, load):
+    """
+    Build the response for a transcript with ``digest`` and byte ``length``.
+
+    ``load`` is only called when the body is actually sent.
+    """
+    etag = f'"{digest}"'
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), length)
+        except ValueError:
+            byte_range = False
+    gzipped = (
+        byte_range is None and length > 512 and 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    if gzipped:
+        etag = f'"{digest}-gz"'
+
+    if _if_none_match(request, etag):
+        response = HttpResponse(status=304)
+    elif byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{length}'
+    else:
+        data = load().encode()
+        if byte_range is not None:
+            start, end = byte_range
+            response = HttpResponse(data[start:end + 1], status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{length}'
+        elif gzipped:
+            response = HttpResponse(_gzipped(digest, data))
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(data)
+        response['Content-Length'] = len(response.content)
+        response['Content-Type'] = 'text/plain; charset=utf-8'
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
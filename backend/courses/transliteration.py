@@ -0,0 +1,128 @@
+"""
+Script-agnostic phonetic keys for Sanskrit text.
+
+Devanagari, IAST, ITRANS, Harvard-Kyoto and casual English spellings of the
+same word all reduce to one lowercase ASCII key, so "Bhagavad Gita",
+"bhagavadgītā", "bhagavadgItA" and "भगवद्गीता" share the key "bhagavadgit".
+The key is deliberately lossy (vowel length, retroflex/dental and sibilant
+distinctions are folded away) since it only has to make lookups agree.
+"""
+import re
+import unicodedata
+
+VIRAMA = '्'
+NUKTA = '़'
+
+DEVANAGARI_VOWELS = {
+    'अ': 'a', 'आ': 'a', 'इ': 'i', 'ई': 'i', 'उ': 'u', 'ऊ': 'u',
+    'ऋ': 'r', 'ॠ': 'r', 'ऌ': 'l', 'ॡ': 'l',
+    'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au',
+}
+
+DEVANAGARI_VOWEL_SIGNS = {
+    'ा': 'a', 'ि': 'i', 'ी': 'i', 'ु': 'u', 'ू': 'u',
+    'ृ': 'r', 'ॄ': 'r', 'ॢ': 'l', 'ॣ': 'l',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au',
+}
+
+DEVANAGARI_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'c', 'छ': 'ch', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v', 'ळ': 'l',
+    'श': 's', 'ष': 's', 'स': 's', 'ह': 'h',
+}
+
+DEVANAGARI_MARKS = {
+    'ं': 'n', 'ँ': 'n', 'ः': 'h', 'ॐ': 'om',
+    'ऽ': '', '।': ' ', '॥': ' ',
+}
+
+DEVANAGARI_DIGITS = {chr(0x0966 + n): str(n) for n in range(10)}
+
+# Romanisation digraphs folded onto a single letter, applied in order. ITRANS
+# and Harvard-Kyoto spell long vowels and retroflexes with doubled or
+# capital letters, which lowercasing plus the collapse of repeated letters
+# below already takes care of.
+DIGRAPHS = (
+    ('chh', 'c'), ('ch', 'c'), ('sh', 's'), ('x', 'ks'), ('z', 's'),
+    ('ee', 'i'), ('oo', 'u'), ('w', 'v'), ('f', 'ph'), ('q', 'k'),
+)
+
+REPEATED_RE = re.compile(r'(.)\1+')
+NON_ALNUM_RE = re.compile(r'[^a-z0-9 ]+')
+
+
+def devanagari_to_latin(text):
+    out = []
+    pending_a = False
+    for char in text:
+        if char == NUKTA:
+            continue
+        if char in DEVANAGARI_CONSONANTS:
+            if pending_a:
+                out.append('a')
+            out.append(DEVANAGARI_CONSONANTS[char])
+            pending_a = True
+            continue
+        if char in DEVANAGARI_VOWEL_SIGNS:
+            out.append(DEVANAGARI_VOWEL_SIGNS[char])
+        elif char == VIRAMA:
+            pass
+        else:
+            if pending_a:
+                out.append('a')
+            for table in (DEVANAGARI_VOWELS, DEVANAGARI_MARKS, DEVANAGARI_DIGITS):
+                if char in table:
+                    out.append(table[char])
+                    break
+            else:
+                out.append(char)
+        pending_a = False
+    if pending_a:
+        out.append('a')
+    return ''.join(out)
+
+
+def _fold_word(word):
+    for digraph, replacement in DIGRAPHS:
+        word = word.replace(digraph, replacement)
+    word = REPEATED_RE.sub(r'\1', word)
+    # Vocalic r is written "ri" in casual spelling and "r" after folding ṛ
+    word = word.replace('ri', 'r')
+    # Drop the final inherent vowel that Hindi-style spellings omit
+    if len(word) > 1 and word.endswith('a'):
+        word = word[:-1]
+    return word
+
+
+def phonetic_words(text):
+    """The keys of the words of ``text``; phonetic_key() runs them together."""
+    if not text:
+        return []
+    text = devanagari_to_latin(text)
+    # ṃ and ṁ are nasals before a consonant; fold them like the Devanagari ं
+    text = text.replace('ṃ', 'n').replace('ṁ', 'n').replace('Ṃ', 'n').replace('Ṁ', 'n')
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = NON_ALNUM_RE.sub('', text.lower().replace('-', ' '))
+    return [_fold_word(word) for word in text.split()]
+
+
+def phonetic_key(text):
+    """Return the canonical search key for ``text``, or '' if it has none."""
+    return ''.join(phonetic_words(text))
+
+
+def prefix_range(field, key):
+    """
+    Lookup kwargs matching rows whose ``field`` starts with ``key``.
+
+    Expressed as a half-open range rather than ``startswith`` so it is served
+    by a plain B-tree index on every backend (SQLite's LIKE is case-insensitive
+    and cannot use one).
+    """
+    upper = key[:-1] + chr(ord(key[-1]) + 1)
+    return {f'{field}__gte': key, f'{field}__lt': upper}
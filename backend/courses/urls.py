@@ -1,16 +1,29 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
-    CourseListView, CourseDetailView, EnrollmentCreateView,
-    MyEnrollmentsView, LessonProgressView, CourseReviewView
+    CourseListView, CourseDetailView, LessonDetailView, LessonTranscriptView, TranscriptSearchView,
+    CatalogCacheStatsView, LearningStatsView, EnrollmentCreateView, MyEnrollmentsView, DashboardView, LeaderboardView,
+    LessonProgressView, LessonProgressBatchView, CourseReviewView
 )
 
 app_name = 'courses'
 
+if settings.ASYNC_VIEWS:
+    from .async_views import AsyncCourseListView as CourseListView, AsyncCourseDetailView as CourseDetailView
+
 urlpatterns = [
     path('', CourseListView.as_view(), name='course_list'),
     path('<uuid:pk>/', CourseDetailView.as_view(), name='course_detail'),
+    path('lessons/<uuid:pk>/', LessonDetailView.as_view(), name='lesson_detail'),
+    path('lessons/<uuid:pk>/transcript/', LessonTranscriptView.as_view(), name='lesson_transcript'),
+    path('transcripts/search/', TranscriptSearchView.as_view(), name='transcript_search'),
+    path('cache-stats/', CatalogCacheStatsView.as_view(), name='catalog_cache_stats'),
+    path('learning-stats/', LearningStatsView.as_view(), name='learning_stats'),
     path('enroll/', EnrollmentCreateView.as_view(), name='enroll'),
     path('my-enrollments/', MyEnrollmentsView.as_view(), name='my_enrollments'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
     path('lesson-progress/', LessonProgressView.as_view(), name='lesson_progress'),
+    path('lesson-progress/batch/', LessonProgressBatchView.as_view(), name='lesson_progress_batch'),
     path('<uuid:course_id>/reviews/', CourseReviewView.as_view(), name='course_reviews'),
 ]
@@ -1,17 +1,31 @@
+import uuid
+
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q
-from .models import Course, Lesson, Enrollment, LessonProgress, Review
+from django.conf import settings
+from django.db.models import Prefetch
+from django.db.models.functions import Upper
+from django.shortcuts import get_object_or_404
+from slokcamp.pagination import KeysetPagination, keyset_ordering
+from .cache import CatalogCacheMixin, CatalogConditionalMixin, cache_stats
+from . import leaderboard
+from .dashboard import get_dashboard
+from .models import Course, Lesson, Enrollment, Review
+from .progress import learning_stats, record_progress, record_progress_batch
+from .search import search_courses
+from .transcript_index import search_transcripts
+from .transcripts import transcript_response
 from .serializers import (
     CourseSerializer, CourseDetailSerializer, LessonSerializer,
     EnrollmentSerializer, LessonProgressSerializer, ReviewSerializer
 )
 
-class CourseListView(generics.ListAPIView):
+class CourseListView(CatalogConditionalMixin, CatalogCacheMixin, generics.ListAPIView):
     queryset = Course.objects.filter(is_published=True)
     serializer_class = CourseSerializer
     permission_classes = [permissions.AllowAny]
+    search_snippets = None
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -20,20 +34,108 @@ class CourseListView(generics.ListAPIView):
         search = self.request.query_params.get('search', None)
         
         if category:
-            queryset = queryset.filter(category__iexact=category)
+            # Like category__iexact, but through courses_catalog_idx
+            queryset = queryset.alias(category_key=Upper('category')).filter(category_key=category.upper())
         if difficulty:
             queryset = queryset.filter(difficulty=difficulty)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
+            queryset, self.search_snippets = search_courses(queryset, search)
         
         return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_snippets'] = self.search_snippets or {}
+        return context
 
-class CourseDetailView(generics.RetrieveAPIView):
+class CourseDetailView(CatalogConditionalMixin, CatalogCacheMixin, generics.RetrieveAPIView):
     queryset = Course.objects.filter(is_published=True)
     serializer_class = CourseDetailSerializer
     permission_classes = [permissions.AllowAny]
+    
+    def requested(self, param, default=None):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return default
+        return {name.strip() for name in value.split(',') if name.strip()}
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.requested('fields')
+        include = self.requested('include', CourseDetailSerializer.EMBEDS)
+        if fields is not None:
+            columns = {field.name for field in Course._meta.concrete_fields}
+            queryset = queryset.only('id', 'total_reviews', *(fields & columns))
+        if 'lessons' in include:
+            queryset = queryset.prefetch_related(Prefetch(
+                'lessons',
+                queryset=Lesson.objects.filter(is_published=True),
+                to_attr='published_lessons',
+            ))
+        if 'reviews' in include:
+            queryset = queryset.prefetch_related(Prefetch(
+                'reviews',
+                queryset=Review.objects.select_related('user').order_by(*keyset_ordering(Review))[:settings.COURSE_DETAIL_REVIEWS],
+                to_attr='recent_reviews',
+            ))
+        return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.requested('fields')
+        context['include'] = self.requested('include', CourseDetailSerializer.EMBEDS)
+        return context
+
+class LessonDetailView(CatalogConditionalMixin, CatalogCacheMixin, generics.RetrieveAPIView):
+    queryset = Lesson.objects.filter(is_published=True, course__is_published=True)
+    serializer_class = LessonSerializer
+    permission_classes = [permissions.AllowAny]
+
+class LessonTranscriptView(APIView):
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request, pk):
+        lessons = Lesson.objects.filter(pk=pk, is_published=True, course__is_published=True)
+        lesson = get_object_or_404(lessons.only('id', 'transcript_hash', 'transcript_length'))
+        return transcript_response(
+            request,
+            lesson.transcript_hash,
+            lesson.transcript_length,
+            lambda: lessons.values_list('transcript', flat=True).get(),
+        )
+
+class TranscriptSearchView(APIView):
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"detail": "The q parameter is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            limit = 20
+        results = search_transcripts(query, request.query_params.get('course'), limit)
+        return Response({'results': results})
+
+class CatalogCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return Response(cache_stats())
+
+class LearningStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        try:
+            days = min(max(int(request.query_params.get('days', 7)), 1), 365)
+        except ValueError:
+            days = 7
+        return Response(learning_stats(days))
 
 class EnrollmentCreateView(generics.CreateAPIView):
     serializer_class = EnrollmentSerializer
@@ -42,15 +144,52 @@ class EnrollmentCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         course_id = serializer.validated_data['course_id']
         course = Course.objects.get(id=course_id)
-        total_lessons = course.lessons.filter(is_published=True).count()
-        serializer.save(user=self.request.user, course=course, total_lessons=total_lessons)
+        serializer.save(user=self.request.user, course=course, total_lessons=course.lessons_count)
 
 class MyEnrollmentsView(generics.ListAPIView):
     serializer_class = EnrollmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-enrolled_at', '-id')
     
     def get_queryset(self):
-        return Enrollment.objects.filter(user=self.request.user)
+        return Enrollment.objects.filter(user=self.request.user).select_related('course')
+
+class DashboardView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        return Response(get_dashboard(request.user))
+
+class LeaderboardView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        board = request.query_params.get('board', 'global')
+        if board == 'global':
+            name = leaderboard.global_board()
+        elif board == 'weekly':
+            name = leaderboard.weekly_board()
+        elif board == 'course':
+            try:
+                course_id = uuid.UUID(request.query_params.get('course', ''))
+            except ValueError:
+                return Response(
+                    {"detail": "A valid course id is required"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            name = leaderboard.course_board(get_object_or_404(Course, id=course_id).id)
+        else:
+            return Response(
+                {"detail": "board must be one of global, weekly or course"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+            neighbours = min(int(request.query_params.get('neighbours', 2)), 25)
+        except ValueError:
+            limit, neighbours = 10, 2
+        return Response(leaderboard.standings(name, request.user, max(limit, 0), max(neighbours, 0)))
 
 class LessonProgressView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -58,43 +197,53 @@ class LessonProgressView(APIView):
     def post(self, request):
         serializer = LessonProgressSerializer(data=request.data)
         if serializer.is_valid():
-            lesson_id = serializer.validated_data['lesson_id']
-            lesson = Lesson.objects.get(id=lesson_id)
-            
-            progress, created = LessonProgress.objects.update_or_create(
-                user=request.user,
-                lesson=lesson,
-                defaults=serializer.validated_data
-            )
-            
-            # Update enrollment progress
-            enrollment = Enrollment.objects.filter(
-                user=request.user,
-                course=lesson.course
-            ).first()
-            
-            if enrollment:
-                completed = LessonProgress.objects.filter(
-                    user=request.user,
-                    lesson__course=lesson.course,
-                    is_completed=True
-                ).count()
-                
-                enrollment.completed_lessons = completed
-                if enrollment.total_lessons > 0:
-                    enrollment.progress_percentage = int((completed / enrollment.total_lessons) * 100)
-                enrollment.save()
-            
+            data = dict(serializer.validated_data)
+            lesson = get_object_or_404(Lesson, id=data.pop('lesson_id'))
+            progress, _ = record_progress(request.user, lesson, data)
             return Response(LessonProgressSerializer(progress).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LessonProgressBatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        events = request.data.get('events') if isinstance(request.data, dict) else request.data
+        if not isinstance(events, list):
+            return Response(
+                {"detail": "Expected a list of progress events"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(events) > settings.LESSON_PROGRESS_BATCH_MAX:
+            return Response(
+                {"detail": f"A batch can hold at most {settings.LESSON_PROGRESS_BATCH_MAX} events"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = []
+        valid = []
+        for index, event in enumerate(events):
+            serializer = LessonProgressSerializer(data=event)
+            if serializer.is_valid():
+                data = dict(serializer.validated_data)
+                lesson_id = data.pop('lesson_id')
+                valid.append((index, lesson_id, data))
+                # Overwritten below unless a later event for the lesson superseded it
+                results.append({'lesson_id': lesson_id, 'status': 'coalesced'})
+            else:
+                results.append({'status': 'invalid', 'errors': serializer.errors})
+        
+        for index, result in record_progress_batch(request.user, valid).items():
+            results[index]['status'] = result
+        return Response({'results': results})
+
 class CourseReviewView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         course_id = self.kwargs['course_id']
-        return Review.objects.filter(course_id=course_id)
+        return Review.objects.filter(course_id=course_id).select_related('user')
     
     def perform_create(self, serializer):
         course_id = self.kwargs['course_id']
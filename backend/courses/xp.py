@@ -0,0 +1,203 @@
+"""
+XP and streaks, driven by lesson completions.
+
+A lesson's xp_reward is awarded the first time its progress row flips to
+completed; LessonProgress.xp_awarded is set in the same compare-and-set
+UPDATE as is_completed (see courses.progress), so it can never be paid
+twice. XP is added with F(). Streaks come from User.activity_bitmap, where
+bit n marks a completion n days before last_active_date: a day's first
+completion shifts the bitmap and is written with a compare-and-set on
+last_active_date, every later one that day only adds XP. The same XP is
+added to the enrollment and to the user's WeeklyXP row, which back the
+course and weekly leaderboards.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.cache import bump_user
+from analytics.models import UserActivity
+from slokcamp.db.sharding import group_by_shard, shard_for
+
+from . import leaderboard
+from .models import Enrollment, Lesson, LessonProgress, WeeklyXP
+
+# Days of history kept in activity_bitmap; BigIntegerField holds 63 bits
+HISTORY_DAYS = 63
+MASK = (1 << HISTORY_DAYS) - 1
+MAX_ATTEMPTS = 3
+
+
+def shift_activity(bitmap, last_active_date, day):
+    """Return the bitmap with ``day`` marked, re-anchored on ``day``."""
+    if last_active_date is None:
+        return 1
+    gap = (day - last_active_date).days
+    if gap >= HISTORY_DAYS:
+        return 1
+    return ((bitmap << gap) | 1) & MASK
+
+
+def streak_length(bitmap):
+    """Consecutive active days ending at the bitmap's anchor day."""
+    streak = 0
+    while bitmap & 1:
+        streak += 1
+        bitmap >>= 1
+    return streak
+
+
+def current_streak(user, today=None):
+    """The user's streak as of ``today``; it lapses after a day without activity."""
+    today = today or timezone.localdate()
+    if user.last_active_date is None or (today - user.last_active_date).days > 1:
+        return 0
+    return user.current_streak
+
+
+def record_activity(user_id, xp, day=None):
+    """Add ``xp`` to the user and mark ``day`` active, all in one UPDATE."""
+    User = get_user_model()
+    day = day or timezone.localdate()
+    users = User.objects.filter(pk=user_id)
+    for _ in range(MAX_ATTEMPTS):
+        row = users.values('activity_bitmap', 'last_active_date').get()
+        last = row['last_active_date']
+        if last is not None and last >= day:
+            if xp:
+                users.update(total_xp=F('total_xp') + xp)
+            return
+        bitmap = shift_activity(row['activity_bitmap'], last, day)
+        if users.filter(last_active_date=last).update(
+            total_xp=F('total_xp') + xp,
+            activity_bitmap=bitmap,
+            last_active_date=day,
+            current_streak=streak_length(bitmap),
+        ):
+            return
+        # Another completion marked the day first; re-read and add XP only
+    raise RuntimeError('Could not record activity after %d attempts' % MAX_ATTEMPTS)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def add_weekly_xp(user_id, xp, day):
+    week = week_start(day)
+    WeeklyXP.objects.bulk_create([WeeklyXP(user_id=user_id, week=week)], ignore_conflicts=True)
+    WeeklyXP.objects.filter(user_id=user_id, week=week).update(xp=F('xp') + xp)
+
+
+def award_completions(user, completions):
+    """
+    Apply newly completed lessons for ``user``.
+
+    ``completions`` is a list of ``(lesson, xp)`` pairs where ``xp`` is what
+    the progress write awarded (0 when the lesson had paid out before).
+    Must run inside the progress transaction, which spans ``user``'s shard.
+    """
+    if not completions:
+        return
+    day = timezone.localdate()
+    total = sum(xp for _, xp in completions)
+    record_activity(user.pk, total, day)
+    bump_user(user.pk)
+    if total:
+        by_course = defaultdict(int)
+        for lesson, xp in completions:
+            by_course[lesson.course_id] += xp
+        for course_id, xp in by_course.items():
+            if xp:
+                Enrollment.objects.filter(user=user, course_id=course_id).update(xp_earned=F('xp_earned') + xp)
+        add_weekly_xp(user.pk, total, day)
+        leaderboard.publish_on_commit(user.pk, list(by_course), week_start(day))
+    UserActivity.objects.using(shard_for(user)).bulk_create([
+        UserActivity(
+            user=user, activity_type='lesson_complete',
+            metadata={'lesson_id': str(lesson.pk), 'course_id': str(lesson.course_id), 'xp': xp},
+        )
+        for lesson, xp in completions
+    ])
+
+
+def rebuild(users):
+    """
+    Recompute XP, activity bitmap, streak, weekly XP and each enrollment's
+    XP and completed lessons for ``users`` from their completed LessonProgress
+    rows: one query per shard for the rows, one for their lessons, then
+    batched writes.
+
+    Returns the number of users updated.
+    """
+    users = list(users.only('id', 'shard'))
+    shards = group_by_shard(users)
+    completed = [
+        row
+        for shard, group in shards.items()
+        for row in LessonProgress.objects.using(shard).filter(user__in=group, is_completed=True)
+        .values_list('user_id', 'lesson_id', 'completed_at')
+    ]
+    # The lessons are on the primary, so the rows are joined to them here
+    lessons = {
+        lesson_id: (course_id, xp_reward)
+        for lesson_id, course_id, xp_reward in Lesson.objects.filter(pk__in={row[1] for row in completed})
+        .values_list('id', 'course_id', 'xp_reward')
+    }
+    xp = defaultdict(int)
+    course_xp = defaultdict(int)
+    course_completed = defaultdict(int)
+    weekly_xp = defaultdict(int)
+    days = defaultdict(set)
+    for user_id, lesson_id, completed_at in completed:
+        if lesson_id not in lessons:
+            # Its lesson was deleted and the row is waiting to be cleaned up
+            continue
+        course_id, reward = lessons[lesson_id]
+        xp[user_id] += reward
+        course_xp[user_id, course_id] += reward
+        course_completed[user_id, course_id] += 1
+        if completed_at is not None:
+            day = timezone.localdate(completed_at)
+            days[user_id].add(day)
+            weekly_xp[user_id, week_start(day)] += reward
+    weekly = [WeeklyXP(user_id=user_id, week=week, xp=amount) for (user_id, week), amount in weekly_xp.items()]
+    enrollments = list(
+        Enrollment.objects.filter(user__in=users).only('id', 'user_id', 'course_id', 'total_lessons')
+    )
+    for enrollment in enrollments:
+        key = enrollment.user_id, enrollment.course_id
+        enrollment.xp_earned = course_xp[key]
+        enrollment.completed_lessons = course_completed[key]
+        enrollment.progress_percentage = (
+            enrollment.completed_lessons * 100 // enrollment.total_lessons if enrollment.total_lessons else 0
+        )
+
+    for user in users:
+        user.total_xp = xp[user.pk]
+        user.activity_bitmap = 0
+        user.last_active_date = None
+        for day in sorted(days[user.pk]):
+            user.activity_bitmap = shift_activity(user.activity_bitmap, user.last_active_date, day)
+            user.last_active_date = day
+        user.current_streak = streak_length(user.activity_bitmap)
+
+    with transaction.atomic():
+        for shard, group in shards.items():
+            with transaction.atomic(using=shard):
+                progress = LessonProgress.objects.using(shard).filter(user__in=group)
+                progress.filter(is_completed=True, xp_awarded=False).update(xp_awarded=True)
+                progress.filter(is_completed=False, xp_awarded=True).update(xp_awarded=False)
+        get_user_model().objects.bulk_update(
+            users, ['total_xp', 'activity_bitmap', 'last_active_date', 'current_streak'], batch_size=500,
+        )
+        Enrollment.objects.bulk_update(
+            enrollments, ['xp_earned', 'completed_lessons', 'progress_percentage'], batch_size=500,
+        )
+        WeeklyXP.objects.filter(user__in=users).delete()
+        WeeklyXP.objects.bulk_create(weekly, batch_size=500)
+    return len(users)
@@ -1,12 +1,17 @@
+import io
 import os
+from datetime import timedelta
+
 import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'slokcamp.settings')
 django.setup()
 
 from django.contrib.auth import get_user_model
-from courses.models import Course, Lesson, Review
-from decimal import Decimal
+from django.core.management import call_command
+from django.utils import timezone
+from courses.models import Course, Enrollment, Lesson, LessonProgress, Review
+from slokcamp.db.sharding import shard_for
 
 User = get_user_model()
 
@@ -33,8 +38,6 @@ test_user, created = User.objects.get_or_create(
     defaults={
         'full_name': 'Test User',
         'role': 'user',
-        'total_xp': 2450,
-        'current_streak': 7,
     }
 )
 if created:
@@ -53,9 +56,6 @@ courses_data = [
         'duration_hours': 12,
         'instructor_name': 'Dr. Priya Sharma',
         'instructor_bio': 'PhD in Sanskrit Studies with 15 years of teaching experience',
-        'rating': Decimal('4.8'),
-        'total_reviews': 245,
-        'total_students': 1250,
         'thumbnail_image': 'https://images.unsplash.com/photo-1532012197267-da84d127e765?w=400',
     },
     {
@@ -67,9 +67,6 @@ courses_data = [
         'duration_hours': 16,
         'instructor_name': 'Vaidya Ramesh Kumar',
         'instructor_bio': 'Certified Ayurvedic practitioner with 20+ years experience',
-        'rating': Decimal('4.9'),
-        'total_reviews': 189,
-        'total_students': 980,
         'thumbnail_image': 'https://images.unsplash.com/photo-1506126613408-eca07ce68773?w=400',
     },
     {
@@ -81,9 +78,6 @@ courses_data = [
         'duration_hours': 8,
         'instructor_name': 'Swami Ananda',
         'instructor_bio': 'Meditation teacher and spiritual guide for 25+ years',
-        'rating': Decimal('4.7'),
-        'total_reviews': 312,
-        'total_students': 1450,
         'thumbnail_image': 'https://images.unsplash.com/photo-1506126613408-eca07ce68773?w=400',
     },
     {
@@ -95,9 +89,6 @@ courses_data = [
         'duration_hours': 20,
         'instructor_name': 'Guru Sita Devi',
         'instructor_bio': 'E-RYT 500 certified yoga teacher and philosopher',
-        'rating': Decimal('4.9'),
-        'total_reviews': 156,
-        'total_students': 720,
         'thumbnail_image': 'https://images.unsplash.com/photo-1544367567-0f2fcb009e0b?w=400',
     },
 ]
@@ -126,6 +117,26 @@ for course_data in courses_data:
             )
         print(f'  ✓ Added 12 lessons to {course.title}')
 
+# A week of daily completions for the test user; their XP and streak are
+# rebuilt from these rows like backfill_xp does for everyone
+course = Course.objects.get(title=courses_data[0]['title'])
+course.refresh_from_db()
+enrollment, created = Enrollment.objects.get_or_create(
+    user=test_user, course=course, defaults={'total_lessons': course.lessons_count},
+)
+if created:
+    now = timezone.now()
+    LessonProgress.objects.using(shard_for(test_user)).bulk_create([
+        LessonProgress(
+            user=test_user, lesson=lesson, is_completed=True, completion_percentage=100,
+            completed_at=now - timedelta(days=days_ago),
+        )
+        for days_ago, lesson in enumerate(course.lessons.order_by('order')[:7])
+    ])
+    call_command('backfill_xp', str(test_user.pk), stdout=io.StringIO())
+    test_user.refresh_from_db()
+    print(f'✓ Enrolled {test_user.email} in {course.title}: {test_user.total_xp} XP, {test_user.current_streak}-day streak')
+
 print('\n✅ Database seeded successfully!')
 print(f'\n📝 Admin Credentials:')
 print(f'   Email: admin@slokcamp.com')
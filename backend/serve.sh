@@ -0,0 +1,18 @@
+#!/bin/sh
+# Serve the API under gunicorn.
+#   SERVER_PROFILE=wsgi (default)  sync workers running slokcamp.wsgi
+#   SERVER_PROFILE=asgi            uvicorn workers running slokcamp.asgi with the async views,
+#                                  sharing a connection pool per worker (DB_POOL_MODE=pool)
+set -e
+
+BIND="0.0.0.0:${PORT:-8000}"
+WORKERS="${WEB_CONCURRENCY:-3}"
+
+if [ "${SERVER_PROFILE:-wsgi}" = "asgi" ]; then
+    export ASYNC_VIEWS="${ASYNC_VIEWS:-1}"
+    export DB_POOL_MODE="${DB_POOL_MODE:-pool}"
+    exec gunicorn slokcamp.asgi:application --worker-class uvicorn.workers.UvicornWorker \
+        --bind "$BIND" --workers "$WORKERS"
+fi
+
+exec gunicorn slokcamp.wsgi:application --bind "$BIND" --workers "$WORKERS"
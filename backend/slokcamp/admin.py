@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib import admin
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.http import QueryDict
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Picks the shard a ShardedModelAdmin lists; the primary's by default."""
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in settings.DATABASE_SHARDS]
+
+    def choices(self, changelist):
+        current = self.value() or DEFAULT_DB_ALIAS
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': current == alias,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        # Applied by ShardedModelAdmin.get_queryset
+        return queryset
+
+
+class ShardedModelAdmin(admin.ModelAdmin):
+    """Admin for a model sharded by user, listing one shard at a time."""
+
+    def get_list_filter(self, request):
+        return (ShardFilter, *super().get_list_filter(request))
+
+    def get_shard(self, request):
+        # The change form keeps the list's filters in _changelist_filters
+        shard = request.GET.get('shard') or QueryDict(request.GET.get('_changelist_filters', '')).get('shard')
+        return shard if shard in settings.DATABASE_SHARDS else DEFAULT_DB_ALIAS
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(self.get_shard(request))
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        # search_fields name fields of related models, which live on the
+        # primary: match there and filter the shard by their ids
+        condition = Q()
+        for lookup in self.search_fields:
+            relation, _, field = lookup.partition('__')
+            related = self.model._meta.get_field(relation).related_model
+            ids = related._default_manager.using(DEFAULT_DB_ALIAS).filter(**{f'{field}__icontains': search_term})
+            condition |= Q(**{f'{relation}__in': list(ids.values_list('pk', flat=True))})
+        return queryset.filter(condition), False
@@ -8,9 +8,16 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
+import threading
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "slokcamp.settings")
 
 application = get_asgi_application()
+
+if settings.LEADERBOARD_WARM and settings.SHARED_CACHE:
+    from courses.leaderboard import warm
+
+    threading.Thread(target=warm, name='leaderboard-warm', daemon=True).start()
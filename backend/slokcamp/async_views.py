@@ -0,0 +1,101 @@
+"""
+Async views for the ASGI serving profile.
+
+DRF 3.14 has no async views, so the async endpoints are plain Django views
+with ``async def`` handlers. They build their querysets, serializers and
+paginators from the DRF view they stand in for and await the ORM and cache
+through Django's async APIs; serializers only see rows whose relations are
+already loaded, so rendering never queries. Writes are handed to the DRF
+view in a thread, which keeps authentication, validation and permissions in
+one place.
+
+The URLconfs route to these views when ASYNC_VIEWS is set, which
+serve.sh does for SERVER_PROFILE=asgi.
+"""
+import calendar
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class AsyncAPIView(View):
+    """
+    Base async view: JSON responses, DRF-style error bodies, no CSRF check
+    (like DRF views, these authenticate with JWTs, not session cookies).
+    """
+    http_method_names = ['get', 'head', 'options']
+    # The DRF view this one stands in for
+    drf_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Not found.'}, status=404)
+        except APIException as exc:
+            return json_response({'detail': exc.detail}, status=exc.status_code)
+
+    def get_drf_view(self, request, *args, **kwargs):
+        """An instance of ``drf_view`` set up as if it were serving ``request``."""
+        return self.drf_view(request=request, args=args, kwargs=kwargs, format_kwarg=None)
+
+    async def delegate(self, request, *args, **kwargs):
+        """Serve ``request`` with the DRF view, in a thread."""
+        return await sync_to_async(self.drf_view.as_view())(request, *args, **kwargs)
+
+
+class AsyncReadView(AsyncAPIView):
+    """
+    Async GET with conditional-request support.
+
+    Subclasses implement ``get_data()`` and may implement ``get_etag()`` and
+    ``get_last_modified()``; all three are coroutines receiving a DRF Request
+    and the URL kwargs. A matching If-None-Match or If-Modified-Since is
+    answered with a 304 before ``get_data()`` runs.
+    """
+    cache_control = {'public': True, 'max_age': 0, 'must_revalidate': True}
+
+    async def get_etag(self, request, *args, **kwargs):
+        return None
+
+    async def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    async def get_data(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        etag = await self.get_etag(drf_request, *args, **kwargs)
+        etag = etag and quote_etag(etag)
+        modified = await self.get_last_modified(drf_request, *args, **kwargs)
+        modified = modified and calendar.timegm(modified.utctimetuple())
+
+        response = get_conditional_response(request, etag=etag, last_modified=modified)
+        if response is None:
+            response = json_response(await self.get_data(drf_request, *args, **kwargs))
+        if etag:
+            response.headers.setdefault('ETag', etag)
+        if modified:
+            response.headers.setdefault('Last-Modified', http_date(modified))
+        if self.cache_control:
+            patch_cache_control(response, **self.cache_control)
+        # Same Vary as the DRF views, whose ETags differ per renderer
+        patch_vary_headers(response, ('Accept',))
+        return response
@@ -0,0 +1,134 @@
+"""
+Conditional GET support for DRF views.
+
+Views derive their ETag and Last-Modified from version counters kept in the
+cache rather than from the response body, so a client whose copy is current
+gets a 304 before the view runs a single heavy query or serializes anything.
+Versions every worker must agree on go through SharedVersions, which keeps
+them in the database (one primary-key read) when the cache is per process.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import Version
+
+
+def _seed():
+    # Versions start from the clock so a cache that lost its keys never hands
+    # out a version an earlier ETag was built from.
+    return int(time.time() * 1000)
+
+
+def get_version(cache, key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(cache, key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _seed(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(cache, key):
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        get_version(cache, key)
+        version = cache.incr(key)
+    cache.set(f'{key}:modified', timezone.now(), timeout=None)
+    return version
+
+
+def version_modified(cache, key):
+    """When ``key`` was last bumped, or None if that is not known."""
+    return cache.get(f'{key}:modified')
+
+
+def _stored_version(key):
+    versions = Version.objects.using(DEFAULT_DB_ALIAS)
+    row = versions.filter(key=key).values_list('value', 'modified').first()
+    if row is None:
+        versions.bulk_create([Version(key=key, value=_seed())], ignore_conflicts=True)
+        row = versions.filter(key=key).values_list('value', 'modified').get()
+    return row
+
+
+def _bump_stored_version(key):
+    versions = Version.objects.using(DEFAULT_DB_ALIAS)
+    if not versions.filter(key=key).update(value=F('value') + 1, modified=timezone.now()):
+        _stored_version(key)
+        versions.filter(key=key).update(value=F('value') + 1, modified=timezone.now())
+    return _stored_version(key)[0]
+
+
+class SharedVersions:
+    """
+    The versions of ``cache`` when every worker shares it (SHARED_CACHE), or
+    of the ``versions`` table otherwise, where a bump in one worker reaches
+    the others.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, key):
+        if settings.SHARED_CACHE:
+            return get_version(self.cache, key)
+        return _stored_version(key)[0]
+
+    async def aget(self, key):
+        if settings.SHARED_CACHE:
+            return await aget_version(self.cache, key)
+        return await sync_to_async(self.get)(key)
+
+    def bump(self, key):
+        if settings.SHARED_CACHE:
+            return bump_version(self.cache, key)
+        return _bump_stored_version(key)
+
+    def modified(self, key):
+        if settings.SHARED_CACHE:
+            return version_modified(self.cache, key)
+        return _stored_version(key)[1]
+
+    async def amodified(self, key):
+        if settings.SHARED_CACHE:
+            return await self.cache.aget(f'{key}:modified')
+        return await sync_to_async(self.modified)(key)
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since on GET before the handler runs.
+
+    Subclasses implement get_etag() and may implement get_last_modified();
+    both receive the request and the URL kwargs like the handler does.
+    ETags may differ per renderer, so responses vary on Accept.
+    """
+    cache_control = {'public': True, 'max_age': 0, 'must_revalidate': True}
+
+    def get_etag(self, request, *args, **kwargs):
+        return None
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        handler = condition(etag_func=self.get_etag, last_modified_func=self.get_last_modified)(super().get)
+        response = handler(request, *args, **kwargs)
+        patch_cache_control(response, **self.cache_control)
+        patch_vary_headers(response, ('Accept',))
+        return response
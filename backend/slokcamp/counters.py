@@ -0,0 +1,21 @@
+class CounterFieldsMixin:
+    """
+    For models whose ``counter_fields`` are only moved by UPDATEs with F()
+    deltas.
+
+    Saving a row that already exists writes every other column, so an
+    instance loaded before a concurrent delta cannot write its stale counts
+    back over it (admin edits, title changes, password changes...). New rows
+    are inserted whole, and a counter can still be written on purpose by
+    naming it in ``update_fields``.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            skipped = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
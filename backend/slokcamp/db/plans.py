@@ -0,0 +1,116 @@
+"""
+Full table scans in query plans, for the query plan regression tests.
+
+record_queries() collects the statements run on some databases, and
+full_scans() asks the database how it would run one: SQLite through
+EXPLAIN QUERY PLAN, Postgres through EXPLAIN with sequential scans
+disabled, so a Seq Scan only remains where no index can serve the query
+(on small test tables the planner would otherwise prefer one anyway).
+
+On SQLite a walk of a whole index ("SCAN t USING INDEX i") counts as a full
+scan too, unless it hands its rows in index order to a LIMIT and only
+columns of that index filter them: the walk then stops after LIMIT rows.
+"""
+import json
+import re
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections, transaction
+
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+# "SCAN courses", or "SCAN TABLE courses" before SQLite 3.36, and walks of
+# a whole index, "SCAN courses USING [COVERING] INDEX courses_catalog_idx"
+SQLITE_SCAN = re.compile(r'SCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+TABLE_ALIAS = re.compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)\b')
+LIMIT = re.compile(r'\sLIMIT \d+(?: OFFSET \d+)?$')
+CLAUSE = re.compile(r' (WHERE|GROUP BY|ORDER BY|LIMIT) ')
+
+
+@contextmanager
+def record_queries(aliases):
+    """Collect ``(alias, sql, params)`` of the statements run in the block."""
+    queries = []
+
+    def recorder(alias):
+        def record(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith(EXPLAINED):
+                queries.append((alias, sql, params))
+            return execute(sql, params, many, context)
+        return record
+
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder(alias)))
+        yield queries
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _plan_nodes(child)
+
+
+def full_scans(alias, sql, params):
+    """The tables ``sql`` would read in full on ``alias``."""
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return {node['Relation Name'] for node in _plan_nodes(plan[0]['Plan']) if node['Node Type'] == 'Seq Scan'}
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        details = [row[-1] for row in cursor.fetchall()]
+        tables = set(connection.introspection.table_names(cursor))
+        aliases = {table_alias: table for table, table_alias in TABLE_ALIAS.findall(sql)}
+        scans = set()
+        for detail in details:
+            match = SQLITE_SCAN.fullmatch(detail)
+            if not match:
+                continue
+            table = aliases.get(match[1], match[1])
+            # Subqueries in FROM are scanned under their own alias, not a table
+            if table not in tables:
+                continue
+            if match[2] and _stops_at_limit(connection, cursor, sql, details, match[1], table, match[2]):
+                continue
+            scans.add(table)
+    return scans
+
+
+def _where(sql):
+    """The WHERE clause of the outermost statement of ``sql``, or ''."""
+    depth = 0
+    start = None
+    for position, char in enumerate(sql):
+        if char in '()':
+            depth += 1 if char == '(' else -1
+        elif depth == 0 and char == ' ':
+            clause = CLAUSE.match(sql, position)
+            if clause and clause[1] == 'WHERE':
+                start = clause.end()
+            elif clause and start is not None:
+                return sql[start:position]
+    return sql[start:] if start is not None else ''
+
+
+def _stops_at_limit(connection, cursor, sql, details, name, table, index):
+    """Whether walking ``index`` of ``table`` (``name`` in ``sql``) ends after the LIMIT's rows."""
+    if not LIMIT.search(sql) or any('TEMP B-TREE FOR ORDER BY' in detail for detail in details):
+        return False
+    filtered = set(re.findall(rf'"{name}"\."(\w+)"', _where(sql)))
+    return filtered <= _index_columns(connection, cursor, table, index)
+
+
+def _index_columns(connection, cursor, table, index):
+    """The columns of ``index``, and those the WHERE of a partial index pins down."""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = %s", [index])
+    row = cursor.fetchone()
+    if row and row[0]:
+        return set(re.findall(r'"(\w+)"', row[0]))
+    # Indexes SQLite creates for UNIQUE constraints have no SQL
+    return set(connection.introspection.get_constraints(cursor, table).get(index, {}).get('columns') or ())
@@ -0,0 +1,239 @@
+"""
+Process-wide database connection pooling for Django 4.2, which has none.
+
+The pooled backends in slokcamp.db.postgresql and slokcamp.db.sqlite3 take
+connections from a ConnectionPool instead of opening them, and hand them
+back instead of closing them. With CONN_MAX_AGE = 0 Django "closes" the
+connection after every request, so a pool of DB_POOL_SIZE connections is
+shared by all of a process's threads (sync views under ASGI run on many).
+
+A connection is rolled back before it goes back to the pool, health-checked
+before it is reused after sitting idle for CHECK_IDLE seconds, and replaced
+once it is MAX_LIFETIME seconds old. A request that finds the pool empty
+waits up to TIMEOUT seconds for a connection, and the waits are counted in
+the pool's stats().
+"""
+import threading
+import time
+from collections import deque
+
+# Pools by database alias, shared by every thread of the process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, size=10, timeout=5.0, max_lifetime=1800, check_idle=30):
+        self.max_size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+        self._condition = threading.Condition()
+        # (connection, created, released) of idle connections, last released last
+        self._idle = deque()
+        self._created = {}
+        self.size = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.counters = dict.fromkeys(
+            ('created', 'discarded', 'acquired', 'waits', 'timeouts', 'failed_checks'), 0
+        )
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def acquire(self, connect, check=None):
+        """
+        Return a pooled connection, or one made by ``connect()`` while the pool
+        has room. ``check(connection)`` should raise if an idle connection is
+        no longer usable. Raises PoolTimeout when none frees up in time.
+        """
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._condition:
+                idle = self._take_idle()
+                if idle is None:
+                    if self.size < self.max_size:
+                        self.size += 1
+                        break
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self.counters['timeouts'] += 1
+                        self._record_wait(started)
+                        raise PoolTimeout(
+                            f'No database connection became free within {self.timeout}s '
+                            f'({self.max_size} in use)'
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+                    continue
+                connection, released = idle
+                self.in_use += 1
+            # Checks and connects run outside the lock
+            if check is not None and time.monotonic() - released > self.check_idle:
+                try:
+                    check(connection)
+                except Exception:
+                    with self._condition:
+                        self.counters['failed_checks'] += 1
+                        self._discard_in_use(connection)
+                    continue
+            with self._condition:
+                return self._checkout(connection, started, waited)
+
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.counters['created'] += 1
+            self._created[id(connection)] = time.monotonic()
+            self.in_use += 1
+            return self._checkout(connection, started, waited)
+
+    def _take_idle(self):
+        """Pop the most recently released connection young enough to reuse."""
+        while self._idle:
+            connection, created, released = self._idle.pop()
+            if time.monotonic() - created <= self.max_lifetime:
+                return connection, released
+            self._discard(connection)
+        return None
+
+    def release(self, connection, reset=None):
+        """
+        Return ``connection`` to the pool. ``reset(connection)`` should roll back
+        any open transaction; if it raises, the connection is closed instead.
+        """
+        healthy = True
+        if reset is not None:
+            try:
+                reset(connection)
+            except Exception:
+                healthy = False
+        with self._condition:
+            self.in_use -= 1
+            created = self._created.get(id(connection), 0)
+            if healthy and time.monotonic() - created <= self.max_lifetime:
+                self._idle.append((connection, created, time.monotonic()))
+            else:
+                self._discard(connection)
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Close a checked-out ``connection`` for good, e.g. after an error."""
+        with self._condition:
+            self._discard_in_use(connection)
+
+    def _discard_in_use(self, connection):
+        self.in_use -= 1
+        self._discard(connection)
+        self._condition.notify()
+
+    def close_idle(self):
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def _checkout(self, connection, started, waited):
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.counters['acquired'] += 1
+        if waited:
+            self.counters['waits'] += 1
+            self._record_wait(started)
+        return connection
+
+    def _record_wait(self, started):
+        wait = time.monotonic() - started
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def _discard(self, connection):
+        self.size -= 1
+        self.counters['discarded'] += 1
+        self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'utilization': round(self.in_use / self.max_size, 4),
+                'peak_in_use': self.peak_in_use,
+                **self.counters,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.counters['waits'], 6)
+                if self.counters['waits'] else 0.0,
+            }
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(**{key.lower(): value for key, value in options.items()})
+        return pool
+
+
+def pool_stats():
+    """stats() of every pool in this process, by database alias."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mixed into a backend's DatabaseWrapper to take its connections from the
+    pool of its alias, configured by the POOL entry of its settings. Without
+    one, connections are opened and closed as usual.
+    """
+
+    @property
+    def pooled(self):
+        return 'POOL' in self.settings_dict
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        if not self.pooled:
+            return super().get_new_connection(conn_params)
+        try:
+            return self.get_pool().acquire(
+                lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params),
+                self.check_pooled_connection,
+            )
+        except PoolTimeout as exc:
+            # Surfaces as django.db.utils.OperationalError
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is None or not self.pooled:
+            return super()._close()
+        if self.in_atomic_block or self.errors_occurred:
+            # The wrapper keeps a reference after closing in an atomic
+            # block, and an error may have broken the connection
+            self.get_pool().discard(self.connection)
+        else:
+            self.get_pool().release(self.connection, self.reset_pooled_connection)
+
+    def check_pooled_connection(self, connection):
+        raise NotImplementedError
+
+    def reset_pooled_connection(self, connection):
+        raise NotImplementedError
@@ -0,0 +1,22 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+from ..pool import PooledDatabaseWrapperMixin
+
+if is_psycopg3:
+    IDLE = base.Database.pq.TransactionStatus.IDLE
+else:
+    IDLE = base.Database.extensions.TRANSACTION_STATUS_IDLE
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def check_pooled_connection(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def reset_pooled_connection(self, connection):
+        if connection.closed:
+            raise self.Database.InterfaceError('connection already closed')
+        status = connection.info.transaction_status if is_psycopg3 else connection.get_transaction_status()
+        if status != IDLE:
+            connection.rollback()
@@ -0,0 +1,32 @@
+"""Process-wide query counts by database alias."""
+import threading
+from collections import Counter
+
+from django.db.backends.signals import connection_created
+
+_counts = Counter()
+_lock = threading.Lock()
+
+
+def _count_queries(alias):
+    def wrapper(execute, sql, params, many, context):
+        with _lock:
+            _counts[alias] += 1
+        return execute(sql, params, many, context)
+
+    wrapper.counts_queries = True
+    return wrapper
+
+
+def _instrument(sender, connection, **kwargs):
+    # Fires on every (re)connect of the same wrapper: install once
+    if not any(getattr(wrapper, 'counts_queries', False) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(_count_queries(connection.alias))
+
+
+connection_created.connect(_instrument)
+
+
+def query_counts():
+    with _lock:
+        return dict(_counts)
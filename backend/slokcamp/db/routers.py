@@ -0,0 +1,81 @@
+"""
+Primary/replica routing, and shard routing of the models in
+slokcamp.db.sharding.
+
+Writes always go to the primary (``default``). Reads go to one of the
+DATABASE_REPLICAS unless the current context is pinned to the primary:
+while a request that writes is served, for DB_PRIMARY_PIN_SECONDS after a
+user's last write (see slokcamp.middleware), and inside a transaction on
+the primary, where a read must see the transaction's own writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import queries  # noqa: F401  counts queries by alias
+from .sharding import is_sharded, placement, shard_for
+
+_use_primary = ContextVar('use_primary', default=False)
+
+
+@contextmanager
+def use_primary(enabled=True):
+    """Send the reads made in this block (and threads it starts work in) to the primary."""
+    token = _use_primary.set(enabled)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def using_primary():
+    return _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def shard_of(model, instance=None):
+    """The shard of a sharded model's rows, found through the routing hints."""
+    User = get_user_model()
+    if isinstance(instance, User):
+        # user.lesson_progress and the like
+        return shard_for(instance)
+    if len(settings.DATABASE_SHARDS) == 1:
+        return settings.DATABASE_SHARDS[0]
+    if isinstance(instance, model):
+        if instance._state.db:
+            return instance._state.db
+        shard = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=instance.user_id).values_list('shard', flat=True)
+        return shard.first() or placement(instance.user_id)
+    raise ImproperlyConfigured(
+        f'{model.__name__} is sharded: query it with .using(shard_for(user)) or through scatter_gather()'
+    )
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if is_sharded(model):
+            return shard_of(model, hints.get('instance'))
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or using_primary():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if is_sharded(model):
+            return shard_of(model, hints.get('instance'))
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data, or the rows of the same users
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS:
+            return True
+        # Replicas get their schema from the primary. Shards get the full
+        # schema; data migrations (no model_name) only run on the primary
+        return db in settings.DATABASE_SHARDS and model_name is not None
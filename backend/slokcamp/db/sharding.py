@@ -0,0 +1,77 @@
+"""
+Sharding of per-user data by user.
+
+LessonProgress and UserActivity rows live on one of DATABASE_SHARDS, the
+primary always being the first, chosen per user: User.shard names it. New
+users are placed by rendezvous hashing of their id over the shards, so a
+shard added later only receives new users, and rebalance_shards moves the
+existing ones the hash now places there (about 1/N of them) without
+touching the rest.
+
+Code that works on one user's rows queries ``.using(shard_for(user))`` and
+stays on one shard; the router refuses unrouted queries of these models
+once there is more than one shard. Questions about all users are answered
+with scatter_gather(). Every shard has the full schema, so migrations apply
+unchanged, but only these models' tables hold data there.
+"""
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+# Sharded models, with the field every write moves forward
+SHARDED_MODELS = {
+    'courses.lessonprogress': 'updated_at',
+    'analytics.useractivity': 'created_at',
+}
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def sharded_models():
+    """``(model, changed_field)`` of every sharded model."""
+    return [(apps.get_model(label), field) for label, field in SHARDED_MODELS.items()]
+
+
+def _weight(user_id, alias):
+    return hashlib.blake2b(f'{user_id}:{alias}'.encode(), digest_size=8).digest()
+
+
+def placement(user_id, exclude=()):
+    """The shard the hash places ``user_id`` on, leaving out ``exclude``."""
+    shards = [alias for alias in settings.DATABASE_SHARDS if alias not in exclude]
+    return max(shards, key=lambda alias: _weight(user_id, alias))
+
+
+def shard_for(user):
+    """The alias holding ``user``'s rows."""
+    return user.shard or placement(user.pk)
+
+
+def group_by_shard(users):
+    """``{alias: [user, ...]}`` for ``users``."""
+    groups = defaultdict(list)
+    for user in users:
+        groups[shard_for(user)].append(user)
+    return groups
+
+
+def scatter_gather(func):
+    """``{alias: func(alias)}`` for every shard, the shards queried in parallel."""
+    shards = settings.DATABASE_SHARDS
+    if len(shards) == 1:
+        return {shards[0]: func(shards[0])}
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            connections[alias].close()
+
+    with ThreadPoolExecutor(len(shards), thread_name_prefix='scatter-gather') as executor:
+        return dict(zip(shards, executor.map(run, shards)))
@@ -0,0 +1,179 @@
+"""
+SQLite backend for serving with several workers.
+
+Every new connection runs the PRAGMAS of the database's settings
+(synchronous, busy_timeout, ...). The JOURNAL_MODE (WAL) persists in the
+file, so set_journal_mode() writes it once, after migrate.
+
+Transactions begin with BEGIN IMMEDIATE: a deferred transaction that reads
+and then writes cannot wait for a writer that committed after its read, and
+fails with "database is locked" at once, busy_timeout or not. That also
+makes transactions that only read wait for writers and each other, so
+inside read_only_transactions() (requests with safe methods) they begin
+deferred. With WRITE_LOCK, writing transactions of a process also queue on
+a lock and processes take turns through an flock of
+``<database>-writer.lock``, rather than all polling SQLite's lock. With a
+POOL entry connections come from a slokcamp.db.pool pool.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import OperationalError
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.sqlite3 import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+try:
+    import fcntl
+except ImportError:  # Windows: processes rely on busy_timeout alone
+    fcntl = None
+
+_read_only = ContextVar('sqlite_read_only', default=False)
+
+
+@contextmanager
+def read_only_transactions(enabled=True):
+    """Begin the transactions of this block deferred, without taking the write lock."""
+    token = _read_only.set(enabled)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+# Write locks by database file, shared by every connection of the process
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+
+class WriteLock:
+    """One writing transaction at a time on a database file."""
+
+    def __init__(self, path):
+        self.path = f'{path}-writer.lock'
+        self.lock = threading.Lock()
+        self.file = None
+        self.pid = None
+
+    def _file(self):
+        if self.pid != os.getpid():
+            # A forked worker must not share the parent's open file, or
+            # their flocks would not exclude each other
+            self.file = open(self.path, 'a')
+            self.pid = os.getpid()
+        return self.file
+
+    def acquire(self, timeout):
+        """Wait up to ``timeout`` seconds for the lock; return whether it was taken."""
+        deadline = time.monotonic() + timeout
+        if not self.lock.acquire(timeout=timeout):
+            return False
+        if fcntl is None:
+            return True
+        delay = 0.0001
+        while True:
+            try:
+                fcntl.flock(self._file(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() + delay > deadline:
+                    self.lock.release()
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, 0.002)
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.lock.release()
+
+
+def get_write_lock(path):
+    path = os.path.abspath(path)
+    with _write_locks_lock:
+        lock = _write_locks.get(path)
+        if lock is None:
+            lock = _write_locks[path] = WriteLock(path)
+        return lock
+
+
+class TunedDatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for pragma, value in self.settings_dict.get('PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {pragma} = {value}')
+        return connection
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, TunedDatabaseWrapper):
+    holds_write_lock = False
+
+    def get_write_lock(self):
+        if not self.settings_dict.get('WRITE_LOCK') or self.is_in_memory_db():
+            return None
+        return get_write_lock(self.settings_dict['NAME'])
+
+    def set_journal_mode(self):
+        """Store JOURNAL_MODE in the database file, where later connections find it."""
+        mode = self.settings_dict.get('JOURNAL_MODE')
+        if mode and not self.is_in_memory_db():
+            with self.cursor() as cursor:
+                cursor.execute(f'PRAGMA journal_mode = {mode}')
+
+    def _start_transaction_under_autocommit(self):
+        if _read_only.get():
+            self.cursor().execute('BEGIN')
+            return
+        lock = self.get_write_lock()
+        if lock is not None:
+            timeout = self.settings_dict.get('PRAGMAS', {}).get('busy_timeout', 5000) / 1000
+            if not lock.acquire(timeout):
+                raise OperationalError(f'database is locked: no write lock after {timeout:g}s')
+            self.holds_write_lock = True
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            self.get_write_lock().release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
+
+    def close(self):
+        if not self.pooled:
+            return super().close()
+        # The sqlite3 backend ignores close() on in-memory databases so their
+        # data survives; the pool keeps released connections open, so hand
+        # those back too rather than tying one to every thread that ran
+        BaseDatabaseWrapper.close(self)
+
+    def check_pooled_connection(self, connection):
+        connection.execute('SELECT 1')
+
+    def reset_pooled_connection(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
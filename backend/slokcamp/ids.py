@@ -0,0 +1,73 @@
+"""
+Primary keys.
+
+Every model's UUID primary key defaults to new_id(): a random version 4
+UUID, or with TIME_ORDERED_IDS a version 7 UUID (RFC 9562), which starts
+with the creation time in milliseconds. New rows' keys then ascend, so
+inserts append to the right edge of the primary key index instead of
+landing on a random page of it, and an index page is only split once it is
+full. Existing keys stay as they are: both kinds are valid UUIDs.
+
+The ids of tables that nothing refers to can be rewritten as time-ordered
+ids of their creation time (backfill_time_ordered_ids); with KEYSET_BY_ID,
+KeysetPagination then orders them by id alone.
+"""
+import os
+import threading
+import time
+import uuid
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+_lock = threading.Lock()
+_last = (0, 0)
+
+
+def uuid7(at=None):
+    """
+    A version 7 UUID for now, or for the datetime ``at``. Ids made now by a
+    process ascend: those of the same millisecond count up in rand_a.
+    """
+    global _last
+    if at is not None:
+        millis, counter = int(at.timestamp() * 1000), int.from_bytes(os.urandom(2), 'big') & 0xfff
+    else:
+        with _lock:
+            millis, counter = time.time_ns() // 1_000_000, int.from_bytes(os.urandom(2), 'big') & 0x7ff
+            last_millis, last_counter = _last
+            if millis <= last_millis:
+                millis, counter = last_millis, last_counter + 1
+                if counter > 0xfff:
+                    millis, counter = millis + 1, 0
+            _last = (millis, counter)
+    random = int.from_bytes(os.urandom(8), 'big') & (1 << 62) - 1
+    return uuid.UUID(int=millis << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random)
+
+
+def new_id():
+    """Default of every UUID primary key."""
+    return uuid7() if settings.TIME_ORDERED_IDS else uuid.uuid4()
+
+
+@lru_cache(maxsize=None)
+def _time_keyed_models():
+    keyed = {}
+    for model in apps.get_models():
+        if model._meta.pk.default is not new_id or model._meta.related_objects:
+            continue
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.DateTimeField) and field.auto_now_add:
+                keyed[model] = field.name
+                break
+    return keyed
+
+
+def time_keyed_models():
+    """
+    ``{model: creation field}`` of the models whose ids can be rewritten
+    from their creation time: no other model refers to them.
+    """
+    return dict(_time_keyed_models())
@@ -0,0 +1,64 @@
+"""
+Append-only event journals in the shared cache.
+
+Worker processes that keep derived state in memory (leaderboards, the
+revoked-token filter) use a journal to hear about changes made through the
+other workers. Each event is stored under its own sequence number; a reader
+remembers the last sequence it applied and fetches what came after it in a
+single get_many. Events expire, and a reader that has fallen too far behind
+or meets an evicted event is told to rebuild its state from the database
+instead.
+"""
+from django.core.cache import cache
+
+
+class CacheJournal:
+    # Events a reader may lag behind before it rebuilds instead of replaying
+    limit = 10000
+    # A missing event this close to the head may still be being written
+    grace = 100
+    timeout = 24 * 60 * 60
+
+    def __init__(self, name):
+        self.name = name
+        self.seq_key = f'{name}:seq'
+
+    def _event_key(self, seq):
+        return f'{self.name}:event:{seq}'
+
+    def head(self):
+        return cache.get(self.seq_key, 0)
+
+    def append(self, event):
+        cache.add(self.seq_key, 0, None)
+        seq = cache.incr(self.seq_key)
+        cache.set(self._event_key(seq), event, self.timeout)
+        return seq
+
+    def skip(self):
+        """Move the head past every reader's reach so they all rebuild."""
+        cache.add(self.seq_key, 0, None)
+        cache.incr(self.seq_key, self.limit + 1)
+
+    def read(self, since):
+        """
+        Return ``(position, events)`` for the events after sequence ``since``.
+
+        ``events`` is None when the reader must rebuild its state, which is
+        then current as of ``position``; pass ``since=None`` to force that.
+        Otherwise the reader applies ``events`` and remembers ``position``.
+        """
+        head = self.head()
+        if since is None or head < since or head - since > self.limit:
+            return head, None
+        seqs = range(since + 1, head + 1)
+        found = cache.get_many([self._event_key(seq) for seq in seqs])
+        events = []
+        for seq in seqs:
+            event = found.get(self._event_key(seq))
+            if event is None:
+                if head - seq >= self.grace:
+                    return head, None
+                return seq - 1, events
+            events.append(event)
+        return head, events
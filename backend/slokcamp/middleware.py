@@ -0,0 +1,99 @@
+"""
+Read-your-writes for the primary/replica router.
+
+Requests that write are served entirely from the primary, and a user who
+has written is pinned to the primary for DB_PRIMARY_PIN_SECONDS so replica
+lag never hides their own changes. The pin lives in the shared cache,
+keyed by user, and is found through the user id of the request's JWT
+(before DRF authenticates it). Nothing is looked up without replicas.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .db.routers import use_primary
+from .db.sqlite3.base import read_only_transactions
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Serve ``user_id``'s reads from the primary for DB_PRIMARY_PIN_SECONDS."""
+    if settings.DATABASE_REPLICAS:
+        cache.set(_pin_key(user_id), 1, settings.DB_PRIMARY_PIN_SECONDS)
+
+
+def _token_user_id(request):
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1])[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+def _writer_id(request, response, user_id):
+    """The user a successful write was made by, if any."""
+    if request.method in SAFE_METHODS or response.status_code >= 400:
+        return None
+    if user_id is None:
+        # Set by DRF once it has authenticated, e.g. by session
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+    return user_id
+
+
+@sync_and_async_middleware
+def primary_pin_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not settings.DATABASE_REPLICAS:
+                return await get_response(request)
+            user_id = _token_user_id(request)
+            pinned = request.method not in SAFE_METHODS or (
+                user_id is not None and await cache.aget(_pin_key(user_id)) is not None
+            )
+            with use_primary(pinned):
+                response = await get_response(request)
+            writer = _writer_id(request, response, user_id)
+            if writer is not None:
+                await cache.aset(_pin_key(writer), 1, settings.DB_PRIMARY_PIN_SECONDS)
+            return response
+    else:
+        def middleware(request):
+            if not settings.DATABASE_REPLICAS:
+                return get_response(request)
+            user_id = _token_user_id(request)
+            pinned = request.method not in SAFE_METHODS or (
+                user_id is not None and cache.get(_pin_key(user_id)) is not None
+            )
+            with use_primary(pinned):
+                response = get_response(request)
+            writer = _writer_id(request, response, user_id)
+            if writer is not None:
+                pin_to_primary(writer)
+            return response
+    return middleware
+
+
+@sync_and_async_middleware
+def read_only_transactions_middleware(get_response):
+    """Let SQLite transactions of GET, HEAD and OPTIONS requests begin without the write lock."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with read_only_transactions(request.method in SAFE_METHODS):
+                return await get_response(request)
+    else:
+        def middleware(request):
+            with read_only_transactions(request.method in SAFE_METHODS):
+                return get_response(request)
+    return middleware
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Version",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField()),
+                ("modified", models.DateTimeField(null=True)),
+            ],
+            options={
+                "db_table": "versions",
+            },
+        ),
+    ]
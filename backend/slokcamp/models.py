@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class Version(models.Model):
+    """
+    A version counter of slokcamp.conditional kept in the database, for
+    deployments whose workers do not share a cache.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    value = models.BigIntegerField()
+    modified = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'versions'
+
+    def __str__(self):
+        return f'{self.key}={self.value}'
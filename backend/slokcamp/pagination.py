@@ -0,0 +1,236 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .ids import time_keyed_models
+
+
+def _invert(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def _encode_value(value):
+    # Full microsecond precision: a truncated timestamp would skip or repeat
+    # rows that share the truncated prefix.
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def encode_cursor(row, ordering, reverse=False):
+    """Opaque cursor pointing just past ``row`` in ``ordering``."""
+    values = [_encode_value(getattr(row, field.lstrip('-'))) for field in ordering]
+    data = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def planner_estimate(queryset):
+    """Row count the Postgres planner expects ``queryset`` to return."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique ordering such as (created_at, id).
+
+    Each page is fetched with a WHERE on the last row's key instead of an
+    OFFSET, so any page costs one index range scan of page_size + 1 rows, and
+    rows inserted while a client pages neither repeat nor go missing. Views
+    may set ``keyset_ordering``; its last field must be unique. With
+    KEYSET_BY_ID, a table whose ids are time-ordered (slokcamp.ids) is
+    ordered by id alone instead of (creation time, id). No total is computed
+    unless the client asks for ``?count=1``, which is answered from the
+    planner estimate on Postgres and from a capped COUNT elsewhere.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-created_at', '-id')
+    count_limit = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_query = self.prepare(queryset, request, view)
+        if self.count_requested:
+            self.count, self.count_is_exact = self.get_count(queryset)
+        return self.finish(list(page_query))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, fetching through the async ORM."""
+        page_query = self.prepare(queryset, request, view)
+        if self.count_requested:
+            self.count, self.count_is_exact = await self.aget_count(queryset)
+        return self.finish([row async for row in page_query])
+
+    def prepare(self, queryset, request, view):
+        """Read the request and return the query for the page plus one row."""
+        self.request = request
+        self.model = queryset.model
+        self.ordering = self.get_ordering(view)
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor['reverse'])
+        self.count = None
+        self.count_requested = request.query_params.get(self.count_query_param) in ('1', 'true')
+
+        ordering = _invert(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor:
+            queryset = queryset.filter(self.after(ordering, self.cursor['values']))
+        return queryset[:self.page_size + 1]
+
+    def finish(self, page):
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if self.reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.page = page
+        return page
+
+    def get_ordering(self, view):
+        ordering = getattr(view, 'keyset_ordering', self.ordering)
+        if settings.KEYSET_BY_ID and len(ordering) == 2:
+            created, pk = ordering
+            if (
+                pk.lstrip('-') == 'id' and created.startswith('-') == pk.startswith('-')
+                and created.lstrip('-') == time_keyed_models().get(self.model)
+            ):
+                return (pk,)
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_count(self, queryset):
+        """Return ``(count, is_exact)`` without an unbounded COUNT(*)."""
+        if connections[queryset.db].vendor == 'postgresql':
+            return planner_estimate(queryset), False
+        count = queryset.order_by()[:self.count_limit].count()
+        return count, count < self.count_limit
+
+    async def aget_count(self, queryset):
+        if connections[queryset.db].vendor == 'postgresql':
+            return await sync_to_async(planner_estimate)(queryset), False
+        count = await queryset.order_by()[:self.count_limit].acount()
+        return count, count < self.count_limit
+
+    def after(self, ordering, values):
+        """Rows strictly past ``values`` in ``ordering``."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            # A cursor of another ordering (e.g. from before KEYSET_BY_ID changed)
+            if len(data['v']) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, data['v'])
+            ]
+            return {'values': values, 'reverse': bool(data.get('r'))}
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def cursor_link(self, row, reverse):
+        encoded = encode_cursor(row, self.ordering, reverse)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.cursor_link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response['count'] = self.count
+            response['count_is_exact'] = self.count_is_exact
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_is_exact': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+
+def keyset_ordering(model, view=None):
+    """The ordering KeysetPagination pages ``model`` in for ``view``, e.g. to build its cursors elsewhere."""
+    paginator = KeysetPagination()
+    paginator.model = model
+    return paginator.get_ordering(view)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination with an apaginate_queryset() for async views."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     'accounts',
     'courses',
     'analytics',
+    'slokcamp',
 ]
 
 MIDDLEWARE = [
@@ -36,6 +37,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'slokcamp.middleware.primary_pin_middleware',
+    'slokcamp.middleware.read_only_transactions_middleware',
 ]
 
 ROOT_URLCONF = 'slokcamp.urls'
@@ -78,6 +81,106 @@ else:
         }
     }
 
+
+def database_at(location):
+    """The primary's settings pointed at host[:port][/name], or at another file on SQLite."""
+    database = dict(DATABASES['default'])
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['NAME'] = location.strip()
+    else:
+        server, _, name = location.strip().partition('/')
+        host, _, port = server.partition(':')
+        database.update(HOST=host, PORT=port or database['PORT'], NAME=name or database['NAME'])
+    return database
+
+
+# Read replicas, comma-separated: Postgres servers (host[:port][/name]), or database
+# files when running on SQLite (e.g. a copy of db.sqlite3 to try the routing locally)
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = dict(database_at(replica), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{index}')
+# Extra shards for per-user lesson progress and activity, listed like DB_REPLICAS;
+# the primary is always the first shard. Run migrate --database on each shard
+# and rebalance_shards after adding one.
+DATABASE_SHARDS = ['default']
+for index, shard in enumerate(filter(None, os.getenv('DB_SHARDS', '').split(',')), 1):
+    DATABASES[f'shard{index}'] = database_at(shard)
+    DATABASE_SHARDS.append(f'shard{index}')
+DATABASE_ROUTERS = ['slokcamp.db.routers.PrimaryReplicaRouter']
+# Seconds a user's reads stay on the primary after they write
+DB_PRIMARY_PIN_SECONDS = int(os.getenv('DB_PRIMARY_PIN_SECONDS', '10'))
+
+# SQLite (no POSTGRES_HOST) runs on slokcamp.db.sqlite3: a write-ahead log so reads never
+# wait for the writer, these pragmas on every connection, and transactions of requests that
+# may write take the write lock as they begin instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    # Durable at checkpoints rather than at every commit: no fsync per write in WAL mode
+    'synchronous': os.getenv('DB_SQLITE_SYNCHRONOUS', 'normal'),
+    # Milliseconds a connection waits for the write lock
+    'busy_timeout': int(os.getenv('DB_SQLITE_BUSY_TIMEOUT', '5000')),
+    'mmap_size': int(os.getenv('DB_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    # Page cache per connection; negative values are in KiB
+    'cache_size': int(os.getenv('DB_SQLITE_CACHE_SIZE', '-16000')),
+    'temp_store': 'memory',
+}
+# Stored in the database file, so `migrate` sets it once rather than every connection
+SQLITE_JOURNAL_MODE = os.getenv('DB_SQLITE_JOURNAL_MODE', 'wal')
+# Queue writing transactions, within a process and across workers, rather than have
+# every waiting writer poll SQLite's lock (compare with `manage.py benchmark_sqlite_writes`)
+DB_SQLITE_WRITE_LOCK = os.getenv('DB_SQLITE_WRITE_LOCK', '0') == '1'
+for database in DATABASES.values():
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.update(
+            ENGINE='slokcamp.db.sqlite3', PRAGMAS=SQLITE_PRAGMAS, JOURNAL_MODE=SQLITE_JOURNAL_MODE,
+            WRITE_LOCK=DB_SQLITE_WRITE_LOCK,
+        )
+
+# Connection handling, one of:
+#   none        a new connection for every request
+#   persistent  one connection per worker thread, kept DB_CONN_MAX_AGE seconds and health-checked
+#   pool        DB_POOL_SIZE connections shared by a process's threads (use this under ASGI);
+#               pool wait time and utilization are served at /api/db-pool-stats/
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'persistent')
+POOLED_ENGINES = {
+    'django.db.backends.postgresql': 'slokcamp.db.postgresql',
+}
+for database in DATABASES.values():
+    if DB_POOL_MODE == 'persistent':
+        database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+        database['CONN_HEALTH_CHECKS'] = True
+    elif DB_POOL_MODE == 'pool':
+        database['ENGINE'] = POOLED_ENGINES.get(database['ENGINE'], database['ENGINE'])
+        # Django hands the connection back to the pool after every request
+        database['CONN_MAX_AGE'] = 0
+        database['POOL'] = {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', '10')),
+            # Seconds a request waits for a free connection before failing
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', '5')),
+            # Seconds after which a connection is replaced
+            'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+            # Seconds a connection may sit idle before it is checked on reuse
+            'CHECK_IDLE': int(os.getenv('DB_POOL_CHECK_IDLE', '30')),
+        }
+
+# Cache shared by all workers: set REDIS_URL whenever more than one process serves requests
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Whether every worker sees the same cache. Without it, state the workers must agree on
+# (buffered view counts, cached users, token revocations) is read from the database
+SHARED_CACHE = os.getenv('SHARED_CACHE', '1' if os.getenv('REDIS_URL') else '0') == '1'
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -98,12 +201,16 @@ MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+# UUID primary keys of new rows: time-ordered (v7) rather than random (v4), see slokcamp.ids
+TIME_ORDERED_IDS = os.getenv('TIME_ORDERED_IDS', '0') == '1'
+# Page tables by id alone once backfill_time_ordered_ids has rewritten their old ids
+KEYSET_BY_ID = os.getenv('KEYSET_BY_ID', '0') == '1'
 
 AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -112,6 +219,56 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Upper bound on ranked full-text matches returned by the course catalog search
+COURSE_SEARCH_MAX_RESULTS = int(os.getenv('COURSE_SEARCH_MAX_RESULTS', '200'))
+
+# Largest number of events accepted by one lesson-progress batch request
+LESSON_PROGRESS_BATCH_MAX = int(os.getenv('LESSON_PROGRESS_BATCH_MAX', '500'))
+
+# Seconds between flushes of buffered discussion view counts to the database
+DISCUSSION_VIEWS_FLUSH_INTERVAL = int(os.getenv('DISCUSSION_VIEWS_FLUSH_INTERVAL', '30'))
+
+# Counter rows each reply's upvotes are spread over; raise it for very hot replies
+DISCUSSION_UPVOTE_SHARDS = int(os.getenv('DISCUSSION_UPVOTE_SHARDS', '1'))
+
+# Cache alias and lifetime (seconds) of cached course list and detail responses
+CATALOG_CACHE_ALIAS = os.getenv('CATALOG_CACHE_ALIAS', 'default')
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', '300'))
+
+# Latest reviews embedded in a course detail response; the rest are paginated
+COURSE_DETAIL_REVIEWS = int(os.getenv('COURSE_DETAIL_REVIEWS', '10'))
+
+# Lifetime (seconds) of a cached learner dashboard; writes invalidate it sooner.
+# Dashboards are only cached with SHARED_CACHE
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '300'))
+
+# Route the catalog, discussion list and auth endpoints to their async views (ASGI only)
+ASYNC_VIEWS = int(os.getenv('ASYNC_VIEWS', '0'))
+
+# Threads the async signup and signin views hash passwords on
+PASSWORD_HASHING_THREADS = int(os.getenv('PASSWORD_HASHING_THREADS', '4'))
+
+# Lifetime (seconds) of a user cached for JWT authentication; saves invalidate it
+# sooner. Users are only cached with SHARED_CACHE
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+
+# Revoked tokens each worker's bloom filter is sized for before it grows with the table
+REVOKED_TOKENS_BLOOM_CAPACITY = int(os.getenv('REVOKED_TOKENS_BLOOM_CAPACITY', '100000'))
+
+# Seconds a worker keeps its revoked-token filter before rebuilding it from the table
+REVOKED_TOKENS_RELOAD_INTERVAL = int(os.getenv('REVOKED_TOKENS_RELOAD_INTERVAL', '3600'))
+
+# Without SHARED_CACHE: seconds between a worker's reads of new revocations,
+# the longest another worker's revocation can go unnoticed
+REVOKED_TOKENS_POLL_INTERVAL = float(os.getenv('REVOKED_TOKENS_POLL_INTERVAL', '5'))
+
+# Seconds a worker keeps its in-memory leaderboards before reloading them
+LEADERBOARD_RELOAD_INTERVAL = int(os.getenv('LEADERBOARD_RELOAD_INTERVAL', '3600'))
+
+# Load the global and weekly leaderboards in the background when a worker
+# starts; only with SHARED_CACHE, without it boards are read from the database
+LEADERBOARD_WARM = int(os.getenv('LEADERBOARD_WARM', '0'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
@@ -5,6 +5,7 @@ from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from .views import DatabasePoolStatsView, DatabaseQueryStatsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -21,6 +22,8 @@ urlpatterns = [
     path('api/auth/', include('accounts.urls')),
     path('api/courses/', include('courses.urls')),
     path('api/', include('analytics.urls')),
+    path('api/db-pool-stats/', DatabasePoolStatsView.as_view(), name='db_pool_stats'),
+    path('api/db-query-stats/', DatabaseQueryStatsView.as_view(), name='db_query_stats'),
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
 
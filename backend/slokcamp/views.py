@@ -0,0 +1,23 @@
+from django.conf import settings
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .db.pool import pool_stats
+from .db.queries import query_counts
+
+
+class DatabasePoolStatsView(APIView):
+    """Connection pool metrics of the process serving the request."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'mode': settings.DB_POOL_MODE, 'pools': pool_stats()})
+
+
+class DatabaseQueryStatsView(APIView):
+    """Queries run by the process serving the request, by database alias."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'replicas': settings.DATABASE_REPLICAS, 'queries': query_counts()})
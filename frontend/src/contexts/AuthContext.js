@@ -27,6 +27,13 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    if (token) {
+      // Revoke the token server-side so a copy of it stops working too
+      fetch(`${process.env.REACT_APP_BACKEND_URL}/api/auth/signout/`, {
+        method: 'POST',
+        headers: { Authorization: `Bearer ${token}` },
+      }).catch(() => {});
+    }
     setToken(null);
     setUser(null);
     localStorage.removeItem('token');
@@ -1,5 +1,6 @@
 import React, { createContext, useState, useContext, useEffect } from 'react';
 import AsyncStorage from '@react-native-async-storage/async-storage';
+import { authAPI } from '../services/api';
 
 const AuthContext = createContext(null);
 
@@ -38,6 +39,14 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = async () => {
+    try {
+      // Revoke the token server-side so a copy of it stops working too
+      await authAPI.signout();
+    } catch (error) {
+      if (__DEV__) {
+        console.error('Error signing out:', error);
+      }
+    }
     setToken(null);
     setUser(null);
     await AsyncStorage.removeItem('token');
@@ -56,6 +56,7 @@ export const setAuthToken = (token) => {
 export const authAPI = {
   signup: (data) => api.post('/auth/signup/', data),
   signin: (data) => api.post('/auth/signin/', data),
+  signout: () => api.post('/auth/signout/'),
   getCurrentUser: () => api.get('/auth/me/'),
 };
 
@@ -63,8 +64,10 @@ export const coursesAPI = {
   getAllCourses: (params) => api.get('/courses/', { params }),
   getCourse: (id) => api.get(`/courses/${id}/`),
   getMyEnrollments: () => api.get('/courses/my-enrollments/'),
+  getDashboard: () => api.get('/courses/dashboard/'),
   enrollCourse: (courseId) => api.post('/courses/enroll/', { course_id: courseId }),
   updateLessonProgress: (data) => api.post('/courses/lesson-progress/', data),
+  updateLessonProgressBatch: (events) => api.post('/courses/lesson-progress/batch/', { events }),
 };
 
 export default api;